@@ -0,0 +1,185 @@
+import asyncio
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import parse_qs
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from werkzeug.http import generate_etag, parse_etags, quote_etag
+
+try:
+    from asgiref.wsgi import WsgiToAsgi
+except ImportError:   # sem asgiref, só as rotas assíncronas abaixo ficam disponíveis
+    WsgiToAsgi = None
+
+from app_web import (criar_app, cache_respostas, _decodificar_cursor, _ler_formulario_despesa, ERRO_PERIODO, ERRO_FORMULARIO_DESPESA,
+                     LIMITE_PADRAO_PAGINA, LIMITE_MAXIMO_PAGINA, LIMITE_SUGESTOES_FORMULARIO)
+from banco_dados import (listar_pagina_transacoes_db, adicionar_despesa_db, materializar_recorrencias_db, autocompletar_categorias,
+                         ler_versao_dados_db, parar_escrita_em_grupo, fechar_conexoes_bd)
+from dinheiro import formatar_centavos
+from recorrencias import horizonte_recorrencias, periodo_valido
+
+# --- APLICAÇÃO ASGI (ASSÍNCRONA) ---
+# Serve a página inicial, o formulário de despesa e a listagem JSON sem prender uma thread por
+# requisição: o laço de eventos só espera, e as chamadas ao sqlite3 rodam num executor dedicado
+# de THREADS_BANCO threads, cada uma com sua conexão do pool. Um processo atende centenas de
+# conexões abertas; o trabalho no banco continua limitado pelo executor (e por um escritor por vez).
+# Os GETs usam o mesmo cache de respostas (app_web.cache_respostas) da aplicação Flask.
+# As demais rotas vão para a aplicação Flask (via asgiref, se instalado).
+# Uso: uvicorn --factory app_asgi:criar_app_asgi   (mesmas variáveis FINANCEIRO_* de app_web)
+
+
+def _inteiro(parametros, nome, padrao=None):
+    # Como request.args.get(nome, padrao, type=int): valor ausente ou inválido vira o padrão.
+    try: return int(parametros[nome][0])
+    except (KeyError, ValueError): return padrao
+
+def _html(texto, status=200):
+    return status, texto.encode('utf-8'), 'text/html; charset=utf-8', []
+
+ROTAS_COM_PERIODO = ('/', '/api/transacoes')
+
+def _preparar_get(ano, mes, le_periodo):
+    # O mesmo app_web._periodo_consultado (ocorrências recorrentes até o fim do período consultado,
+    # só nas rotas que leem um) e a versão dos dados para o cache de respostas, numa ida só ao executor.
+    if le_periodo: materializar_recorrencias_db(horizonte_recorrencias(ano, mes))
+    return ler_versao_dados_db()
+
+
+class AplicacaoAsgi:
+    """Aplicação ASGI 3 sobre a aplicação Flask `app_flask`, já configurada por criar_app."""
+
+    def __init__(self, app_flask, threads_banco=8):
+        self.app_flask = app_flask
+        self.executor = ThreadPoolExecutor(max_workers=threads_banco, thread_name_prefix='banco')
+        self._flask_asgi = WsgiToAsgi(app_flask) if WsgiToAsgi else None
+        self._urls = app_flask.url_map.bind('')
+        # Os mesmos templates da aplicação Flask, com o filtro `reais` e um url_for equivalente.
+        self.templates = Environment(loader=FileSystemLoader(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')),
+                                     autoescape=select_autoescape(['html']))
+        self.templates.filters['reais'] = formatar_centavos
+        self.templates.globals['url_for'] = self.url_para
+        self._rotas = {
+            ('GET', '/'): self.pagina_inicial,
+            ('GET', '/despesa/nova'): self.formulario_despesa,
+            ('POST', '/despesa/nova'): self.adicionar_despesa,
+            ('GET', '/api/transacoes'): self.listar_transacoes,
+        }
+
+    def url_para(self, endpoint, **valores):
+        # '.pagina_inicial' -> endpoint do blueprint de app_web; valores None ficam fora da URL.
+        return self._urls.build('rotas' + endpoint if endpoint.startswith('.') else endpoint, valores)
+
+    async def no_banco(self, funcao, *args, **kwargs):
+        """Roda `funcao` (que usa o sqlite3) no executor do banco e espera o resultado sem bloquear o laço."""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, partial(funcao, *args, **kwargs))
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan': return await self._ciclo_de_vida(receive, send)
+        if scope['type'] != 'http': return
+        rota = self._rotas.get((scope['method'], scope['path']))
+        if rota is None:
+            if self._flask_asgi is not None: return await self._flask_asgi(scope, receive, send)
+            return await self._responder(send, 404, b"Rota servida apenas pela aplicacao Flask (instale o asgiref).", 'text/plain; charset=utf-8')
+        parametros = parse_qs(scope['query_string'].decode('latin-1'), keep_blank_values=True)
+        cabecalhos = {nome.decode('latin-1').lower(): valor.decode('latin-1') for nome, valor in scope['headers']}
+        if scope['method'] != 'GET':
+            return await self._responder(send, *await rota(parametros, cabecalhos, receive))
+        ano, mes, le_periodo = _inteiro(parametros, 'ano'), _inteiro(parametros, 'mes'), scope['path'] in ROTAS_COM_PERIODO
+        if le_periodo and not periodo_valido(ano, mes):
+            return await self._responder(send, 400, self.app_flask.json.response({'erro': ERRO_PERIODO}).get_data(), 'application/json')
+        versao = await self.no_banco(_preparar_get, ano, mes, le_periodo)
+        if not cache_respostas.ativo:
+            return await self._responder(send, *await rota(parametros, cabecalhos, receive))
+        pares = [(nome, valor) for nome, valores in parametros.items() for valor in valores]
+        guardada = cache_respostas.obter(scope['path'], pares, versao)
+        if guardada is None:
+            status, corpo, tipo, extras = await rota(parametros, cabecalhos, receive)
+            # Só 200 é guardado: erros (4xx/5xx), redirecionamentos e 304 passam direto.
+            if status != 200: return await self._responder(send, status, corpo, tipo, extras)
+            guardada = cache_respostas.guardar(scope['path'], pares, versao, corpo, tipo)
+        extras = [('etag', quote_etag(guardada.etag)), ('cache-control', 'no-cache')]
+        if parse_etags(cabecalhos.get('if-none-match')).contains(guardada.etag): return await self._responder(send, 304, b'', guardada.tipo, extras)
+        await self._responder(send, 200, guardada.corpo, guardada.tipo, extras)
+
+    async def _responder(self, send, status, corpo, tipo, extras=()):
+        cabecalhos = [(b'content-type', tipo.encode('latin-1')), (b'content-length', str(len(corpo)).encode('latin-1'))]
+        cabecalhos += [(nome.encode('latin-1'), valor.encode('latin-1')) for nome, valor in extras]
+        await send({'type': 'http.response.start', 'status': status, 'headers': cabecalhos})
+        await send({'type': 'http.response.body', 'body': corpo})
+
+    async def _ciclo_de_vida(self, receive, send):
+        while True:
+            mensagem = await receive()
+            if mensagem['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif mensagem['type'] == 'lifespan.shutdown':
+                await asyncio.get_running_loop().run_in_executor(None, partial(self.executor.shutdown, wait=True))
+                parar_escrita_em_grupo()
+                fechar_conexoes_bd()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    # --- ROTAS ---
+    async def pagina_inicial(self, parametros, cabecalhos, receive):
+        ano, mes = _inteiro(parametros, 'ano'), _inteiro(parametros, 'mes')
+        limite = min(max(_inteiro(parametros, 'limite', LIMITE_PADRAO_PAGINA), 1), LIMITE_MAXIMO_PAGINA)
+        try:
+            transacoes = await self.no_banco(listar_pagina_transacoes_db, ano, mes, limite=limite,
+                                             apos=_decodificar_cursor(parametros.get('cursor', [None])[0]))
+        except Exception as e:
+            return _html(f"<h1>Ocorreu um Erro</h1><p>Não foi possível buscar as transações: {e}</p>", status=500)
+        return _html(self.templates.get_template('index.html').render(transacoes=transacoes, limite=limite, ano=ano, mes=mes, stream=None))
+
+    async def formulario_despesa(self, parametros, cabecalhos, receive, erro=None, valores=None):
+        categorias = await self.no_banco(autocompletar_categorias.sugerir, limite=LIMITE_SUGESTOES_FORMULARIO)
+        return _html(self.templates.get_template('form_despesa.html').render(categorias=categorias, erro=erro, valores=valores or {}),
+                     status=400 if erro else 200)
+
+    async def adicionar_despesa(self, parametros, cabecalhos, receive):
+        corpo = b''
+        while True:
+            mensagem = await receive()
+            corpo += mensagem.get('body', b'')
+            if not mensagem.get('more_body'): break
+        formulario = {nome: valores[0] for nome, valores in parse_qs(corpo.decode('utf-8'), keep_blank_values=True).items()}
+        despesa = _ler_formulario_despesa(formulario)
+        if despesa is None: return await self.formulario_despesa(parametros, cabecalhos, receive, erro=ERRO_FORMULARIO_DESPESA, valores=formulario)
+        try:
+            await self.no_banco(adicionar_despesa_db, *despesa)
+        except sqlite3.Error as e:
+            return _html(f"<h1>Ocorreu um Erro ao Salvar</h1><p>Não foi possível salvar a despesa: {e}</p>", status=500)
+        return 302, b'', 'text/html; charset=utf-8', [('location', self.url_para('.pagina_inicial'))]
+
+    async def listar_transacoes(self, parametros, cabecalhos, receive):
+        # Mesma resposta (e mesmo ETag) de GET /api/transacoes na aplicação Flask.
+        ano, mes = _inteiro(parametros, 'ano'), _inteiro(parametros, 'mes')
+        limite = min(max(_inteiro(parametros, 'limite', LIMITE_PADRAO_PAGINA), 1), LIMITE_MAXIMO_PAGINA)
+        try:
+            transacoes = await self.no_banco(listar_pagina_transacoes_db, ano, mes, limite=limite,
+                                             apos=_decodificar_cursor(parametros.get('cursor', [None])[0]))
+        except Exception as e:
+            return 500, self.app_flask.json.response({'erro': str(e)}).get_data(), 'application/json', []
+        ultima = transacoes[-1] if len(transacoes) == limite else None
+        corpo = self.app_flask.json.response({'transacoes': transacoes,
+                                              'proximo_cursor': f"{ultima['data_epoch']}|{ultima['id']}" if ultima else None}).get_data()
+        etag = generate_etag(corpo)
+        if parse_etags(cabecalhos.get('if-none-match')).contains(etag): return 304, b'', 'application/json', [('etag', quote_etag(etag))]
+        return 200, corpo, 'application/json', [('etag', quote_etag(etag))]
+
+
+def criar_app_asgi(configuracao=None):
+    """Aplicação ASGI com a mesma configuração de app_web.criar_app ("uvicorn --factory app_asgi:criar_app_asgi")."""
+    app_flask = criar_app(configuracao)
+    return AplicacaoAsgi(app_flask, app_flask.config['THREADS_BANCO'])
+
+
+if __name__ == '__main__':
+    import argparse
+    import uvicorn
+    parser = argparse.ArgumentParser(description="Controle financeiro - servidor ASGI (uvicorn).")
+    parser.add_argument('--banco', default=None, help="arquivo do banco (padrão: FINANCEIRO_BANCO_DADOS ou controle_financeiro.db)")
+    parser.add_argument('--porta', type=int, default=8000)
+    args = parser.parse_args()
+    uvicorn.run(criar_app_asgi({'BANCO_DADOS': args.banco} if args.banco else None), port=args.porta, log_level='warning')
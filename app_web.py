@@ -1,90 +1,457 @@
-import sqlite3
 import datetime
-from flask import Flask, render_template, request, redirect, url_for # Novas importações!
-
-# --- LÓGICA DO BANCO DE DADOS (Inalterada) ---
-NOME_BANCO_DADOS = 'controle_financeiro.db'
-
-def conectar_bd():
-    conn = sqlite3.connect(NOME_BANCO_DADOS)
-    conn.row_factory = sqlite3.Row
-    return conn, conn.cursor()
-
-def inicializar_banco_de_dados():
-    conn, cursor = conectar_bd()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS transacoes_tb (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            tipo TEXT NOT NULL,
-            descricao TEXT NOT NULL,
-            valor REAL NOT NULL,
-            categoria TEXT,
-            data_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    conn.commit()
-    conn.close()
-
-def buscar_transacoes_db(ano=None, mes=None):
-    conn, cursor = conectar_bd()
-    try:
-        query = "SELECT id, tipo, descricao, valor, categoria, data_registro FROM transacoes_tb"
-        params = []
-        conditions = []
-        if ano: conditions.append("strftime('%Y', data_registro) = ?"); params.append(str(ano))
-        if mes: conditions.append("strftime('%m', data_registro) = ?"); params.append(f"{int(mes):02d}")
-        if conditions: query += " WHERE " + " AND ".join(conditions)
-        query += " ORDER BY data_registro DESC, id DESC"
-        cursor.execute(query, params)
-        return [dict(linha) for linha in cursor.fetchall()]
-    except sqlite3.Error as e: print(f"Erro: {e}"); raise e
-    finally: conn.close()
-
-def adicionar_despesa_db(descricao, valor, categoria):
-    conn, cursor = conectar_bd()
-    try:
-        data_atual_iso = datetime.datetime.now().isoformat()
-        cursor.execute("INSERT INTO transacoes_tb (tipo, descricao, valor, categoria, data_registro) VALUES (?, ?, ?, ?, ?)",
-                       ('despesa', descricao, valor, categoria, data_atual_iso))
-        conn.commit(); return True
-    except sqlite3.Error as e: conn.rollback(); raise e
-    finally: conn.close()
+import functools
+import os
+import sqlite3
+from flask import Flask, Blueprint, Response, render_template, stream_template, stream_with_context, request, redirect, url_for, jsonify, make_response # Novas importações!
+
+# --- LÓGICA DO BANCO DE DADOS (compartilhada em banco_dados.py) ---
+from banco_dados import (NOME_BANCO_DADOS, configurar_banco_dados, inicializar_banco_de_dados, buscar_pagina_transacoes_db, listar_pagina_transacoes_db, buscar_texto_db, resumir_transacoes_db, adicionar_despesa_db,
+                         adicionar_transacoes_lote_db, _buscar_transacao_por_id_db, editar_transacao_db, excluir_transacao_db,
+                         autocompletar_categorias, criar_recorrencia_db, listar_recorrencias_db, encerrar_recorrencia_db,
+                         materializar_recorrencias_db, cache_consultas, ler_versao_dados_db, liberar_conexao_bd,
+                         escritor_em_grupo, iniciar_escrita_em_grupo, parar_escrita_em_grupo)
+from cache_http import CacheRespostas
+from exportador import FORMATOS as FORMATOS_EXPORTACAO, gerar_exportacao
+from dinheiro import MAXIMO_CENTAVOS, para_centavos, formatar_centavos
+from recorrencias import FREQUENCIAS, ANO_MINIMO, ANO_MAXIMO, horizonte_recorrencias, periodo_valido
+from projecao import NUMPY_DISPONIVEL, MESES_HISTORICO_PADRAO, ErroProjecao, projetar_fluxo_caixa
+from relatorios import GRAFICOS, gerar_relatorio, gerar_graficos_svg
+
+# --- CONFIGURAÇÃO ---
+# Valores padrão, sobrescritos por variáveis de ambiente FINANCEIRO_<CHAVE> (ex.:
+# FINANCEIRO_BANCO_DADOS=/dados/financas.db FINANCEIRO_WORKERS=4) e pelo dict passado a criar_app.
+# WORKERS, THREADS e ENDERECO são lidos pelo gunicorn.conf.py; TAMANHO_POOL deve cobrir THREADS.
+PREFIXO_AMBIENTE = 'FINANCEIRO_'
+CONFIGURACAO_PADRAO = {
+    'BANCO_DADOS': NOME_BANCO_DADOS,
+    'TAMANHO_POOL': 8,        # conexões mantidas abertas por processo
+    'TIMEOUT_BANCO': 5.0,     # segundos que uma escrita espera o lock de outro worker
+    'WORKERS': 2,             # processos; o SQLite aceita um escritor por vez, mais que isso só ajuda leituras
+    'THREADS': 4,             # threads por processo
+    'ENDERECO': '127.0.0.1:8000',
+    'THREADS_BANCO': 8,       # app_asgi: threads do executor que roda as chamadas ao sqlite3
+    'CACHE_HTTP': 1,          # 0 desliga o cache de respostas
+    'CACHE_HTTP_LIMITE_BYTES': 32 * 1024 * 1024,
+    'CACHE_HTTP_DIRETORIO': '',                        # vazio: só em memória; com vários workers, um diretório compartilhado
+    'CACHE_HTTP_LIMITE_DISCO': 256 * 1024 * 1024,
+    'ESCRITA_EM_GRUPO': 0,    # 1: POSTs de transações confirmados em lotes por uma thread escritora (ver escrita_em_grupo)
+    'ESCRITA_GRUPO_LOTE': 256,         # pedidos por commit, no máximo
+    'ESCRITA_GRUPO_ESPERA_MS': 0.0,    # quanto o escritor espera por mais pedidos depois do primeiro (0: só os já na fila)
+}
+
+def carregar_configuracao(configuracao=None):
+    """CONFIGURACAO_PADRAO com as variáveis de ambiente e `configuracao` aplicadas, nessa ordem."""
+    resultado = dict(CONFIGURACAO_PADRAO)
+    for chave, padrao in CONFIGURACAO_PADRAO.items():
+        valor = os.environ.get(PREFIXO_AMBIENTE + chave)
+        if valor is not None: resultado[chave] = type(padrao)(valor)
+    resultado.update(configuracao or {})
+    return resultado
 
 # --- APLICAÇÃO WEB COM FLASK ---
-app = Flask(__name__)
+# As rotas ficam num blueprint; criar_app monta a aplicação de cada processo.
+rotas = Blueprint('rotas', __name__)
+rotas.add_app_template_filter(formatar_centavos, 'reais')   # {{ t.valor_centavos|reais }} -> "12.34"
+
+def criar_app(configuracao=None):
+    """Cria a aplicação (no gunicorn: "app_web:criar_app()", ver gunicorn.conf.py).
+
+    Roda uma vez em cada worker: aponta o banco_dados para o arquivo configurado e aplica as
+    migrações pendentes, o que é seguro com vários workers subindo ao mesmo tempo.
+    """
+    app = Flask(__name__)
+    app.config.update(carregar_configuracao(configuracao))
+    configurar_banco_dados(app.config['BANCO_DADOS'], app.config['TAMANHO_POOL'], app.config['TIMEOUT_BANCO'])
+    inicializar_banco_de_dados()
+    autocompletar_categorias.carregar()
+    liberar_conexao_bd()
+    cache_respostas.ativo = bool(app.config['CACHE_HTTP'])
+    cache_respostas.limite_bytes = app.config['CACHE_HTTP_LIMITE_BYTES']
+    cache_respostas.configurar(os.path.abspath(app.config['BANCO_DADOS']), app.config['CACHE_HTTP_DIRETORIO'], app.config['CACHE_HTTP_LIMITE_DISCO'])
+    if app.config['ESCRITA_EM_GRUPO']: iniciar_escrita_em_grupo(app.config['ESCRITA_GRUPO_LOTE'], app.config['ESCRITA_GRUPO_ESPERA_MS'])
+    else: parar_escrita_em_grupo()
+    app.register_blueprint(rotas)
+    app.teardown_appcontext(devolver_conexao)
+    return app
+
+def devolver_conexao(exc):
+    # O servidor cria uma thread por requisição; devolve a conexão ao pool ao final.
+    liberar_conexao_bd()
+
+ERRO_PERIODO = f"período inválido: ano entre {ANO_MINIMO} e {ANO_MAXIMO} e mes entre 1 e 12"
+
+def _periodo_consultado(view):
+    # Rotas que leem um período (?ano=&mes=): recusam período inválido e, antes da consulta,
+    # gravam as ocorrências recorrentes até o fim dele (no máximo HORIZONTE_MESES_MAXIMO meses à
+    # frente; além disso elas são calculadas na leitura). Sem nada pendente é só uma leitura num índice.
+    @functools.wraps(view)
+    def com_periodo(*args, **kwargs):
+        ano, mes = request.args.get('ano', type=int), request.args.get('mes', type=int)
+        if not periodo_valido(ano, mes): return jsonify({'erro': ERRO_PERIODO}), 400
+        materializar_recorrencias_db(horizonte_recorrencias(ano, mes))
+        return view(*args, **kwargs)
+    return com_periodo
+
+# --- CACHE DE RESPOSTAS ---
+# GETs que só dependem dos parâmetros e dos dados: a resposta montada é guardada por
+# (caminho, parâmetros, versao_dados) e servida sem tocar no template nem nas consultas até a
+# próxima escrita. Cache-Control: no-cache faz o navegador sempre revalidar, recebendo 304.
+cache_respostas = CacheRespostas()
 
-@app.route('/')
+def _resposta_em_cache(view):
+    @functools.wraps(view)
+    def em_cache(*args, **kwargs):
+        if not cache_respostas.ativo: return view(*args, **kwargs)
+        versao, parametros = ler_versao_dados_db(), list(request.args.items(multi=True))
+        guardada = cache_respostas.obter(request.path, parametros, versao)
+        if guardada is None:
+            resposta = make_response(view(*args, **kwargs))
+            # Erros, 304 (o cliente já tinha a versão) e streaming não são guardados.
+            if resposta.status_code != 200 or resposta.is_streamed: return resposta
+            guardada = cache_respostas.guardar(request.path, parametros, versao, resposta.get_data(), resposta.content_type)
+        resposta = Response(guardada.corpo, content_type=guardada.tipo)
+        resposta.set_etag(guardada.etag)
+        resposta.headers['Cache-Control'] = 'no-cache'
+        return resposta.make_conditional(request)
+    return em_cache
+
+LIMITE_PADRAO_PAGINA = 50
+LIMITE_MAXIMO_PAGINA = 500
+
+def _decodificar_cursor(cursor_texto):
+    # Cursor da paginação: "<data_epoch>|<id>" da última linha da página anterior (id negativo: ocorrência prevista).
+    if not cursor_texto: return None
+    epoch_texto, _, id_texto = cursor_texto.partition('|')
+    return (int(epoch_texto), int(id_texto)) if epoch_texto.lstrip('-').isdigit() and id_texto.lstrip('-').isdigit() else None
+
+@rotas.route('/')
+@_periodo_consultado
+@_resposta_em_cache
 def pagina_inicial():
+    # ?limite=50&cursor=...&ano=&mes= ; ?stream=1 envia o HTML aos poucos enquanto lê o banco.
+    ano = request.args.get('ano', type=int)
+    mes = request.args.get('mes', type=int)
+    limite = min(max(request.args.get('limite', LIMITE_PADRAO_PAGINA, type=int), 1), LIMITE_MAXIMO_PAGINA)
+    stream = request.args.get('stream', type=int)
+    try:
+        apos = _decodificar_cursor(request.args.get('cursor'))
+        contexto = dict(limite=limite, ano=ano, mes=mes, stream=stream)
+        if stream:
+            return Response(stream_template('index.html', transacoes=buscar_pagina_transacoes_db(ano=ano, mes=mes, limite=limite, apos=apos), **contexto))
+        # Sem streaming a página vem do cache de consultas (invalidado pelas escritas do período).
+        return render_template('index.html', transacoes=listar_pagina_transacoes_db(ano, mes, limite=limite, apos=apos), **contexto)
+    except Exception as e:
+        return f"<h1>Ocorreu um Erro</h1><p>Não foi possível buscar as transações: {e}</p>", 500
+
+@rotas.route('/buscar')
+@_periodo_consultado
+def buscar_transacoes():
+    # Busca por texto na descrição/categoria (FTS5), da mais relevante para a menos: ?q=mercado&ano=&mes=&limite=
+    # Responde JSON a quem pede application/json (ou ?formato=json) e HTML ao navegador.
+    texto = request.args.get('q', '').strip()
+    ano = request.args.get('ano', type=int)
+    mes = request.args.get('mes', type=int)
+    limite = min(max(request.args.get('limite', LIMITE_PADRAO_PAGINA, type=int), 1), LIMITE_MAXIMO_PAGINA)
+    quer_json = request.args.get('formato') == 'json' or request.accept_mimetypes.best_match(['text/html', 'application/json']) == 'application/json'
+    try:
+        transacoes = buscar_texto_db(texto, ano=ano, mes=mes, limite=limite)
+    except sqlite3.Error as e:
+        if quer_json: return jsonify({'erro': str(e)}), 500
+        return f"<h1>Ocorreu um Erro</h1><p>Não foi possível buscar as transações: {e}</p>", 500
+    if quer_json: return _json_condicional({'q': texto, 'transacoes': transacoes})
+    return render_template('index.html', transacoes=transacoes, busca=texto, limite=limite, ano=ano, mes=mes, stream=None)
+
+@rotas.route('/resumo')
+@_periodo_consultado
+@_resposta_em_cache
+def resumo_periodo():
+    # Totais e quebras por categoria/mês já agregados no banco: ?ano=2025&mes=6 (ambos opcionais)
+    ano = request.args.get('ano', type=int)
+    mes = request.args.get('mes', type=int)
     try:
-        transacoes_do_banco = buscar_transacoes_db()
-        for transacao in transacoes_do_banco:
-            data_obj = datetime.datetime.fromisoformat(transacao['data_registro'])
-            transacao['data_formatada'] = data_obj.strftime('%d/%m/%Y')
-        return render_template('index.html', transacoes=transacoes_do_banco)
+        return _json_condicional(resumir_transacoes_db(ano=ano, mes=mes))
     except Exception as e:
-        return f"<h1>Ocorreu um Erro</h1><p>Não foi possível buscar as transações: {e}</p>"
+        return jsonify({'erro': str(e)}), 500
+
+@rotas.route('/relatorios')
+@_periodo_consultado
+@_resposta_em_cache
+def pagina_relatorios():
+    # Gastos por categoria, ganhos/despesas por mês e saldo acumulado: tabelas e gráficos SVG
+    # já prontos no servidor, numa única resposta. ?ano=&mes= (ambos opcionais)
+    ano = request.args.get('ano', type=int)
+    mes = request.args.get('mes', type=int)
+    try:
+        return render_template('relatorios.html', relatorio=gerar_relatorio(ano, mes), graficos=gerar_graficos_svg(ano, mes), ano=ano, mes=mes)
+    except sqlite3.Error as e:
+        return f"<h1>Ocorreu um Erro</h1><p>Não foi possível gerar os relatórios: {e}</p>", 500
+
+@rotas.route('/relatorios/dados')
+@_periodo_consultado
+@_resposta_em_cache
+def dados_relatorios():
+    # As mesmas séries em JSON (centavos); ?svg=1 inclui os gráficos, para montar a tela com uma só requisição.
+    ano = request.args.get('ano', type=int)
+    mes = request.args.get('mes', type=int)
+    try:
+        dados = dict(gerar_relatorio(ano, mes))
+        if request.args.get('svg', type=int): dados['graficos'] = gerar_graficos_svg(ano, mes)
+    except sqlite3.Error as e:
+        return jsonify({'erro': str(e)}), 500
+    return _json_condicional(dados)
+
+@rotas.route('/relatorios/grafico/<nome>.svg')
+@_periodo_consultado
+@_resposta_em_cache
+def grafico_relatorio(nome):
+    # Um gráfico avulso (categorias, mensal ou saldo), para <img src> ou download.
+    if nome not in GRAFICOS: return f"Gráfico desconhecido: {nome}", 404
+    try:
+        svg = gerar_graficos_svg(request.args.get('ano', type=int), request.args.get('mes', type=int))[nome]
+    except sqlite3.Error as e:
+        return f"Não foi possível gerar o gráfico: {e}", 500
+    resposta = Response(svg, mimetype='image/svg+xml')
+    resposta.add_etag()
+    return resposta.make_conditional(request)
+
+@rotas.route('/exportar/<formato>')
+@_periodo_consultado
+def exportar_transacoes(formato):
+    # Download em streaming (csv, jsonl ou colunar): cada lote do cursor é enviado assim que serializado.
+    if formato not in FORMATOS_EXPORTACAO: return f"Formato desconhecido: {formato}", 404
+    ano = request.args.get('ano', type=int)
+    mes = request.args.get('mes', type=int)
+    _, mimetype, extensao = FORMATOS_EXPORTACAO[formato]
+    nome_arquivo = "transacoes" + (f"_{ano}" if ano else "") + (f"_{mes:02d}" if ano and mes else "") + extensao
+    return Response(stream_with_context(gerar_exportacao(formato, ano=ano, mes=mes)), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{nome_arquivo}"'})
+
+# --- API JSON ---
+# Usada pelos importadores automáticos. O POST aceita um objeto ou uma lista; os itens
+# válidos são gravados numa única transação e a resposta traz o resultado de cada um.
+TIPOS_TRANSACAO = ('ganho', 'despesa')
+CAMPOS_EDITAVEIS = ('descricao', 'valor', 'valor_centavos', 'categoria')
+
+def _json_condicional(dados):
+    # ETag calculado sobre o corpo: se o cliente já tem essa versão (If-None-Match), responde 304 sem corpo.
+    resposta = jsonify(dados)
+    resposta.add_etag()
+    return resposta.make_conditional(request)
+
+def _validar_transacao(item, parcial=False):
+    """Retorna (dados, None) com os campos normalizados ou (None, mensagem de erro)."""
+    if not isinstance(item, dict): return None, "cada transação deve ser um objeto JSON"
+    dados = {}
+    if not parcial:
+        tipo = item.get('tipo', 'despesa')
+        if tipo not in TIPOS_TRANSACAO: return None, "tipo deve ser 'ganho' ou 'despesa'"
+        dados['tipo'] = tipo
+    if 'descricao' in item or not parcial:
+        descricao = item.get('descricao')
+        if not isinstance(descricao, str) or not descricao.strip(): return None, "descricao é obrigatória"
+        dados['descricao'] = descricao.strip()
+    # Valor em centavos inteiros (valor_centavos) ou em reais (valor: número ou texto "12.34").
+    if 'valor_centavos' in item:
+        valor_centavos = item['valor_centavos']
+        if isinstance(valor_centavos, bool) or not isinstance(valor_centavos, int) or not 0 < valor_centavos <= MAXIMO_CENTAVOS:
+            return None, f"valor_centavos deve ser um inteiro positivo de até {MAXIMO_CENTAVOS}"
+        dados['valor_centavos'] = valor_centavos
+    elif 'valor' in item or not parcial:
+        valor = item.get('valor')
+        try: dados['valor_centavos'] = para_centavos(valor) if isinstance(valor, (int, float, str)) else None
+        except ValueError: dados['valor_centavos'] = None
+        if dados['valor_centavos'] is None or dados['valor_centavos'] <= 0: return None, "valor deve ser um número positivo"
+    if 'categoria' in item or not parcial:
+        categoria = item.get('categoria')
+        if categoria is not None and not isinstance(categoria, str): return None, "categoria deve ser texto"
+        dados['categoria'] = (categoria or '').strip() or None
+        if not parcial and dados['tipo'] == 'despesa' and not dados['categoria']: return None, "categoria é obrigatória para despesas"
+    if not parcial and item.get('data_registro') is not None:
+        try: dados['data_registro'] = datetime.datetime.fromisoformat(item['data_registro']).isoformat()
+        except (TypeError, ValueError): return None, "data_registro deve estar no formato ISO 8601"
+    return dados, None
+
+@rotas.route('/api/transacoes', methods=['GET'])
+@_periodo_consultado
+@_resposta_em_cache
+def api_listar_transacoes():
+    # Mesma paginação por keyset da página inicial: ?ano=&mes=&limite=&cursor=
+    ano = request.args.get('ano', type=int)
+    mes = request.args.get('mes', type=int)
+    limite = min(max(request.args.get('limite', LIMITE_PADRAO_PAGINA, type=int), 1), LIMITE_MAXIMO_PAGINA)
+    try:
+        transacoes = listar_pagina_transacoes_db(ano, mes, limite=limite, apos=_decodificar_cursor(request.args.get('cursor')))
+    except sqlite3.Error as e:
+        return jsonify({'erro': str(e)}), 500
+    ultima = transacoes[-1] if len(transacoes) == limite else None
+    return _json_condicional({
+        'transacoes': transacoes,
+        'proximo_cursor': f"{ultima['data_epoch']}|{ultima['id']}" if ultima else None,
+    })
+
+@rotas.route('/api/transacoes', methods=['POST'])
+def api_criar_transacoes():
+    corpo = request.get_json(silent=True)
+    if corpo is None: return jsonify({'erro': "corpo deve ser JSON"}), 400
+    itens = corpo if isinstance(corpo, list) else [corpo]
+    resultados, validos = [], []
+    for indice, item in enumerate(itens):
+        dados, erro = _validar_transacao(item)
+        if erro: resultados.append({'indice': indice, 'status': 400, 'erro': erro})
+        else:
+            resultados.append({'indice': indice, 'status': 201})
+            validos.append((resultados[-1], dados))
+    if validos:
+        try: ids = adicionar_transacoes_lote_db([dados for _, dados in validos])
+        except sqlite3.Error as e: return jsonify({'erro': str(e)}), 500
+        for (resultado, _), id_transacao in zip(validos, ids): resultado['id'] = id_transacao
+    status = 201 if len(validos) == len(itens) else (207 if validos else 400)
+    return jsonify({'inseridos': len(validos), 'resultados': resultados}), status
+
+@rotas.route('/api/categorias')
+def api_sugerir_categorias():
+    # Autocompletar: ?q=merc -> nomes já cadastrados, dos mais usados para os menos (servido do cache em memória).
+    limite = min(max(request.args.get('limite', 10, type=int), 1), 100)
+    return jsonify(autocompletar_categorias.sugerir(request.args.get('q', ''), limite=limite))
+
+@rotas.route('/api/cache')
+def api_estatisticas_cache():
+    # Acertos/faltas, ocupação e versão dos dados do cache de consultas, para ajustar limite_bytes/max_entradas;
+    # o cache de respostas HTTP vem na chave 'respostas_http'.
+    return jsonify(dict(cache_consultas.estatisticas(), respostas_http=cache_respostas.estatisticas()))
+
+@rotas.route('/api/escrita')
+def api_estatisticas_escrita():
+    # Escrita em grupo (FINANCEIRO_ESCRITA_EM_GRUPO=1): pedidos por lote, latência p50/p95/p99 até o commit e linhas/s.
+    return jsonify(escritor_em_grupo.estatisticas())
+
+@rotas.route('/api/transacoes/<int:id_transacao>', methods=['GET'])
+def api_obter_transacao(id_transacao):
+    transacao = _buscar_transacao_por_id_db(id_transacao)
+    if transacao is None: return jsonify({'erro': "transação não encontrada"}), 404
+    return _json_condicional(transacao)
+
+@rotas.route('/api/transacoes/<int:id_transacao>', methods=['PATCH'])
+def api_editar_transacao(id_transacao):
+    corpo = request.get_json(silent=True)
+    if not isinstance(corpo, dict): return jsonify({'erro': "corpo deve ser um objeto JSON"}), 400
+    dados, erro = _validar_transacao({campo: corpo[campo] for campo in CAMPOS_EDITAVEIS if campo in corpo}, parcial=True)
+    if erro: return jsonify({'erro': erro}), 400
+    try:
+        transacao = _buscar_transacao_por_id_db(id_transacao)
+        if transacao is None: return jsonify({'erro': "transação não encontrada"}), 404
+        transacao.update(dados)
+        if transacao['tipo'] == 'despesa' and not transacao['categoria']: return jsonify({'erro': "categoria é obrigatória para despesas"}), 400
+        editar_transacao_db(id_transacao, transacao['descricao'], transacao['valor_centavos'], transacao['categoria'])
+    except sqlite3.Error as e:
+        return jsonify({'erro': str(e)}), 500
+    return jsonify(transacao)
+
+@rotas.route('/api/transacoes/<int:id_transacao>', methods=['DELETE'])
+def api_excluir_transacao(id_transacao):
+    try:
+        if not excluir_transacao_db(id_transacao): return jsonify({'erro': "transação não encontrada"}), 404
+    except sqlite3.Error as e:
+        return jsonify({'erro': str(e)}), 500
+    return '', 204
+
+def _validar_recorrencia(item):
+    """Como _validar_transacao, mais frequencia, intervalo, data_inicio, data_fim e total_ocorrencias."""
+    dados, erro = _validar_transacao({campo: valor for campo, valor in item.items() if campo != 'data_registro'})
+    if erro: return None, erro
+    if item.get('frequencia') not in FREQUENCIAS: return None, f"frequencia deve ser {', '.join(FREQUENCIAS)}"
+    dados['frequencia'] = item['frequencia']
+    for campo in ('intervalo', 'total_ocorrencias'):
+        valor = item.get(campo)
+        if valor is not None and (isinstance(valor, bool) or not isinstance(valor, int) or valor <= 0): return None, f"{campo} deve ser um inteiro positivo"
+        dados[campo] = valor
+    dados['intervalo'] = dados['intervalo'] or 1
+    for campo in ('data_inicio', 'data_fim'):
+        try: dados[campo] = datetime.datetime.fromisoformat(item[campo]) if item.get(campo) is not None else None
+        except (TypeError, ValueError): return None, f"{campo} deve estar no formato ISO 8601"
+    dados['data_inicio'] = dados['data_inicio'] or datetime.datetime.now().replace(microsecond=0)
+    if dados['data_fim'] and dados['data_fim'] < dados['data_inicio']: return None, "data_fim deve ser depois de data_inicio"
+    return dados, None
+
+@rotas.route('/api/recorrencias', methods=['GET'])
+def api_listar_recorrencias():
+    return _json_condicional(listar_recorrencias_db())
+
+@rotas.route('/api/recorrencias', methods=['POST'])
+def api_criar_recorrencia():
+    # Grava só a regra; as ocorrências entram em transacoes_tb quando um período que as inclui é consultado.
+    corpo = request.get_json(silent=True)
+    if not isinstance(corpo, dict): return jsonify({'erro': "corpo deve ser um objeto JSON"}), 400
+    dados, erro = _validar_recorrencia(corpo)
+    if erro: return jsonify({'erro': erro}), 400
+    try:
+        id_recorrencia = criar_recorrencia_db(dados['tipo'], dados['descricao'], dados['valor_centavos'], dados['categoria'], dados['frequencia'],
+                                              dados['data_inicio'], dados['intervalo'], dados['data_fim'], dados['total_ocorrencias'])
+        materializar_recorrencias_db()
+    except sqlite3.Error as e:
+        return jsonify({'erro': str(e)}), 500
+    return jsonify({'id': id_recorrencia}), 201
+
+@rotas.route('/api/recorrencias/<int:id_recorrencia>', methods=['DELETE'])
+def api_encerrar_recorrencia(id_recorrencia):
+    # Encerra a regra agora (ou em ?data_fim=ISO); ocorrências já passadas continuam gravadas.
+    try: data_fim = datetime.datetime.fromisoformat(request.args['data_fim']) if request.args.get('data_fim') else None
+    except ValueError: return jsonify({'erro': "data_fim deve estar no formato ISO 8601"}), 400
+    try:
+        apagadas = encerrar_recorrencia_db(id_recorrencia, data_fim)
+    except sqlite3.Error as e:
+        return jsonify({'erro': str(e)}), 500
+    if apagadas is None: return jsonify({'erro': "recorrência não encontrada"}), 404
+    return jsonify({'ocorrencias_apagadas': apagadas})
+
+@rotas.route('/api/projecao')
+def api_projecao():
+    # Saldo projetado mês a mês: ?anos=1..10&historico=<meses usados como base>&tendencia=1
+    if not NUMPY_DISPONIVEL: return jsonify({'erro': "projeção indisponível: NumPy não instalado"}), 501
+    try:
+        resultado = projetar_fluxo_caixa(request.args.get('anos', 5, type=int), request.args.get('historico', MESES_HISTORICO_PADRAO, type=int),
+                                         request.args.get('tendencia', '').lower() in ('1', 'true', 'sim'))
+    except ErroProjecao as e:
+        return jsonify({'erro': str(e)}), 400
+    except sqlite3.Error as e:
+        return jsonify({'erro': str(e)}), 500
+    return _json_condicional(resultado)
+
+LIMITE_SUGESTOES_FORMULARIO = 50
+
+ERRO_FORMULARIO_DESPESA = "Erro: Todos os campos são obrigatórios e o valor deve ser positivo."
+
+def _ler_formulario_despesa(formulario):
+    """(descricao, valor_centavos, categoria) do formulário, ou None se algum campo faltar ou for inválido."""
+    descricao, categoria = formulario.get('descricao', ''), formulario.get('categoria', '')
+    try: valor_centavos = para_centavos(formulario.get('valor', ''))
+    except ValueError: return None   # ex.: "abc" ou fora do limite: erro de quem preencheu, não do servidor
+    if not descricao or valor_centavos <= 0 or not categoria: return None
+    return descricao, valor_centavos, categoria
 
 # ESTA É A NOVA ROTA QUE DÁ VIDA AO BOTÃO
-@app.route('/despesa/nova', methods=['GET', 'POST'])
+@rotas.route('/despesa/nova', methods=['GET', 'POST'])
 def adicionar_despesa_web():
+    categorias = autocompletar_categorias.sugerir(limite=LIMITE_SUGESTOES_FORMULARIO)
     if request.method == 'POST':
+        despesa = _ler_formulario_despesa(request.form)
+        # Entrada inválida: o formulário volta com a mensagem e o que foi digitado.
+        if despesa is None: return render_template('form_despesa.html', categorias=categorias, erro=ERRO_FORMULARIO_DESPESA, valores=request.form), 400
         try:
-            descricao = request.form['descricao']
-            valor = float(request.form['valor'])
-            categoria = request.form['categoria']
-
-            if not descricao or valor <= 0 or not categoria:
-                return "Erro: Todos os campos são obrigatórios e o valor deve ser positivo.", 400
-
-            adicionar_despesa_db(descricao, valor, categoria)
-            
-            return redirect(url_for('pagina_inicial'))
-        except Exception as e:
-            return f"<h1>Ocorreu um Erro ao Salvar</h1><p>Não foi possível salvar a despesa: {e}</p>"
+            adicionar_despesa_db(*despesa)
+        except sqlite3.Error as e:
+            return f"<h1>Ocorreu um Erro ao Salvar</h1><p>Não foi possível salvar a despesa: {e}</p>", 500
+        return redirect(url_for('.pagina_inicial'))
     
-    # Se o método for GET, apenas mostra o formulário
-    return render_template('form_despesa.html')
+    # Se o método for GET, apenas mostra o formulário (com as categorias existentes como sugestão)
+    return render_template('form_despesa.html', categorias=categorias, valores={})
 
 if __name__ == '__main__':
-    inicializar_banco_de_dados()
-    app.run(debug=True)
\ No newline at end of file
+    # Servidor de desenvolvimento (um processo). Em produção: gunicorn, que lê gunicorn.conf.py.
+    import argparse
+    parser = argparse.ArgumentParser(description="Controle financeiro - servidor web de desenvolvimento.")
+    parser.add_argument('--banco', default=None, help="arquivo do banco (padrão: FINANCEIRO_BANCO_DADOS ou controle_financeiro.db)")
+    parser.add_argument('--porta', type=int, default=5000)
+    parser.add_argument('--sem-debug', action='store_true')
+    args = parser.parse_args()
+    criar_app({'BANCO_DADOS': args.banco} if args.banco else None).run(port=args.porta, debug=not args.sem_debug)
\ No newline at end of file
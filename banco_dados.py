@@ -0,0 +1,1016 @@
+import os
+import re
+import heapq
+import sqlite3
+import datetime
+import threading
+import uuid
+from calendar import timegm
+from functools import partial
+from itertools import islice
+
+from cache_consultas import CacheConsultas
+from escrita_em_grupo import EscritorEmGrupo, EscritorParado
+from categorias import AutocompletarCategorias, normalizar_categoria, limpar_nome_categoria
+from recorrencias import FREQUENCIAS, data_da_ocorrencia, ocorrencias, horizonte_recorrencias, intervalo_periodo, periodo_valido
+
+# --- CAMADA DE ACESSO AOS DADOS (compartilhada pela GUI e pela Web) ---
+NOME_BANCO_DADOS = 'controle_financeiro.db'
+
+# Pragmas aplicados a cada conexão nova. journal_mode=WAL é persistente no arquivo,
+# os demais valem só para a conexão.
+PRAGMAS_CONEXAO = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",    # seguro com WAL, evita fsync a cada commit
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",     # ~16 MB de cache de páginas
+    "PRAGMA mmap_size = 268435456",   # 256 MB mapeados em memória
+)
+TIMEOUT_INICIALIZACAO = 60.0   # segundos esperando outro processo terminar as migrações
+
+
+class PoolConexoes:
+    """Pool thread-safe: cada thread reaproveita a mesma conexão enquanto estiver viva.
+
+    `timeout` é quanto uma escrita espera pelo lock de outra conexão (ou processo) antes de
+    falhar com "database is locked".
+    """
+
+    def __init__(self, caminho, tamanho_maximo=8, timeout=5.0):
+        self.caminho = caminho
+        self.tamanho_maximo = tamanho_maximo
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._em_uso = {}   # thread -> conexão
+        self._livres = []   # conexões devolvidas, prontas para outra thread
+        self._pid = os.getpid()
+        self._herdadas = []   # conexões do processo pai após um fork, nunca usadas nem fechadas
+
+    def _abrir(self):
+        # check_same_thread=False porque uma conexão livre pode ser adotada por outra thread;
+        # o pool garante que só uma thread a usa por vez.
+        conn = sqlite3.connect(self.caminho, timeout=self.timeout, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for pragma in PRAGMAS_CONEXAO: conn.execute(pragma)
+        return conn
+
+    def _recuperar_de_threads_mortas(self):
+        for thread in [t for t in self._em_uso if not t.is_alive()]:
+            self._livres.append(self._em_uso.pop(thread))
+
+    def _depois_do_fork(self):
+        # Um servidor com workers pré-fork (ex.: gunicorn --preload) copia o pool do processo pai.
+        # Conexão SQLite não atravessa fork: as herdadas ficam guardadas sem uso (fechá-las no
+        # filho mexeria no estado do arquivo que o pai ainda usa) e o filho abre as suas.
+        self._herdadas.extend(list(self._em_uso.values()) + self._livres)
+        self._local, self._lock = threading.local(), threading.Lock()
+        self._em_uso, self._livres = {}, []
+        self._pid = os.getpid()
+
+    def obter(self):
+        if self._pid != os.getpid(): self._depois_do_fork()
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None: return conn
+        with self._lock:
+            self._recuperar_de_threads_mortas()
+            conn = self._livres.pop() if self._livres else None
+            if conn is None: conn = self._abrir()
+            self._em_uso[threading.current_thread()] = conn
+        self._local.conn = conn
+        return conn
+
+    def liberar(self):
+        """Devolve a conexão da thread atual ao pool (ex.: fim de uma requisição web)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None: return
+        self._local.conn = None
+        if conn.in_transaction: conn.rollback()
+        with self._lock:
+            self._em_uso.pop(threading.current_thread(), None)
+            if len(self._livres) < self.tamanho_maximo: self._livres.append(conn); conn = None
+        if conn is not None: conn.close()
+
+    def fechar_todas(self):
+        with self._lock:
+            for conn in list(self._em_uso.values()) + self._livres: conn.close()
+            self._em_uso.clear(); self._livres.clear()
+        self._local = threading.local()
+
+
+_pool = PoolConexoes(NOME_BANCO_DADOS)
+
+def configurar_banco_dados(caminho, tamanho_pool=8, timeout=5.0):
+    """Troca o arquivo do banco (e recria o pool). Usado pela aplicação web, testes e benchmarks."""
+    global NOME_BANCO_DADOS, _pool
+    _pool.fechar_todas()
+    NOME_BANCO_DADOS = caminho
+    _pool = PoolConexoes(caminho, tamanho_maximo=tamanho_pool, timeout=timeout)
+    cache_consultas.invalidar()
+    cache_consultas.versao_banco = None   # a versão do outro arquivo não vale para este
+
+def conectar_bd():
+    conn = _pool.obter()
+    return conn, conn.cursor()
+
+def liberar_conexao_bd():
+    _pool.liberar()
+
+def fechar_conexoes_bd():
+    _pool.fechar_todas()
+
+# Leitura das transações já com o nome da categoria (transacoes_tb guarda só o categoria_id).
+_SQL_FROM_TRANSACOES = "transacoes_tb t LEFT JOIN categorias c ON c.id = t.categoria_id"
+
+# --- MIGRAÇÕES DE ESQUEMA ---
+# Cada função leva o banco da versão N-1 para N (PRAGMA user_version = posição na lista).
+def _migracao_colunas_periodo(cursor):
+    # Colunas ano/mes indexáveis: strftime('%Y', data_registro) = ? não usa índice e varria a tabela inteira.
+    cursor.execute("ALTER TABLE transacoes_tb ADD COLUMN ano INTEGER")
+    cursor.execute("ALTER TABLE transacoes_tb ADD COLUMN mes INTEGER")
+    cursor.execute("""UPDATE transacoes_tb SET ano = CAST(strftime('%Y', data_registro) AS INTEGER),
+                                               mes = CAST(strftime('%m', data_registro) AS INTEGER)""")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_transacoes_periodo ON transacoes_tb (ano, mes, data_registro)")
+
+# As colunas de valor/total/categoria são parâmetros porque as migrações de centavos e de
+# categorias trocaram os nomes; as migrações antigas continuam criando o esquema da época.
+# Sem categoria (ganhos) a chave usa `sem_categoria` ('' ou 0) para o ON CONFLICT funcionar.
+def _criar_gatilhos_resumo(cursor, valor='valor_centavos', total='total_centavos', categoria='categoria_id', sem_categoria='0'):
+    """Triggers que mantêm resumo_mensal a cada INSERT/UPDATE/DELETE em transacoes_tb."""
+    chave_new = f"COALESCE(NEW.ano, 0), COALESCE(NEW.mes, 0), NEW.tipo, COALESCE(NEW.{categoria}, {sem_categoria})"
+    filtro_old = f"ano = COALESCE(OLD.ano, 0) AND mes = COALESCE(OLD.mes, 0) AND tipo = OLD.tipo AND {categoria} = COALESCE(OLD.{categoria}, {sem_categoria})"
+    somar_new = f"""
+        INSERT INTO resumo_mensal (ano, mes, tipo, {categoria}, {total}, quantidade)
+        VALUES ({chave_new}, NEW.{valor}, 1)
+        ON CONFLICT (ano, mes, tipo, {categoria}) DO UPDATE SET {total} = {total} + excluded.{total}, quantidade = quantidade + 1;"""
+    subtrair_old = f"""
+        UPDATE resumo_mensal SET {total} = {total} - OLD.{valor}, quantidade = quantidade - 1 WHERE {filtro_old};
+        DELETE FROM resumo_mensal WHERE quantidade <= 0 AND {filtro_old};"""
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_resumo_insert AFTER INSERT ON transacoes_tb BEGIN {somar_new} END")
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_resumo_delete AFTER DELETE ON transacoes_tb BEGIN {subtrair_old} END")
+    cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_resumo_update AFTER UPDATE OF tipo, {valor}, {categoria}, ano, mes ON transacoes_tb
+                       BEGIN {subtrair_old} {somar_new} END""")
+
+def _sql_reconstruir_resumo(valor='valor_centavos', total='total_centavos', categoria='categoria_id', sem_categoria='0'):
+    return f"""
+    INSERT INTO resumo_mensal (ano, mes, tipo, {categoria}, {total}, quantidade)
+    SELECT COALESCE(ano, 0), COALESCE(mes, 0), tipo, COALESCE({categoria}, {sem_categoria}), SUM({valor}), COUNT(*)
+    FROM transacoes_tb GROUP BY 1, 2, 3, 4"""
+
+def _migracao_resumo_mensal(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS resumo_mensal (
+            ano INTEGER NOT NULL,
+            mes INTEGER NOT NULL,
+            tipo TEXT NOT NULL,
+            categoria TEXT NOT NULL DEFAULT '',
+            total REAL NOT NULL DEFAULT 0,
+            quantidade INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (ano, mes, tipo, categoria)
+        ) WITHOUT ROWID""")
+    cursor.execute("DELETE FROM resumo_mensal")
+    cursor.execute(_sql_reconstruir_resumo(valor='valor', total='total', categoria='categoria', sem_categoria="''"))
+    _criar_gatilhos_resumo(cursor, valor='valor', total='total', categoria='categoria', sem_categoria="''")
+
+def _migracao_compra_parcelada(cursor):
+    # Parcelas de uma mesma compra compartilham compra_id.
+    cursor.execute("ALTER TABLE transacoes_tb ADD COLUMN compra_id TEXT")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_transacoes_compra ON transacoes_tb (compra_id) WHERE compra_id IS NOT NULL")
+
+def _migracao_indice_data(cursor):
+    # Serve a listagem sem filtro em ORDER BY data_registro DESC, id DESC (e a paginação por keyset).
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_transacoes_data ON transacoes_tb (data_registro)")
+
+def _migracao_hash_importacao(cursor):
+    # Impressão digital das linhas vindas de extratos: o índice único faz o INSERT OR IGNORE descartar reimportações.
+    cursor.execute("ALTER TABLE transacoes_tb ADD COLUMN hash_importacao TEXT")
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_transacoes_hash ON transacoes_tb (hash_importacao) WHERE hash_importacao IS NOT NULL")
+
+def _migracao_centavos(cursor):
+    # Dinheiro em centavos inteiros: SUM de REAL acumulava erro de arredondamento ao longo das linhas.
+    for gatilho in ('trg_resumo_insert', 'trg_resumo_delete', 'trg_resumo_update'): cursor.execute(f"DROP TRIGGER IF EXISTS {gatilho}")
+    cursor.execute("ALTER TABLE transacoes_tb ADD COLUMN valor_centavos INTEGER NOT NULL DEFAULT 0")
+    cursor.execute("UPDATE transacoes_tb SET valor_centavos = CAST(ROUND(valor * 100) AS INTEGER)")
+    cursor.execute("ALTER TABLE transacoes_tb DROP COLUMN valor")
+    cursor.execute("DROP TABLE resumo_mensal")
+    cursor.execute("""
+        CREATE TABLE resumo_mensal (
+            ano INTEGER NOT NULL,
+            mes INTEGER NOT NULL,
+            tipo TEXT NOT NULL,
+            categoria TEXT NOT NULL DEFAULT '',
+            total_centavos INTEGER NOT NULL DEFAULT 0,
+            quantidade INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (ano, mes, tipo, categoria)
+        ) WITHOUT ROWID""")
+    cursor.execute(_sql_reconstruir_resumo(categoria='categoria', sem_categoria="''"))
+    _criar_gatilhos_resumo(cursor, categoria='categoria', sem_categoria="''")
+
+def _migracao_data_epoch(cursor):
+    # Instante canônico em segundos (data "ingênua" tratada como UTC, como faz o SQLite): data_registro
+    # misturava 'AAAA-MM-DD HH:MM:SS' (CURRENT_TIMESTAMP) e isoformat() com 'T', e a ordenação por texto
+    # comparava formatos diferentes. Os índices de data passam a usar a coluna inteira.
+    cursor.execute("ALTER TABLE transacoes_tb ADD COLUMN data_epoch INTEGER")
+    cursor.execute("UPDATE transacoes_tb SET data_epoch = CAST(strftime('%s', data_registro) AS INTEGER)")
+    cursor.execute("DROP INDEX IF EXISTS idx_transacoes_data")
+    cursor.execute("DROP INDEX IF EXISTS idx_transacoes_periodo")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_transacoes_epoch ON transacoes_tb (data_epoch)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_transacoes_periodo_epoch ON transacoes_tb (ano, mes, data_epoch)")
+
+def _migracao_busca_texto(cursor):
+    # Índice FTS5 de conteúdo externo (o texto fica só em transacoes_tb), mantido pelos triggers.
+    # remove_diacritics: "cafe" encontra "Café"; prefix: o último termo digitado é buscado como prefixo.
+    cursor.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS transacoes_fts USING fts5(
+                          descricao, categoria, content='transacoes_tb', content_rowid='id',
+                          tokenize='unicode61 remove_diacritics 2', prefix='2 3')""")
+    cursor.execute("""CREATE TRIGGER IF NOT EXISTS trg_fts_insert AFTER INSERT ON transacoes_tb BEGIN
+                          INSERT INTO transacoes_fts (rowid, descricao, categoria) VALUES (NEW.id, NEW.descricao, NEW.categoria);
+                      END""")
+    cursor.execute("""CREATE TRIGGER IF NOT EXISTS trg_fts_delete AFTER DELETE ON transacoes_tb BEGIN
+                          INSERT INTO transacoes_fts (transacoes_fts, rowid, descricao, categoria) VALUES ('delete', OLD.id, OLD.descricao, OLD.categoria);
+                      END""")
+    cursor.execute("""CREATE TRIGGER IF NOT EXISTS trg_fts_update AFTER UPDATE OF descricao, categoria ON transacoes_tb BEGIN
+                          INSERT INTO transacoes_fts (transacoes_fts, rowid, descricao, categoria) VALUES ('delete', OLD.id, OLD.descricao, OLD.categoria);
+                          INSERT INTO transacoes_fts (rowid, descricao, categoria) VALUES (NEW.id, NEW.descricao, NEW.categoria);
+                      END""")
+    cursor.execute("INSERT INTO transacoes_fts (transacoes_fts) VALUES ('rebuild')")
+
+def _migracao_categorias(cursor):
+    # Categoria vira dimensão: transacoes_tb guarda só categoria_id. Grafias equivalentes
+    # (normalizar_categoria) são unificadas, ficando com a mais usada como nome.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS categorias (
+            id INTEGER PRIMARY KEY,
+            nome TEXT NOT NULL,
+            nome_normalizado TEXT NOT NULL UNIQUE
+        )""")
+    cursor.execute("ALTER TABLE transacoes_tb ADD COLUMN categoria_id INTEGER REFERENCES categorias (id)")
+    cursor.execute("CREATE TEMP TABLE mapa_categorias (categoria TEXT PRIMARY KEY, categoria_id INTEGER NOT NULL)")
+    cursor.execute("SELECT categoria, COUNT(*) FROM transacoes_tb WHERE categoria IS NOT NULL GROUP BY categoria ORDER BY 2 DESC, 1")
+    for categoria, _ in cursor.fetchall():
+        if not categoria.strip(): continue
+        cursor.execute("INSERT INTO categorias (nome, nome_normalizado) VALUES (?, ?) ON CONFLICT (nome_normalizado) DO NOTHING",
+                       (limpar_nome_categoria(categoria), normalizar_categoria(categoria)))
+        cursor.execute("INSERT INTO mapa_categorias SELECT ?, id FROM categorias WHERE nome_normalizado = ?", (categoria, normalizar_categoria(categoria)))
+    cursor.execute("UPDATE transacoes_tb SET categoria_id = (SELECT categoria_id FROM mapa_categorias m WHERE m.categoria = transacoes_tb.categoria) "
+                   "WHERE categoria IS NOT NULL")
+    cursor.execute("DROP TABLE temp.mapa_categorias")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_transacoes_categoria ON transacoes_tb (categoria_id) WHERE categoria_id IS NOT NULL")
+
+    # Triggers e índice de busca dependiam da coluna de texto: saem antes do DROP COLUMN.
+    for gatilho in ('trg_resumo_insert', 'trg_resumo_delete', 'trg_resumo_update', 'trg_fts_insert', 'trg_fts_delete', 'trg_fts_update'):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {gatilho}")
+    cursor.execute("DROP TABLE IF EXISTS transacoes_fts")
+    cursor.execute("ALTER TABLE transacoes_tb DROP COLUMN categoria")
+
+    # Resumo passa a ser chaveado pelo inteiro (0 = sem categoria).
+    cursor.execute("DROP TABLE resumo_mensal")
+    cursor.execute("""
+        CREATE TABLE resumo_mensal (
+            ano INTEGER NOT NULL,
+            mes INTEGER NOT NULL,
+            tipo TEXT NOT NULL,
+            categoria_id INTEGER NOT NULL DEFAULT 0,
+            total_centavos INTEGER NOT NULL DEFAULT 0,
+            quantidade INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (ano, mes, tipo, categoria_id)
+        ) WITHOUT ROWID""")
+    cursor.execute(_sql_reconstruir_resumo())
+    _criar_gatilhos_resumo(cursor)
+
+    # A busca continua indexando o nome da categoria, agora lido pela view.
+    cursor.execute(f"CREATE VIEW IF NOT EXISTS transacoes_busca_vw AS SELECT t.id, t.descricao, c.nome AS categoria FROM {_SQL_FROM_TRANSACOES}")
+    cursor.execute("""CREATE VIRTUAL TABLE transacoes_fts USING fts5(
+                          descricao, categoria, content='transacoes_busca_vw', content_rowid='id',
+                          tokenize='unicode61 remove_diacritics 2', prefix='2 3')""")
+    nome_new = "(SELECT nome FROM categorias WHERE id = NEW.categoria_id)"
+    nome_old = "(SELECT nome FROM categorias WHERE id = OLD.categoria_id)"
+    cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_fts_insert AFTER INSERT ON transacoes_tb BEGIN
+                           INSERT INTO transacoes_fts (rowid, descricao, categoria) VALUES (NEW.id, NEW.descricao, {nome_new});
+                       END""")
+    cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_fts_delete AFTER DELETE ON transacoes_tb BEGIN
+                           INSERT INTO transacoes_fts (transacoes_fts, rowid, descricao, categoria) VALUES ('delete', OLD.id, OLD.descricao, {nome_old});
+                       END""")
+    cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_fts_update AFTER UPDATE OF descricao, categoria_id ON transacoes_tb BEGIN
+                           INSERT INTO transacoes_fts (transacoes_fts, rowid, descricao, categoria) VALUES ('delete', OLD.id, OLD.descricao, {nome_old});
+                           INSERT INTO transacoes_fts (rowid, descricao, categoria) VALUES (NEW.id, NEW.descricao, {nome_new});
+                       END""")
+    # Renomear uma categoria reindexa as transações dela.
+    cursor.execute("""CREATE TRIGGER IF NOT EXISTS trg_fts_categoria_update AFTER UPDATE OF nome ON categorias BEGIN
+                          INSERT INTO transacoes_fts (transacoes_fts, rowid, descricao, categoria)
+                              SELECT 'delete', id, descricao, OLD.nome FROM transacoes_tb WHERE categoria_id = OLD.id;
+                          INSERT INTO transacoes_fts (rowid, descricao, categoria)
+                              SELECT id, descricao, NEW.nome FROM transacoes_tb WHERE categoria_id = NEW.id;
+                      END""")
+    cursor.execute("INSERT INTO transacoes_fts (transacoes_fts) VALUES ('rebuild')")
+
+def _migracao_recorrencias(cursor):
+    # Uma linha por regra recorrente; as ocorrências viram transações só até o horizonte pedido
+    # (materializar_recorrencias_db). proxima_data é a primeira ainda não gravada (NULL = regra encerrada).
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS recorrencias (
+            id INTEGER PRIMARY KEY,
+            tipo TEXT NOT NULL CHECK (tipo IN ('ganho', 'despesa')),
+            descricao TEXT NOT NULL,
+            valor_centavos INTEGER NOT NULL,
+            categoria_id INTEGER REFERENCES categorias (id),
+            frequencia TEXT NOT NULL CHECK (frequencia IN {FREQUENCIAS!r}),
+            intervalo INTEGER NOT NULL DEFAULT 1 CHECK (intervalo > 0),
+            data_inicio TEXT NOT NULL,
+            data_fim TEXT,
+            total_ocorrencias INTEGER CHECK (total_ocorrencias > 0),
+            ocorrencias_geradas INTEGER NOT NULL DEFAULT 0,
+            proxima_data TEXT
+        )""")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_recorrencias_proxima ON recorrencias (proxima_data) WHERE proxima_data IS NOT NULL")
+    cursor.execute("ALTER TABLE transacoes_tb ADD COLUMN recorrencia_id INTEGER REFERENCES recorrencias (id)")
+    cursor.execute("ALTER TABLE transacoes_tb ADD COLUMN ocorrencia INTEGER")
+    # Duas threads materializando a mesma regra não duplicam a ocorrência.
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_transacoes_recorrencia ON transacoes_tb (recorrencia_id, ocorrencia) "
+                   "WHERE recorrencia_id IS NOT NULL")
+
+def _migracao_versao_dados(cursor):
+    # Contador incrementado por toda escrita (_confirmar_escrita), na mesma transação. Com vários
+    # processos no mesmo arquivo (workers web, GUI), é por ele que o cache de cada um percebe as
+    # escritas dos outros.
+    cursor.execute("CREATE TABLE IF NOT EXISTS versao_dados (id INTEGER PRIMARY KEY CHECK (id = 1), versao INTEGER NOT NULL)")
+    cursor.execute("INSERT OR IGNORE INTO versao_dados (id, versao) VALUES (1, 0)")
+
+MIGRACOES = [
+    _migracao_colunas_periodo,
+    _migracao_resumo_mensal,
+    _migracao_compra_parcelada,
+    _migracao_indice_data,
+    _migracao_hash_importacao,
+    _migracao_centavos,
+    _migracao_data_epoch,
+    _migracao_busca_texto,
+    _migracao_categorias,
+    _migracao_recorrencias,
+    _migracao_versao_dados,
+]
+
+def _aplicar_migracoes(cursor):
+    cursor.execute("PRAGMA user_version")
+    versao_atual = cursor.fetchone()[0]
+    for numero, migracao in enumerate(MIGRACOES[versao_atual:], start=versao_atual + 1):
+        migracao(cursor)
+        cursor.execute(f"PRAGMA user_version = {numero}")
+
+def inicializar_banco_de_dados():
+    """Cria o esquema e aplica as migrações pendentes; pode rodar em vários processos ao mesmo tempo.
+
+    BEGIN IMMEDIATE serializa os processos e a versão é relida dentro da transação, então cada
+    migração roda uma vez só; quem chega depois espera (até TIMEOUT_INICIALIZACAO) e não faz nada.
+    """
+    conn, cursor = conectar_bd()
+    try:
+        cursor.execute("PRAGMA user_version")
+        if cursor.fetchone()[0] == len(MIGRACOES): return   # esquema em dia: nem disputa o lock de escrita
+        cursor.execute(f"PRAGMA busy_timeout = {int(TIMEOUT_INICIALIZACAO * 1000)}")
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS transacoes_tb (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                tipo TEXT NOT NULL,
+                descricao TEXT NOT NULL,
+                valor REAL NOT NULL,
+                categoria TEXT,
+                data_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        _aplicar_migracoes(cursor)
+        conn.commit()
+    except Exception: conn.rollback(); raise
+    finally:
+        cursor.execute(f"PRAGMA busy_timeout = {int(_pool.timeout * 1000)}")
+        cursor.close()
+
+def _colunas_data(data_registro_iso):
+    """(ano, mes, data_epoch) de uma data ISO, para preencher as colunas indexadas."""
+    return (int(data_registro_iso[0:4]), int(data_registro_iso[5:7]),
+            timegm(datetime.datetime.fromisoformat(data_registro_iso).timetuple()))
+
+# Leituras por período decoradas com @cache_consultas.consulta; as escritas abaixo passam por
+# _confirmar_escrita com os (ano, mes) que tocaram. Antes de cada leitura o cache compara a
+# versao_dados do banco com a última que viu: escritas de outros processos descartam tudo.
+def ler_versao_dados_db():
+    conn, cursor = conectar_bd()
+    try:
+        cursor.execute("SELECT versao FROM versao_dados WHERE id = 1")
+        return cursor.fetchone()[0]
+    except sqlite3.Error as e: raise e
+    finally: cursor.close()
+
+cache_consultas = CacheConsultas(ler_versao_banco=ler_versao_dados_db, ao_mudar_banco=lambda: autocompletar_categorias.invalidar())
+
+# Nas escritas, qualquer exceção (não só sqlite3.Error: um OverflowError de um valor grande
+# demais, por exemplo) faz rollback: a conexão é da thread e continua no pool, e uma transação
+# deixada aberta seria confirmada pela próxima escrita dessa thread.
+def _confirmar_escrita(conn, cursor, periodos=None):
+    """Incrementa versao_dados, faz o commit e invalida o cache dos (ano, mes) tocados (None = tudo)."""
+    cursor.execute("UPDATE versao_dados SET versao = versao + 1 WHERE id = 1 RETURNING versao")
+    versao = cursor.fetchone()[0]
+    conn.commit()
+    cache_consultas.invalidar(periodos, versao_banco=versao)
+
+# A data exibida sai formatada do próprio SQLite, a partir da coluna inteira.
+_SQL_DATA_FORMATADA = "strftime('%d/%m/%Y', t.data_epoch, 'unixepoch') AS data_formatada"
+_SQL_COLUNAS_TRANSACAO = f"t.id, t.tipo, t.descricao, t.valor_centavos, c.nome AS categoria, t.data_registro, t.data_epoch, {_SQL_DATA_FORMATADA}"
+
+def _filtro_periodo(ano, mes, tabela=""):
+    conditions, params = [], []
+    if ano: conditions.append(f"{tabela}ano = ?"); params.append(int(ano))
+    if mes: conditions.append(f"{tabela}mes = ?"); params.append(int(mes))
+    return (" WHERE " + " AND ".join(conditions) if conditions else ""), params
+
+# --- OCORRÊNCIAS PREVISTAS ---
+# materializar_recorrencias_db grava no máximo HORIZONTE_MESES_MAXIMO meses à frente; as
+# ocorrências de um período mais distante são calculadas na leitura, a partir da primeira ainda
+# não gravada de cada regra (ocorrencias_geradas), e nunca vão para transacoes_tb. Entram nas
+# listas e nos totais do período com prevista=True e id negativo, único por regra e ocorrência,
+# para a paginação por keyset (data_epoch, id) continuar valendo. Como dependem do estado de
+# todas as regras, toda escrita em `recorrencias` invalida o cache inteiro (periodos=None).
+_IDS_PREVISTOS_POR_REGRA = 1_000_000
+
+def _chave_ordem(transacao): return transacao['data_epoch'], transacao['id']
+
+def _ocorrencias_previstas(cursor, inicio, fim):
+    """Ocorrências ainda não gravadas das regras ativas entre inicio e fim (datetime), como linhas de transação em ordem (data_epoch DESC, id DESC)."""
+    cursor.execute("SELECT r.*, c.nome AS categoria FROM recorrencias r LEFT JOIN categorias c ON c.id = r.categoria_id "
+                   "WHERE r.proxima_data IS NOT NULL AND r.proxima_data <= ?", (fim.isoformat(),))
+    previstas = []
+    for regra in cursor.fetchall():
+        data_fim = datetime.datetime.fromisoformat(regra['data_fim']) if regra['data_fim'] else None
+        for numero, data in ocorrencias(datetime.datetime.fromisoformat(regra['data_inicio']), regra['frequencia'], regra['intervalo'],
+                                        data_fim, regra['total_ocorrencias'], a_partir=regra['ocorrencias_geradas']):
+            if data > fim: break
+            if data < inicio: continue
+            previstas.append({'id': -(regra['id'] * _IDS_PREVISTOS_POR_REGRA + numero), 'tipo': regra['tipo'], 'descricao': regra['descricao'],
+                              'valor_centavos': regra['valor_centavos'], 'categoria': regra['categoria'], 'data_registro': data.isoformat(),
+                              'data_epoch': timegm(data.timetuple()), 'data_formatada': data.strftime('%d/%m/%Y'), 'prevista': True})
+    return sorted(previstas, key=_chave_ordem, reverse=True)
+
+def _previstas_do_periodo(cursor, ano, mes):
+    # Só períodos com ano: "todos os anos" não tem fim para expandir as regras.
+    if not ano or not periodo_valido(int(ano), int(mes) if mes else None): return []
+    return _ocorrencias_previstas(cursor, *intervalo_periodo(int(ano), int(mes) if mes else None))
+
+def _somar_previstas(previstas):
+    totais = {'ganho': 0, 'despesa': 0}
+    for transacao in previstas: totais[transacao['tipo']] += transacao['valor_centavos']
+    return totais
+
+@cache_consultas.consulta('transacoes')
+def buscar_transacoes_db(ano=None, mes=None):
+    conn, cursor = conectar_bd()
+    try:
+        where, params = _filtro_periodo(ano, mes, tabela="t.")
+        query = f"SELECT {_SQL_COLUNAS_TRANSACAO} FROM {_SQL_FROM_TRANSACOES}" + where
+        query += " ORDER BY t.data_epoch DESC, t.id DESC"
+        cursor.execute(query, params)
+        transacoes = [dict(linha) for linha in cursor.fetchall()]
+        previstas = _previstas_do_periodo(cursor, ano, mes)
+        return sorted(transacoes + previstas, key=_chave_ordem, reverse=True) if previstas else transacoes
+    except sqlite3.Error as e: raise e
+    finally: cursor.close()
+
+def buscar_pagina_transacoes_db(ano=None, mes=None, limite=50, apos=None, tamanho_lote=200):
+    """Gera uma página de transações em ordem (data_epoch DESC, id DESC) usando keyset.
+
+    `apos` é o par (data_epoch, id) da última linha da página anterior. As linhas saem do
+    cursor em lotes (fetchmany), então quem consome pode ir renderizando enquanto lê, e a data
+    já vem formatada pelo SQLite. Ocorrências previstas do período entram na mesma ordem.
+    """
+    conn, cursor = conectar_bd()
+    try:
+        where, params = _filtro_periodo(ano, mes, tabela="t.")
+        if apos is not None:
+            where += (" AND " if where else " WHERE ") + "(t.data_epoch, t.id) < (?, ?)"
+            params += [int(apos[0]), int(apos[1])]
+        previstas = [t for t in _previstas_do_periodo(cursor, ano, mes) if apos is None or _chave_ordem(t) < (int(apos[0]), int(apos[1]))]
+        cursor.execute(f"SELECT {_SQL_COLUNAS_TRANSACAO} FROM {_SQL_FROM_TRANSACOES}" + where + " ORDER BY t.data_epoch DESC, t.id DESC LIMIT ?",
+                       params + [limite])
+        linhas = (dict(linha) for lote in iter(partial(cursor.fetchmany, tamanho_lote), []) for linha in lote)
+        if previstas: linhas = islice(heapq.merge(linhas, previstas, key=_chave_ordem, reverse=True), limite)
+        yield from linhas
+    except sqlite3.Error as e: raise e
+    finally: cursor.close()
+
+@cache_consultas.consulta('pagina')
+def listar_pagina_transacoes_db(ano=None, mes=None, limite=50, apos=None):
+    """Mesma página de buscar_pagina_transacoes_db, já como lista (e guardada no cache)."""
+    return list(buscar_pagina_transacoes_db(ano, mes, limite, apos))
+
+def _expressao_busca(texto):
+    """Texto livre -> consulta FTS5: todos os termos (E implícito), o último como prefixo.
+
+    Cada termo vai entre aspas, então operadores e pontuação digitados não viram sintaxe FTS5.
+    Retorna None se não sobrar nenhum termo.
+    """
+    termos = re.findall(r'\w+', texto or '')
+    if not termos: return None
+    return ' '.join(f'"{termo}"' for termo in termos) + '*'
+
+# Só os N casamentos mais recentes (por id) entram no ranking: bm25 custa uma conta por linha casada,
+# e um termo comum ("mercado") casa com dezenas de milhares de linhas num livro de um milhão.
+MAX_CANDIDATOS_BUSCA = 2000
+
+# Termos curtos (as primeiras letras digitadas) casam com boa parte da tabela: o FTS5 teria de
+# ranquear MAX_CANDIDATOS_BUSCA linhas, enquanto um LIKE percorre o índice de data da mais recente
+# para trás e para nas primeiras `limite` que casam. Por isso o FTS5 só é usado quando algum termo
+# tem TAMANHO_MINIMO_FTS letras ou mais; abaixo disso a busca é por trecho (LIKE), sem relevância
+# nem remoção de acentos, da mais recente para a mais antiga.
+TAMANHO_MINIMO_FTS = 3
+
+def buscar_texto_db(texto, ano=None, mes=None, limite=100):
+    """Transações cuja descrição/categoria casam com `texto`, da mais relevante (bm25) para a menos.
+
+    A descrição pesa mais que a categoria; empates saem da mais recente para a mais antiga.
+    Só com termos curtos (ver TAMANHO_MINIMO_FTS) vêm as mais recentes que contêm os termos.
+    """
+    expressao = _expressao_busca(texto)
+    if expressao is None: return []
+    conn, cursor = conectar_bd()
+    try:
+        where, params = _filtro_periodo(ano, mes, tabela="t.")
+        termos = re.findall(r'\w+', texto)
+        if max(len(termo) for termo in termos) < TAMANHO_MINIMO_FTS:
+            condicoes = " AND ".join(["(t.descricao LIKE ? ESCAPE '\\' OR c.nome LIKE ? ESCAPE '\\')"] * len(termos))
+            padroes = ['%' + termo.replace('_', r'\_') + '%' for termo in termos for _ in range(2)]
+            cursor.execute(f"SELECT {_SQL_COLUNAS_TRANSACAO}, NULL AS relevancia FROM {_SQL_FROM_TRANSACOES}"
+                           f"{where or ' WHERE 1'} AND {condicoes} ORDER BY t.data_epoch DESC, t.id DESC LIMIT ?", [*params, *padroes, limite])
+            return [dict(linha) for linha in cursor.fetchall()]
+        cursor.execute(f"""
+            WITH candidatos AS (
+                SELECT transacoes_fts.rowid AS id, bm25(transacoes_fts, 2.0, 1.0) AS relevancia
+                FROM transacoes_fts JOIN transacoes_tb t ON t.id = transacoes_fts.rowid
+                WHERE transacoes_fts MATCH ?{where.replace(' WHERE ', ' AND ', 1)}
+                ORDER BY transacoes_fts.rowid DESC LIMIT ?)
+            SELECT {_SQL_COLUNAS_TRANSACAO}, relevancia
+            FROM candidatos JOIN transacoes_tb t ON t.id = candidatos.id LEFT JOIN categorias c ON c.id = t.categoria_id
+            ORDER BY relevancia, t.data_epoch DESC, t.id DESC LIMIT ?""", [expressao, *params, MAX_CANDIDATOS_BUSCA, limite])
+        return [dict(linha) for linha in cursor.fetchall()]
+    except sqlite3.Error as e: raise e
+    finally: cursor.close()
+
+COLUNAS_EXPORTACAO = ('id', 'tipo', 'descricao', 'valor_centavos', 'categoria', 'data_registro')
+
+def iterar_lotes_transacoes_db(ano=None, mes=None, tamanho_lote=1000):
+    """Gera listas de tuplas (COLUNAS_EXPORTACAO) em ordem cronológica, lendo o cursor com fetchmany."""
+    conn, cursor = conectar_bd()
+    try:
+        where, params = _filtro_periodo(ano, mes, tabela="t.")
+        colunas = ', '.join('c.nome AS categoria' if coluna == 'categoria' else f"t.{coluna}" for coluna in COLUNAS_EXPORTACAO)
+        cursor.execute(f"SELECT {colunas} FROM {_SQL_FROM_TRANSACOES}" + where + " ORDER BY t.data_epoch, t.id", params)
+        while True:
+            lote = cursor.fetchmany(tamanho_lote)
+            if not lote: break
+            yield [tuple(linha) for linha in lote]
+    except sqlite3.Error as e: raise e
+    finally: cursor.close()
+
+@cache_consultas.consulta('saldo')
+def calcular_saldo_db(ano=None, mes=None):
+    conn, cursor = conectar_bd()
+    try:
+        where, params = _filtro_periodo(ano, mes)
+        cursor.execute("SELECT tipo, SUM(total_centavos) AS total FROM resumo_mensal" + where + " GROUP BY tipo", params)
+        totais = {linha['tipo']: linha['total'] for linha in cursor.fetchall()}
+        previstos = _somar_previstas(_previstas_do_periodo(cursor, ano, mes))
+        total_ganhos, total_despesas = (totais.get('ganho') or 0) + previstos['ganho'], (totais.get('despesa') or 0) + previstos['despesa']
+        return total_ganhos, total_despesas, total_ganhos - total_despesas
+    except sqlite3.Error as e: raise e
+    finally: cursor.close()
+
+def calcular_saldo_anterior_db(ano, mes=None):
+    """Saldo (centavos) de tudo o que veio antes do período: antes de mes/ano, ou de janeiro do ano sem mes."""
+    conn, cursor = conectar_bd()
+    try:
+        cursor.execute("SELECT SUM(CASE tipo WHEN 'ganho' THEN total_centavos WHEN 'despesa' THEN -total_centavos ELSE 0 END) "
+                       "FROM resumo_mensal WHERE ano > 0 AND (ano, mes) < (?, ?)", (int(ano), int(mes or 1)))
+        saldo = cursor.fetchone()[0] or 0
+        if not periodo_valido(int(ano), int(mes) if mes else None): return saldo
+        inicio = intervalo_periodo(int(ano), int(mes or 1))[0]
+        previstos = _somar_previstas(_ocorrencias_previstas(cursor, datetime.datetime.min, inicio - datetime.timedelta(microseconds=1)))
+        return saldo + previstos['ganho'] - previstos['despesa']
+    except sqlite3.Error as e: raise e
+    finally: cursor.close()
+
+def _incluir_previstas(por_categoria, por_mes, previstas):
+    """As quebras de resumir_transacoes_db somadas às ocorrências previstas, na mesma ordem."""
+    categorias = {(c['tipo'], c['categoria']): dict(c) for c in por_categoria}
+    meses = {(m['ano'], m['mes']): dict(m) for m in por_mes}
+    for transacao in previstas:
+        categoria = categorias.setdefault((transacao['tipo'], transacao['categoria']),
+                                          {'tipo': transacao['tipo'], 'categoria': transacao['categoria'], 'total_centavos': 0})
+        categoria['total_centavos'] += transacao['valor_centavos']
+        ano, mes = int(transacao['data_registro'][0:4]), int(transacao['data_registro'][5:7])
+        totais = meses.setdefault((ano, mes), {'ano': ano, 'mes': mes, 'ganhos_centavos': 0, 'despesas_centavos': 0, 'saldo_centavos': 0})
+        totais['ganhos_centavos' if transacao['tipo'] == 'ganho' else 'despesas_centavos'] += transacao['valor_centavos']
+        totais['saldo_centavos'] = totais['ganhos_centavos'] - totais['despesas_centavos']
+    return (sorted(categorias.values(), key=lambda c: c['total_centavos'], reverse=True),
+            [meses[chave] for chave in sorted(meses)])
+
+@cache_consultas.consulta('resumo')
+def resumir_transacoes_db(ano=None, mes=None):
+    """Totais do período (em centavos) e quebras por categoria e por mês, lidos do resumo_mensal (mais as ocorrências previstas).
+
+    As somas são feitas em inteiros pelo SQLite: quebras por categoria e por mês saem do
+    mesmo GROUP BY, então o custo não depende do número de transações. A quebra por
+    categoria agrupa pelo categoria_id e só depois junta o nome.
+    """
+    conn, cursor = conectar_bd()
+    try:
+        where, params = _filtro_periodo(ano, mes, tabela="r.")
+        cursor.execute("SELECT r.tipo, c.nome AS categoria, SUM(r.total_centavos) AS total FROM resumo_mensal r LEFT JOIN categorias c ON c.id = r.categoria_id"
+                       + where + " GROUP BY r.tipo, r.categoria_id ORDER BY total DESC", params)
+        por_categoria = [{'tipo': linha['tipo'], 'categoria': linha['categoria'], 'total_centavos': linha['total']}
+                         for linha in cursor.fetchall() if linha['tipo'] in ('ganho', 'despesa')]
+        cursor.execute("SELECT ano, mes, SUM(CASE WHEN tipo = 'ganho' THEN total_centavos ELSE 0 END) AS ganhos, "
+                       "SUM(CASE WHEN tipo = 'despesa' THEN total_centavos ELSE 0 END) AS despesas FROM resumo_mensal r"
+                       + where + " GROUP BY ano, mes ORDER BY ano, mes", params)
+        por_mes = [{'ano': linha['ano'], 'mes': linha['mes'], 'ganhos_centavos': linha['ganhos'], 'despesas_centavos': linha['despesas'],
+                    'saldo_centavos': linha['ganhos'] - linha['despesas']} for linha in cursor.fetchall()]
+        previstas = _previstas_do_periodo(cursor, ano, mes)
+        if previstas: por_categoria, por_mes = _incluir_previstas(por_categoria, por_mes, previstas)
+        total_ganhos = sum(m['ganhos_centavos'] for m in por_mes)
+        total_despesas = sum(m['despesas_centavos'] for m in por_mes)
+        return {
+            'total_ganhos_centavos': total_ganhos,
+            'total_despesas_centavos': total_despesas,
+            'saldo_liquido_centavos': total_ganhos - total_despesas,
+            'por_categoria': por_categoria,
+            'por_mes': por_mes,
+        }
+    except sqlite3.Error as e: raise e
+    finally: cursor.close()
+
+def buscar_totais_mensais_db():
+    """[(ano, mes, tipo, total_centavos)] de todos os meses, lidos do resumo_mensal (base da projeção)."""
+    conn, cursor = conectar_bd()
+    try:
+        cursor.execute("SELECT ano, mes, tipo, SUM(total_centavos) FROM resumo_mensal WHERE ano > 0 GROUP BY ano, mes, tipo ORDER BY ano, mes")
+        return [tuple(linha) for linha in cursor.fetchall()]
+    except sqlite3.Error as e: raise e
+    finally: cursor.close()
+
+def buscar_totais_agendados_db(desde_epoch=0):
+    """[(ano, mes, tipo, total_centavos)] só das parcelas e ocorrências recorrentes a partir de desde_epoch.
+
+    Cada ramo do UNION usa o índice parcial de compra_id ou de recorrencia_id (o `+` impede o
+    planejador de preferir o índice de data): o custo depende do número de linhas agendadas,
+    não do tamanho da tabela.
+    """
+    conn, cursor = conectar_bd()
+    try:
+        cursor.execute("""
+            SELECT ano, mes, tipo, SUM(valor_centavos) FROM (
+                SELECT ano, mes, tipo, valor_centavos FROM transacoes_tb WHERE compra_id IS NOT NULL AND +data_epoch >= ?
+                UNION ALL
+                SELECT ano, mes, tipo, valor_centavos FROM transacoes_tb WHERE recorrencia_id IS NOT NULL AND +data_epoch >= ?
+            ) GROUP BY ano, mes, tipo ORDER BY ano, mes""", (desde_epoch, desde_epoch))
+        return [tuple(linha) for linha in cursor.fetchall()]
+    except sqlite3.Error as e: raise e
+    finally: cursor.close()
+
+def buscar_anos_disponiveis_db():
+    conn, cursor = conectar_bd()
+    try:
+        cursor.execute("SELECT DISTINCT ano FROM resumo_mensal WHERE ano > 0 ORDER BY ano DESC")
+        return [str(row['ano']) for row in cursor.fetchall()]
+    except sqlite3.Error as e: raise e
+    finally: cursor.close()
+
+def listar_categorias_db():
+    """Categorias com o número de transações de cada uma, das mais usadas para as menos."""
+    conn, cursor = conectar_bd()
+    try:
+        cursor.execute("SELECT c.id, c.nome, COALESCE(SUM(r.quantidade), 0) AS quantidade FROM categorias c "
+                       "LEFT JOIN resumo_mensal r ON r.categoria_id = c.id GROUP BY c.id ORDER BY quantidade DESC, c.nome")
+        return [dict(linha) for linha in cursor.fetchall()]
+    except sqlite3.Error as e: raise e
+    finally: cursor.close()
+
+# Sugestões para os campos de categoria (GUI e formulário web); as escritas abaixo invalidam.
+autocompletar_categorias = AutocompletarCategorias(lambda: [categoria['nome'] for categoria in listar_categorias_db()])
+
+def _ids_categorias(cursor, nomes):
+    """nome -> categoria_id, criando na tabela categorias os nomes que ainda não existem."""
+    ids = {}
+    for nome in set(nomes):
+        if not nome or not nome.strip(): continue
+        normalizado = normalizar_categoria(nome)
+        cursor.execute("INSERT INTO categorias (nome, nome_normalizado) VALUES (?, ?) ON CONFLICT (nome_normalizado) DO NOTHING",
+                       (limpar_nome_categoria(nome), normalizado))
+        cursor.execute("SELECT id FROM categorias WHERE nome_normalizado = ?", (normalizado,))
+        ids[nome] = cursor.fetchone()[0]
+    return ids
+
+def adicionar_ganho_db(descricao, valor_centavos):
+    """Adiciona um ganho com a data atual e retorna o id da nova transação."""
+    data_registro_iso = datetime.datetime.now().isoformat()
+    if escritor_em_grupo.ativo:
+        try: return escritor_em_grupo.gravar([{'tipo': 'ganho', 'descricao': descricao, 'valor_centavos': valor_centavos, 'data_registro': data_registro_iso}])[0]
+        except EscritorParado: pass   # parou entre a checagem e o envio: grava direto
+    conn, cursor = conectar_bd()
+    try:
+        cursor.execute("INSERT INTO transacoes_tb (tipo, descricao, valor_centavos, data_registro, ano, mes, data_epoch) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                       ('ganho', descricao, valor_centavos, data_registro_iso, *_colunas_data(data_registro_iso)))
+        _confirmar_escrita(conn, cursor, [_colunas_data(data_registro_iso)[:2]]); return cursor.lastrowid
+    except Exception: conn.rollback(); raise
+    finally: cursor.close()
+
+def adicionar_despesa_db(descricao, valor_centavos, categoria, data_registro_iso=None):
+    """Adiciona uma nova despesa, opcionalmente com data específica, e retorna o id da nova transação."""
+    if data_registro_iso is None: data_registro_iso = datetime.datetime.now().isoformat()
+    if escritor_em_grupo.ativo:
+        try: return escritor_em_grupo.gravar([{'tipo': 'despesa', 'descricao': descricao, 'valor_centavos': valor_centavos, 'categoria': categoria,
+                                               'data_registro': data_registro_iso}])[0]
+        except EscritorParado: pass
+    conn, cursor = conectar_bd()
+    try:
+        categoria_id = _ids_categorias(cursor, [categoria]).get(categoria)
+        cursor.execute("INSERT INTO transacoes_tb (tipo, descricao, valor_centavos, categoria_id, data_registro, ano, mes, data_epoch) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                       ('despesa', descricao, valor_centavos, categoria_id, data_registro_iso, *_colunas_data(data_registro_iso)))
+        _confirmar_escrita(conn, cursor, [_colunas_data(data_registro_iso)[:2]]); autocompletar_categorias.invalidar(); return cursor.lastrowid
+    except Exception: conn.rollback(); raise
+    finally: cursor.close()
+
+def adicionar_transacoes_lote_db(transacoes):
+    """Grava uma lista de transações (dicts já validados) numa única transação e retorna os ids na mesma ordem.
+
+    Cada dict tem tipo, descricao, valor_centavos e, opcionalmente, categoria e data_registro (ISO).
+    Se qualquer INSERT falhar, nada é gravado. Com a escrita em grupo ativa, a lista vai como um
+    pedido só para o escritor (continua tudo ou nada) e o retorno espera o commit do lote.
+    """
+    agora_iso = datetime.datetime.now().isoformat()
+    if escritor_em_grupo.ativo:
+        try: return escritor_em_grupo.gravar([dict(t, data_registro=t.get('data_registro') or agora_iso) for t in transacoes], linhas=len(transacoes))
+        except EscritorParado: pass
+    conn, cursor = conectar_bd()
+    try:
+        ids, periodos, categorias = _inserir_transacoes(cursor, transacoes, agora_iso)
+        _confirmar_escrita(conn, cursor, periodos)
+        if categorias: autocompletar_categorias.invalidar()
+        return ids
+    except Exception: conn.rollback(); raise
+    finally: cursor.close()
+
+def _inserir_transacoes(cursor, transacoes, agora_iso):
+    """INSERTs de adicionar_transacoes_lote_db, sem commit: devolve (ids, periodos, categorias)."""
+    ids, periodos, categorias = [], set(), _ids_categorias(cursor, [t.get('categoria') for t in transacoes])
+    for t in transacoes:
+        data_registro_iso = t.get('data_registro') or agora_iso
+        colunas_data = _colunas_data(data_registro_iso)
+        cursor.execute("INSERT INTO transacoes_tb (tipo, descricao, valor_centavos, categoria_id, data_registro, ano, mes, data_epoch) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                       (t['tipo'], t['descricao'], t['valor_centavos'], categorias.get(t.get('categoria')), data_registro_iso, *colunas_data))
+        ids.append(cursor.lastrowid); periodos.add(colunas_data[:2])
+    return ids, periodos, categorias
+
+# --- ESCRITA EM GRUPO ---
+# Opcional (iniciar_escrita_em_grupo): adicionar_ganho_db, adicionar_despesa_db e
+# adicionar_transacoes_lote_db deixam de abrir um commit cada e passam pelo escritor de
+# escrita_em_grupo, que grava vários pedidos numa transação. Cada pedido fica num SAVEPOINT:
+# o que falhar volta atrás sozinho e só quem o enviou recebe o erro. O commit do lote usa
+# synchronous=FULL (um fsync por lote, não por linha), então a confirmação é durável mesmo
+# com a queda da máquina; fora do escritor as conexões continuam em synchronous=NORMAL.
+def _gravar_pedidos_em_grupo(pedidos):
+    """gravar_lote do escritor: cada pedido é uma lista de transações; devolve (sucesso, ids ou erro) por pedido."""
+    agora_iso = datetime.datetime.now().isoformat()
+    conn, cursor = conectar_bd()
+    resultados, periodos, com_categoria = [], set(), False
+    try:
+        cursor.execute("PRAGMA synchronous = FULL")
+        cursor.execute("BEGIN IMMEDIATE")
+        for transacoes in pedidos:
+            cursor.execute("SAVEPOINT pedido")
+            try:
+                ids, periodos_pedido, categorias = _inserir_transacoes(cursor, transacoes, agora_iso)
+            except Exception as e:   # ex.: OverflowError de um valor fora do INTEGER: falha só este pedido
+                cursor.execute("ROLLBACK TO pedido"); cursor.execute("RELEASE pedido")
+                resultados.append((False, e)); continue
+            cursor.execute("RELEASE pedido")
+            resultados.append((True, ids)); periodos |= periodos_pedido; com_categoria = com_categoria or bool(categorias)
+        if periodos: _confirmar_escrita(conn, cursor, periodos)
+        else: conn.commit()   # todos os pedidos falharam: nada mudou
+        if com_categoria: autocompletar_categorias.invalidar()
+        return resultados
+    except Exception: conn.rollback(); raise
+    finally:
+        # synchronous não muda dentro de uma transação: nenhuma pode sobrar aberta para o próximo lote.
+        if conn.in_transaction: conn.rollback()
+        cursor.execute("PRAGMA synchronous = NORMAL")
+        cursor.close()
+
+escritor_em_grupo = EscritorEmGrupo(_gravar_pedidos_em_grupo)
+
+def iniciar_escrita_em_grupo(max_lote=256, max_espera_ms=0.0):
+    """Liga a escrita em grupo: lotes de até `max_lote` pedidos, esperando até `max_espera_ms` por mais pedidos."""
+    escritor_em_grupo.iniciar(max_lote, max_espera_ms)
+
+def parar_escrita_em_grupo():
+    """Grava os pedidos pendentes e volta ao commit por chamada."""
+    escritor_em_grupo.parar()
+
+def importar_lote_db(linhas):
+    """Grava um lote de linhas de extrato numa transação e retorna quantas eram novas.
+
+    Cada linha é (tipo, descricao, valor_centavos, categoria, data_registro, ano, mes, data_epoch, hash_importacao),
+    com a categoria pelo nome; as que repetem um hash_importacao já gravado são ignoradas pelo índice único.
+    """
+    conn, cursor = conectar_bd()
+    try:
+        categorias = _ids_categorias(cursor, [linha[3] for linha in linhas])
+        cursor.executemany("INSERT OR IGNORE INTO transacoes_tb (tipo, descricao, valor_centavos, categoria_id, data_registro, ano, mes, data_epoch, hash_importacao) "
+                           "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", ((*linha[:3], categorias.get(linha[3]), *linha[4:]) for linha in linhas))
+        inseridas = cursor.rowcount
+        _confirmar_escrita(conn, cursor, {(linha[5], linha[6]) for linha in linhas}); autocompletar_categorias.invalidar(); return inseridas
+    except Exception: conn.rollback(); raise
+    finally: cursor.close()
+
+def _datas_parcelas(data_primeira, total_parcelas):
+    """Mesma data a cada mês; o dia é ajustado ao último dia do mês quando não existe nele."""
+    return [data_da_ocorrencia(data_primeira, 'mensal', i) for i in range(total_parcelas)]
+
+def adicionar_parcelas_db(descricao_base, valor_parcela_centavos, categoria, data_primeira, total_parcelas):
+    """Grava todas as parcelas de uma compra numa única transação e retorna o compra_id."""
+    compra_id = uuid.uuid4().hex
+    conn, cursor = conectar_bd()
+    try:
+        categoria_id = _ids_categorias(cursor, [categoria]).get(categoria)
+        linhas = []
+        for i, data_parcela in enumerate(_datas_parcelas(data_primeira, total_parcelas)):
+            data_parcela_iso = data_parcela.isoformat()
+            linhas.append(('despesa', f"{descricao_base} (Parcela {i+1}/{total_parcelas})", valor_parcela_centavos, categoria_id,
+                           data_parcela_iso, *_colunas_data(data_parcela_iso), compra_id))
+        cursor.executemany("INSERT INTO transacoes_tb (tipo, descricao, valor_centavos, categoria_id, data_registro, ano, mes, data_epoch, compra_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                           linhas)
+        _confirmar_escrita(conn, cursor, {(linha[5], linha[6]) for linha in linhas}); autocompletar_categorias.invalidar(); return compra_id
+    except Exception: conn.rollback(); raise
+    finally: cursor.close()
+
+def _buscar_transacao_por_id_db(id_transacao):
+    conn, cursor = conectar_bd()
+    try:
+        cursor.execute(f"SELECT t.*, c.nome AS categoria, {_SQL_DATA_FORMATADA} FROM {_SQL_FROM_TRANSACOES} WHERE t.id = ?", (id_transacao,))
+        linha_db = cursor.fetchone()
+        return dict(linha_db) if linha_db else None
+    except sqlite3.Error as e: raise e
+    finally: cursor.close()
+
+def editar_transacao_db(id_transacao, descricao, valor_centavos, categoria):
+    conn, cursor = conectar_bd()
+    try:
+        categoria_id = _ids_categorias(cursor, [categoria]).get(categoria)
+        cursor.execute("UPDATE transacoes_tb SET descricao = ?, valor_centavos = ?, categoria_id = ? WHERE id = ? RETURNING ano, mes",
+                       (descricao, valor_centavos, categoria_id, id_transacao))
+        periodos = [tuple(linha) for linha in cursor.fetchall()]
+        _confirmar_escrita(conn, cursor, periodos); autocompletar_categorias.invalidar(); return True
+    except Exception: conn.rollback(); raise
+    finally: cursor.close()
+
+def excluir_transacao_db(id_transacao):
+    conn, cursor = conectar_bd()
+    try:
+        cursor.execute("DELETE FROM transacoes_tb WHERE id = ? RETURNING ano, mes", (id_transacao,))
+        periodos = [tuple(linha) for linha in cursor.fetchall()]
+        _confirmar_escrita(conn, cursor, periodos); autocompletar_categorias.invalidar(); return bool(periodos)
+    except Exception: conn.rollback(); raise
+    finally: cursor.close()
+
+def criar_recorrencia_db(tipo, descricao, valor_centavos, categoria, frequencia, data_inicio, intervalo=1, data_fim=None, total_ocorrencias=None):
+    """Grava uma regra recorrente (uma linha só, sem as ocorrências) e retorna o id dela.
+
+    data_inicio/data_fim são datetime; sem data_fim nem total_ocorrencias a regra não termina.
+    As ocorrências entram em transacoes_tb por materializar_recorrencias_db.
+    """
+    if frequencia not in FREQUENCIAS: raise ValueError(f"frequência desconhecida: {frequencia!r} (use {', '.join(FREQUENCIAS)})")
+    conn, cursor = conectar_bd()
+    try:
+        categoria_id = _ids_categorias(cursor, [categoria]).get(categoria) if tipo == 'despesa' else None
+        cursor.execute("INSERT INTO recorrencias (tipo, descricao, valor_centavos, categoria_id, frequencia, intervalo, data_inicio, data_fim, "
+                       "total_ocorrencias, proxima_data) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                       (tipo, descricao, valor_centavos, categoria_id, frequencia, intervalo, data_inicio.isoformat(),
+                        data_fim.isoformat() if data_fim else None, total_ocorrencias, data_inicio.isoformat()))
+        id_recorrencia = cursor.lastrowid
+        _confirmar_escrita(conn, cursor, None)   # as ocorrências previstas de qualquer período mudam
+        if categoria_id: autocompletar_categorias.invalidar()
+        return id_recorrencia
+    except Exception: conn.rollback(); raise
+    finally: cursor.close()
+
+def listar_recorrencias_db():
+    """Regras recorrentes, com o nome da categoria; as ativas (com proxima_data) primeiro."""
+    conn, cursor = conectar_bd()
+    try:
+        cursor.execute("SELECT r.*, c.nome AS categoria FROM recorrencias r LEFT JOIN categorias c ON c.id = r.categoria_id "
+                       "ORDER BY r.proxima_data IS NULL, r.proxima_data, r.id")
+        return [dict(linha) for linha in cursor.fetchall()]
+    except sqlite3.Error as e: raise e
+    finally: cursor.close()
+
+def encerrar_recorrencia_db(id_recorrencia, data_fim=None):
+    """Encerra a regra em data_fim (padrão: agora) e apaga as ocorrências já gravadas depois dela.
+
+    As anteriores continuam em transacoes_tb. Retorna quantas ocorrências foram apagadas.
+    """
+    data_fim_iso = (data_fim or datetime.datetime.now()).isoformat()
+    conn, cursor = conectar_bd()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("UPDATE recorrencias SET data_fim = ?, proxima_data = CASE WHEN proxima_data <= ? THEN proxima_data END "
+                       "WHERE id = ?", (data_fim_iso, data_fim_iso, id_recorrencia))
+        if cursor.rowcount == 0: conn.rollback(); return None
+        # proxima_data continua valendo se ainda for antes do fim: a materialização para sozinha em data_fim.
+        cursor.execute("DELETE FROM transacoes_tb WHERE recorrencia_id = ? AND data_epoch > ? RETURNING ano, mes",
+                       (id_recorrencia, _colunas_data(data_fim_iso)[2]))
+        apagadas = len(cursor.fetchall())
+        _confirmar_escrita(conn, cursor, None); autocompletar_categorias.invalidar(); return apagadas
+    except Exception: conn.rollback(); raise
+    finally: cursor.close()
+
+def materializar_recorrencias_db(ate=None):
+    """Grava em transacoes_tb as ocorrências das regras até `ate` (padrão: horizonte_recorrencias()).
+
+    Chamada antes de consultar um período: o caso comum (nada pendente) é uma leitura no
+    índice de proxima_data, sem lock de escrita. Como as ocorrências viram transações
+    normais, resumo_mensal, saldos e busca ficam corretos sem tratar as regras à parte.
+    Retorna quantas transações foram gravadas.
+    """
+    ate_iso = (ate or horizonte_recorrencias()).isoformat()
+    conn, cursor = conectar_bd()
+    try:
+        cursor.execute("SELECT 1 FROM recorrencias WHERE proxima_data IS NOT NULL AND proxima_data <= ? LIMIT 1", (ate_iso,))
+        if cursor.fetchone() is None: return 0
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("SELECT * FROM recorrencias WHERE proxima_data IS NOT NULL AND proxima_data <= ?", (ate_iso,))
+        gravadas = 0
+        for regra in cursor.fetchall():
+            data_fim = datetime.datetime.fromisoformat(regra['data_fim']) if regra['data_fim'] else None
+            linhas, proxima, geradas = [], None, regra['ocorrencias_geradas']
+            for numero, data in ocorrencias(datetime.datetime.fromisoformat(regra['data_inicio']), regra['frequencia'], regra['intervalo'],
+                                            data_fim, regra['total_ocorrencias'], a_partir=regra['ocorrencias_geradas']):
+                data_iso = data.isoformat()
+                if data_iso > ate_iso: proxima = data_iso; break
+                linhas.append((regra['tipo'], regra['descricao'], regra['valor_centavos'], regra['categoria_id'], data_iso,
+                               *_colunas_data(data_iso), regra['id'], numero))
+                geradas = numero + 1
+            cursor.executemany("INSERT OR IGNORE INTO transacoes_tb (tipo, descricao, valor_centavos, categoria_id, data_registro, ano, mes, data_epoch, "
+                               "recorrencia_id, ocorrencia) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", linhas)
+            gravadas += max(cursor.rowcount, 0)
+            cursor.execute("UPDATE recorrencias SET ocorrencias_geradas = ?, proxima_data = ? WHERE id = ?", (geradas, proxima, regra['id']))
+        # ocorrencias_geradas/proxima_data mudaram: as previstas de todo período depois do horizonte também.
+        _confirmar_escrita(conn, cursor, None)
+        if gravadas: autocompletar_categorias.invalidar()
+        return gravadas
+    except Exception: conn.rollback(); raise
+    finally: cursor.close()
+
+def verificar_resumo_mensal_db(reconstruir=False):
+    """Compara resumo_mensal com a agregação das transações.
+
+    Retorna a lista de divergências [(ano, mes, tipo, nome da categoria, total_resumo, total_real)], em centavos.
+    Com reconstruir=True, refaz o resumo a partir de transacoes_tb na mesma transação.
+    """
+    conn, cursor = conectar_bd()
+    try:
+        cursor.execute("BEGIN IMMEDIATE" if reconstruir else "BEGIN")
+        cursor.execute("""
+            WITH reais AS (
+                SELECT COALESCE(ano, 0) AS ano, COALESCE(mes, 0) AS mes, tipo, COALESCE(categoria_id, 0) AS categoria_id, SUM(valor_centavos) AS total
+                FROM transacoes_tb GROUP BY 1, 2, 3, 4
+            ),
+            chaves AS (SELECT ano, mes, tipo, categoria_id FROM reais UNION SELECT ano, mes, tipo, categoria_id FROM resumo_mensal)
+            SELECT c.ano, c.mes, c.tipo, (SELECT nome FROM categorias WHERE id = c.categoria_id) AS categoria,
+                   r.total_centavos AS total_resumo, x.total AS total_real
+            FROM chaves c
+            LEFT JOIN resumo_mensal r ON r.ano = c.ano AND r.mes = c.mes AND r.tipo = c.tipo AND r.categoria_id = c.categoria_id
+            LEFT JOIN reais x ON x.ano = c.ano AND x.mes = c.mes AND x.tipo = c.tipo AND x.categoria_id = c.categoria_id
+            WHERE r.total_centavos IS NULL OR x.total IS NULL OR r.total_centavos != x.total""")
+        divergencias = [tuple(linha) for linha in cursor.fetchall()]
+        if reconstruir:
+            cursor.execute("DELETE FROM resumo_mensal")
+            cursor.execute(_sql_reconstruir_resumo())
+            _confirmar_escrita(conn, cursor)
+        else: conn.commit()
+        return divergencias
+    except Exception: conn.rollback(); raise
+    finally: cursor.close()
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Manutenção do banco do controle financeiro.")
+    parser.add_argument('--banco', default=NOME_BANCO_DADOS)
+    parser.add_argument('--verificar-resumo', action='store_true', help="compara resumo_mensal com as transações")
+    parser.add_argument('--reconstruir-resumo', action='store_true', help="refaz resumo_mensal a partir das transações")
+    args = parser.parse_args()
+    configurar_banco_dados(args.banco)
+    inicializar_banco_de_dados()
+    if args.verificar_resumo or args.reconstruir_resumo:
+        divergencias = verificar_resumo_mensal_db(reconstruir=args.reconstruir_resumo)
+        for ano, mes, tipo, categoria, total_resumo, total_real in divergencias:
+            print(f"{ano}-{mes:02d} {tipo:<8} {categoria or '-':<20} resumo={total_resumo} real={total_real}")
+        print(f"{len(divergencias)} divergência(s)" + (" — resumo reconstruído." if args.reconstruir_resumo else "."))
@@ -0,0 +1,112 @@
+"""Agregação de valores: REAL somado como float (antes) x centavos inteiros (depois).
+
+Uso: python benchmarks/bench_agregacao.py [--linhas 200000] [--repeticoes 20]
+
+Mede consultas/s (mediana de execuções intercaladas) das agregações sobre a tabela
+inteira (SUM por tipo e por ano/mês/tipo) e da soma em Python que o antigo
+calcular_saldo_db fazia, e mostra o desvio de cada resultado em relação ao total exato
+calculado com Decimal.
+
+"Depois" é o caminho que a aplicação usa: os mesmos totais lidos do resumo_mensal, em
+centavos. As linhas "varredura" somam valor_centavos direto em transacoes_tb, que nenhuma
+consulta da aplicação faz: ficam como referência do custo de varrer a tabela, que com a
+linha mais larga (valor_centavos no fim, depois das colunas das migrações) fica entre 0,3x e 1x
+do SUM(valor REAL) da tabela antiga.
+"""
+import argparse
+import datetime
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import banco_dados
+from dinheiro import formatar_centavos
+
+CONSULTAS = {
+    'SUM por tipo': ("SELECT tipo, SUM(valor) FROM transacoes_tb GROUP BY tipo",
+                     "SELECT tipo, SUM(total_centavos) FROM resumo_mensal GROUP BY tipo"),
+    'SUM por ano/mês/tipo': ("SELECT ano, mes, tipo, SUM(valor) FROM transacoes_tb GROUP BY ano, mes, tipo",
+                             "SELECT ano, mes, tipo, SUM(total_centavos) FROM resumo_mensal GROUP BY ano, mes, tipo"),
+    'varredura por tipo': ("SELECT tipo, SUM(valor) FROM transacoes_tb GROUP BY tipo",
+                           "SELECT tipo, SUM(valor_centavos) FROM transacoes_tb GROUP BY tipo"),
+    'varredura ano/mês/tipo': ("SELECT ano, mes, tipo, SUM(valor) FROM transacoes_tb GROUP BY ano, mes, tipo",
+                               "SELECT ano, mes, tipo, SUM(valor_centavos) FROM transacoes_tb GROUP BY ano, mes, tipo"),
+}
+
+
+def _gerar_transacoes(n):
+    aleatorio = random.Random(7)
+    inicio = datetime.datetime(2015, 1, 1)
+    for _ in range(n):
+        data = inicio + datetime.timedelta(minutes=aleatorio.randrange(10 * 365 * 24 * 60))
+        tipo = 'ganho' if aleatorio.random() < 0.2 else 'despesa'
+        yield tipo, aleatorio.randrange(1, 500_000), data.isoformat(), data.year, data.month
+
+def _comparar(chamada_antes, chamada_depois, repeticoes):
+    """Execuções intercaladas (o ruído da máquina afeta os dois lados); retorna a vazão mediana por segundo."""
+    tempos_antes, tempos_depois = [], []
+    for _ in range(repeticoes):
+        for chamada, tempos in ((chamada_antes, tempos_antes), (chamada_depois, tempos_depois)):
+            inicio = time.perf_counter(); chamada(); tempos.append(time.perf_counter() - inicio)
+    return 1 / statistics.median(tempos_antes), 1 / statistics.median(tempos_depois)
+
+def _somar_em_python(conn):
+    # Antigo calcular_saldo_db: buscava as linhas e somava floats em Python.
+    soma = 0.0
+    for (valor,) in conn.execute("SELECT valor FROM transacoes_tb WHERE tipo = 'despesa'"): soma += valor
+    return soma
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--linhas', type=int, default=200_000)
+    parser.add_argument('--repeticoes', type=int, default=20)
+    args = parser.parse_args()
+    transacoes = list(_gerar_transacoes(args.linhas))
+    exato = sum(Decimal(centavos).scaleb(-2) for tipo, centavos, *_ in transacoes if tipo == 'despesa')
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        antes = sqlite3.connect(os.path.join(diretorio, 'antes.db'))
+        for pragma in banco_dados.PRAGMAS_CONEXAO: antes.execute(pragma)   # mesma configuração: só o tipo da coluna muda
+        antes.execute("CREATE TABLE transacoes_tb (id INTEGER PRIMARY KEY AUTOINCREMENT, tipo TEXT NOT NULL, descricao TEXT NOT NULL, "
+                      "valor REAL NOT NULL, categoria TEXT, data_registro TIMESTAMP, ano INTEGER, mes INTEGER)")
+        # O valor em reais chega como o float que o float(entry.get()) da GUI produzia.
+        antes.executemany("INSERT INTO transacoes_tb (tipo, descricao, valor, data_registro, ano, mes) VALUES (?, 'x', ?, ?, ?, ?)",
+                          ((tipo, float(formatar_centavos(centavos)), data, ano, mes) for tipo, centavos, data, ano, mes in transacoes))
+        antes.commit()
+        antes.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+        banco_dados.configurar_banco_dados(os.path.join(diretorio, 'depois.db'))
+        banco_dados.inicializar_banco_de_dados()
+        depois, _ = banco_dados.conectar_bd()
+        depois.executemany("INSERT INTO transacoes_tb (tipo, descricao, valor_centavos, data_registro, ano, mes) VALUES (?, 'x', ?, ?, ?, ?)",
+                           transacoes)
+        depois.commit()
+        depois.execute("PRAGMA wal_checkpoint(TRUNCATE)")   # mede o estado estável, sem páginas pendentes no WAL
+
+        print(f"{args.linhas:,} transações")
+        print(f"{'agregação':<26}{'antes (q/s)':>13}{'depois (q/s)':>14}{'ganho':>8}")
+        for nome, (sql_antes, sql_depois) in CONSULTAS.items():
+            qps_antes, qps_depois = _comparar(lambda: antes.execute(sql_antes).fetchall(), lambda: depois.execute(sql_depois).fetchall(), args.repeticoes)
+            print(f"{nome:<26}{qps_antes:>13,.1f}{qps_depois:>14,.1f}{qps_depois / qps_antes:>7.1f}x")
+        # O saldo agora é um SUM inteiro sobre resumo_mensal, mantido pelos triggers.
+        qps_antes, qps_depois = _comparar(lambda: _somar_em_python(antes), banco_dados.calcular_saldo_db, args.repeticoes)
+        print(f"{'saldo (calcular_saldo_db)':<26}{qps_antes:>13,.1f}{qps_depois:>14,.1f}{qps_depois / qps_antes:>7.1f}x")
+
+        soma_python = _somar_em_python(antes)
+        total_despesas_centavos = banco_dados.calcular_saldo_db()[1]
+        soma_sql_float = antes.execute("SELECT SUM(valor) FROM transacoes_tb WHERE tipo = 'despesa'").fetchone()[0]
+        print(f"\ntotal de despesas exato:   {exato}")
+        print(f"float somado em Python:    {soma_python!r}  (desvio {Decimal(soma_python) - exato:+.2E})")
+        print(f"SUM(valor REAL) no SQLite: {soma_sql_float!r}  (desvio {Decimal(soma_sql_float) - exato:+.2E})")
+        print(f"SUM(valor_centavos):       {formatar_centavos(total_despesas_centavos)}  (desvio {Decimal(total_despesas_centavos).scaleb(-2) - exato:+.2E})")
+        antes.close(); banco_dados.fechar_conexoes_bd()
+
+
+if __name__ == '__main__':
+    main()
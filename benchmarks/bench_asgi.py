@@ -0,0 +1,158 @@
+"""Muitos clientes simultâneos: aplicação Flask (gunicorn, threads) x aplicação ASGI (uvicorn, executor do banco).
+
+Uso: python benchmarks/bench_asgi.py [--clientes 50 200 500] [--requisicoes 3000] [--threads 8] [--linhas 100000]
+
+Precisa do gunicorn e do uvicorn (pip install gunicorn uvicorn). Cria um banco temporário com
+--linhas transações e, para cada servidor, dispara --requisicoes GETs da página inicial e da
+listagem JSON com N clientes abertos ao mesmo tempo (um "painel" por cliente, uma conexão por
+requisição). Os dois servidores rodam num processo só: o Flask com --threads threads no gunicorn
+(gthread) e o ASGI com --threads threads no executor do banco. Mede req/s, latência p50/p99 e
+falhas (conexão recusada, timeout ou status diferente de 200). Antes, sem servidor, confere que
+as duas aplicações respondem 400 com o formulário (não 500) a um POST de despesa com valor inválido.
+"""
+import argparse
+import asyncio
+import contextlib
+import datetime
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from calendar import timegm
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+import banco_dados
+
+CAMINHOS = ('/?limite=50', '/api/transacoes?limite=50', '/?limite=50&ano=2024', '/api/transacoes?limite=50&ano=2023&mes=3')
+TIMEOUT_REQUISICAO = 30.0
+
+
+def _porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def _popular(caminho, linhas):
+    banco_dados.configurar_banco_dados(caminho)
+    banco_dados.inicializar_banco_de_dados()
+    conn, _ = banco_dados.conectar_bd()
+    aleatorio, inicio = random.Random(23), datetime.datetime(2020, 1, 1)
+    def gerar():
+        for i in range(linhas):
+            data = inicio + datetime.timedelta(minutes=aleatorio.randrange(6 * 365 * 24 * 60))
+            yield ('despesa', f"Compra {i}", aleatorio.randrange(100, 50_000), data.isoformat(), data.year, data.month, timegm(data.timetuple()))
+    conn.executemany("INSERT INTO transacoes_tb (tipo, descricao, valor_centavos, data_registro, ano, mes, data_epoch) VALUES (?, ?, ?, ?, ?, ?, ?)", gerar())
+    conn.commit()
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    banco_dados.fechar_conexoes_bd()
+
+@contextlib.contextmanager
+def _servidor(comando, ambiente, porta):
+    processo = subprocess.Popen(comando, cwd=RAIZ, env=dict(os.environ, **ambiente), stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+    try:
+        limite = time.monotonic() + 60
+        while True:
+            if processo.poll() is not None or time.monotonic() > limite: raise RuntimeError(f"o servidor não subiu: {' '.join(comando)}")
+            with contextlib.suppress(OSError):
+                socket.create_connection(('127.0.0.1', porta), timeout=1).close()
+                break
+            time.sleep(0.1)
+        yield
+    finally:
+        processo.terminate()
+        processo.wait(30)
+
+async def _get(porta, caminho):
+    # HTTP/1.1 mínimo com Connection: close; devolve o status.
+    leitor, escritor = await asyncio.open_connection('127.0.0.1', porta)
+    try:
+        escritor.write(f"GET {caminho} HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n\r\n".encode('ascii'))
+        await escritor.drain()
+        resposta = await leitor.read()
+        return int(resposta.split(b' ', 2)[1])
+    finally:
+        escritor.close()
+
+async def _carga(porta, requisicoes, clientes):
+    fila, latencias, falhas = iter(range(requisicoes)), [], 0
+
+    async def cliente():
+        nonlocal falhas
+        for i in fila:
+            inicio = time.perf_counter()
+            try: status = await asyncio.wait_for(_get(porta, CAMINHOS[i % len(CAMINHOS)]), TIMEOUT_REQUISICAO)
+            except (OSError, asyncio.TimeoutError, IndexError, ValueError): status = None
+            if status == 200: latencias.append(time.perf_counter() - inicio)
+            else: falhas += 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente() for _ in range(clientes)))
+    return time.perf_counter() - inicio, sorted(latencias), falhas
+
+def _medir(nome, comando, ambiente, porta, requisicoes, clientes):
+    with _servidor(comando, ambiente, porta):
+        asyncio.run(_carga(porta, 200, 10))   # aquecimento (cache de consultas, templates)
+        decorrido, latencias, falhas = asyncio.run(_carga(porta, requisicoes, clientes))
+    p50 = statistics.median(latencias) * 1000 if latencias else float('nan')
+    p99 = latencias[min(int(len(latencias) * 0.99), len(latencias) - 1)] * 1000 if latencias else float('nan')
+    print(f"{nome:<22}{clientes:>9}{len(latencias) / decorrido:>10,.0f}{p50:>10.1f}{p99:>10.1f}{falhas:>8}")
+
+def _conferir_formulario(diretorio):
+    import app_web, app_asgi
+    app = app_web.criar_app({'BANCO_DADOS': os.path.join(diretorio, 'formulario.db'), 'CACHE_HTTP_DIRETORIO': os.path.join(diretorio, 'respostas')})
+    aplicacao = app_asgi.AplicacaoAsgi(app, threads_banco=1)
+
+    async def post_asgi(corpo):
+        enviado, mensagens = [], [{'type': 'http.request', 'body': corpo.encode('utf-8')}]
+        async def receive(): return mensagens.pop(0)
+        async def send(mensagem): enviado.append(mensagem)
+        await aplicacao({'type': 'http', 'method': 'POST', 'path': '/despesa/nova', 'query_string': b'',
+                         'headers': [(b'content-type', b'application/x-www-form-urlencoded')]}, receive, send)
+        return enviado[0]['status'], enviado[1]['body'].decode('utf-8')
+
+    resultados = []
+    for valor in ('abc', '-5', '1e30'):
+        resposta = app.test_client().post('/despesa/nova', data={'descricao': "Teste", 'valor': valor, 'categoria': "Teste"})
+        resultados.append((f"Flask {valor}", resposta.status_code, resposta.get_data(as_text=True)))
+        resultados.append((f"ASGI {valor}", *asyncio.run(post_asgi(f"descricao=Teste&valor={valor}&categoria=Teste"))))
+    resposta = app.test_client().post('/despesa/nova', data={'descricao': "Válida", 'valor': '12,34', 'categoria': "Teste"})
+    aplicacao.executor.shutdown()
+    banco_dados.fechar_conexoes_bd()
+    erradas = [nome for nome, status, corpo in resultados if status != 400 or app_web.ERRO_FORMULARIO_DESPESA not in corpo or '<form' not in corpo]
+    certo = not erradas and resposta.status_code == 302
+    print(f"POST de despesa com valor inválido (abc, -5, 1e30): {'400 com o formulário, ok' if certo else 'FALHOU ' + ', '.join(erradas)}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clientes', type=int, nargs='+', default=[50, 200, 500])
+    parser.add_argument('--requisicoes', type=int, default=3000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--linhas', type=int, default=100_000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as diretorio: _conferir_formulario(diretorio)
+    for modulo in ('gunicorn', 'uvicorn'):
+        try: __import__(modulo)
+        except ImportError: sys.exit(f"este benchmark precisa do {modulo}: pip install {modulo}")
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = os.path.join(diretorio, 'asgi.db')
+        _popular(caminho, args.linhas)
+        print(f"{args.linhas:,} transações; {args.requisicoes} GETs por rodada; {args.threads} threads por servidor, 1 processo cada")
+        print(f"{'servidor':<22}{'clientes':>9}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'falhas':>8}")
+        for clientes in args.clientes:
+            porta = _porta_livre()
+            ambiente = {'FINANCEIRO_BANCO_DADOS': caminho, 'FINANCEIRO_WORKERS': '1', 'FINANCEIRO_THREADS': str(args.threads),
+                        'FINANCEIRO_THREADS_BANCO': str(args.threads), 'FINANCEIRO_TAMANHO_POOL': str(args.threads),
+                        'FINANCEIRO_ENDERECO': f"127.0.0.1:{porta}"}
+            _medir("Flask + gunicorn", [sys.executable, '-m', 'gunicorn', '--log-level', 'warning'], ambiente, porta, args.requisicoes, clientes)
+            _medir("ASGI + uvicorn", [sys.executable, '-m', 'uvicorn', '--factory', 'app_asgi:criar_app_asgi', '--port', str(porta),
+                                      '--log-level', 'warning', '--backlog', '2048'], ambiente, porta, args.requisicoes, clientes)
+
+
+if __name__ == '__main__':
+    main()
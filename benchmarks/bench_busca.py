@@ -0,0 +1,88 @@
+"""Busca por texto: LIKE '%termo%' varrendo a tabela (antes) x índice FTS5 (depois).
+
+Uso: python benchmarks/bench_busca.py [--linhas 1000000] [--repeticoes 5]
+
+Mede a latência mediana (ms) de buscar_texto_db para termos raros, comuns e prefixos
+digitados pela metade, contra o LIKE equivalente sobre descricao/categoria. O LIKE só
+devolve as mais recentes (sem relevância) e para cedo quando o termo é muito comum; o
+custo dele aparece nos termos raros e nos que não casam, que varrem a tabela inteira.
+
+Termos comuns ("mercado", "farm") são o pior caso do FTS5: ele ranqueia até
+MAX_CANDIDATOS_BUSCA casamentos com bm25 (custo limitado, ~10-20 ms em 200 mil linhas),
+enquanto o LIKE acha as 100 mais recentes logo no começo do índice de data. É o preço da
+relevância e da remoção de acentos ("cafe" acha "Café", o LIKE não). Termos com menos de
+TAMANHO_MINIMO_FTS letras ("pa", "me") vão direto para o LIKE em buscar_texto_db; a coluna
+"caminho" mostra qual foi usado.
+"""
+import argparse
+import calendar
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import banco_dados
+
+ESTABELECIMENTOS = ['Padaria Pão Quente', 'Supermercado Bom Preço', 'Posto Shell', 'Farmácia São João', 'Uber', 'iFood',
+                    'Netflix', 'Conta de Luz', 'Aluguel', 'Academia', 'Livraria Cultura', 'Café Central', 'Pet Shop Amigo']
+CATEGORIAS = ['Mercado', 'Transporte', 'Moradia', 'Lazer', 'Saúde', 'Alimentação', 'Educação']
+TERMOS = ['livraria', 'padaria pao', 'farm', 'cafe', 'mercado', 'pa', 'me', 'transacao 4242', 'inexistente']
+
+
+def _gerar_linhas(n, ids_categorias):
+    aleatorio = random.Random(11)
+    inicio = datetime.datetime(2015, 1, 1)
+    for i in range(n):
+        data = inicio + datetime.timedelta(minutes=aleatorio.randrange(10 * 365 * 24 * 60))
+        descricao = f"{aleatorio.choice(ESTABELECIMENTOS)} transação {aleatorio.randrange(100_000)}"
+        yield ('despesa', descricao, aleatorio.randrange(100, 500_000), ids_categorias[aleatorio.choice(CATEGORIAS)],
+               data.isoformat(), data.year, data.month, calendar.timegm(data.timetuple()))
+
+def _buscar_like(conn, texto, limite=100):
+    condicoes, params = [], []
+    for termo in texto.split():
+        condicoes.append("(t.descricao LIKE ? OR c.nome LIKE ?)"); params += [f"%{termo}%"] * 2
+    return conn.execute("SELECT t.id FROM transacoes_tb t LEFT JOIN categorias c ON c.id = t.categoria_id WHERE " + " AND ".join(condicoes) +
+                        " ORDER BY t.data_epoch DESC, t.id DESC LIMIT ?", params + [limite]).fetchall()
+
+def _mediana_ms(chamada, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter(); chamada(); tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--linhas', type=int, default=1_000_000)
+    parser.add_argument('--repeticoes', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        banco_dados.configurar_banco_dados(os.path.join(diretorio, 'busca.db'))
+        banco_dados.inicializar_banco_de_dados()
+        conn, cursor = banco_dados.conectar_bd()
+        inicio = time.perf_counter()
+        ids_categorias = banco_dados._ids_categorias(cursor, CATEGORIAS)
+        conn.executemany("INSERT INTO transacoes_tb (tipo, descricao, valor_centavos, categoria_id, data_registro, ano, mes, data_epoch) "
+                         "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", _gerar_linhas(args.linhas, ids_categorias))
+        conn.commit()
+        conn.execute("INSERT INTO transacoes_fts (transacoes_fts) VALUES ('optimize')")
+        conn.commit()
+        print(f"{args.linhas:,} transações inseridas (com os triggers do FTS) em {time.perf_counter() - inicio:.1f}s")
+
+        print(f"{'termo':<18}{'resultados':>11}{'LIKE (ms)':>12}{'busca (ms)':>12}{'ganho':>9}  caminho")
+        for termo in TERMOS:
+            resultados = len(banco_dados.buscar_texto_db(termo))
+            ms_like = _mediana_ms(lambda: _buscar_like(conn, termo), args.repeticoes)
+            ms_fts = _mediana_ms(lambda: banco_dados.buscar_texto_db(termo), args.repeticoes)
+            caminho = 'FTS5' if max(map(len, termo.split())) >= banco_dados.TAMANHO_MINIMO_FTS else 'LIKE'
+            print(f"{termo:<18}{resultados:>11}{ms_like:>12.1f}{ms_fts:>12.1f}{ms_like / ms_fts:>8.1f}x  {caminho}")
+        banco_dados.fechar_conexoes_bd()
+
+
+if __name__ == '__main__':
+    main()
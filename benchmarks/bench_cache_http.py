@@ -0,0 +1,110 @@
+"""Cache de respostas HTTP: custo de montar a página x acerto em memória x 304 x acerto no disco.
+
+Uso: python benchmarks/bench_cache_http.py [--linhas 100000] [--repeticoes 200]
+
+Precisa do Flask. Cria um banco temporário com --linhas transações e, pelo cliente de teste da
+aplicação (sem rede), mede o tempo médio por GET de algumas rotas em quatro situações: cache
+desligado (a página é montada toda vez), acerto no cache em memória, revalidação com
+If-None-Match (304, sem corpo) e acerto no cache em disco (memória vazia, como num worker que
+acabou de subir). No fim faz uma escrita e confere que a próxima resposta não vem do cache.
+Antes, confere que as consultas de um período além do horizonte das recorrências (ocorrências
+previstas) saem do cache de consultas iguais às sem cache depois de cada escrita numa regra.
+"""
+import argparse
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from calendar import timegm
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+import banco_dados
+
+CAMINHOS = ('/?limite=50', '/?limite=50&ano=2024', '/api/transacoes?limite=50&ano=2023&mes=3', '/resumo?ano=2024', '/relatorios?ano=2024')
+
+
+def _popular(caminho, linhas):
+    banco_dados.configurar_banco_dados(caminho)
+    banco_dados.inicializar_banco_de_dados()
+    conn, _ = banco_dados.conectar_bd()
+    aleatorio, inicio = random.Random(24), datetime.datetime(2020, 1, 1)
+    def gerar():
+        for i in range(linhas):
+            data = inicio + datetime.timedelta(minutes=aleatorio.randrange(6 * 365 * 24 * 60))
+            yield ('despesa', f"Compra {i}", aleatorio.randrange(100, 50_000), data.isoformat(), data.year, data.month, timegm(data.timetuple()))
+    conn.executemany("INSERT INTO transacoes_tb (tipo, descricao, valor_centavos, data_registro, ano, mes, data_epoch) VALUES (?, ?, ?, ?, ?, ?, ?)", gerar())
+    conn.commit()
+    banco_dados.fechar_conexoes_bd()
+
+def _conferir_previstas(caminho):
+    from relatorios import gerar_relatorio
+    banco_dados.configurar_banco_dados(caminho)
+    banco_dados.inicializar_banco_de_dados()
+    ano = datetime.date.today().year + 4   # além de HORIZONTE_MESES_MAXIMO: só ocorrências previstas
+    consultas = (banco_dados.calcular_saldo_db, banco_dados.buscar_transacoes_db, banco_dados.resumir_transacoes_db, gerar_relatorio)
+    divergentes = []
+    def conferir(etapa):
+        for consulta in consultas:
+            if consulta(ano, 1) != consulta.sem_cache(ano, 1): divergentes.append(f"{etapa}: {consulta.__name__}")
+    conferir("antes")
+    id_regra = banco_dados.criar_recorrencia_db('despesa', "Assinatura", 5_000, "Teste", 'mensal', datetime.datetime(2024, 1, 10))
+    conferir("criar regra")
+    banco_dados.materializar_recorrencias_db()
+    conferir("materializar")
+    banco_dados.encerrar_recorrencia_db(id_regra, datetime.datetime(ano - 1, 6, 30))
+    conferir("encerrar regra")
+    banco_dados.fechar_conexoes_bd()
+    print(f"ocorrências previstas em {ano}/1, cache x sem cache: {'ok' if not divergentes else 'FALHOU ' + ', '.join(divergentes)}")
+
+def _medir(cliente, caminho, repeticoes, antes=None, **kwargs):
+    tempos = []
+    for _ in range(repeticoes):
+        if antes: antes()
+        inicio = time.perf_counter()
+        resposta = cliente.get(caminho, **kwargs)
+        tempos.append(time.perf_counter() - inicio)
+        assert resposta.status_code in (200, 304), (caminho, resposta.status_code)
+    return statistics.mean(tempos) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--linhas', type=int, default=100_000)
+    parser.add_argument('--repeticoes', type=int, default=200)
+    args = parser.parse_args()
+    try: import app_web
+    except ImportError: sys.exit("este benchmark precisa do Flask: pip install flask")
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        _conferir_previstas(os.path.join(diretorio, 'previstas.db'))
+        caminho = os.path.join(diretorio, 'cache_http.db')
+        _popular(caminho, args.linhas)
+        app = app_web.criar_app({'BANCO_DADOS': caminho, 'CACHE_HTTP_DIRETORIO': os.path.join(diretorio, 'respostas')})
+        cliente, cache = app.test_client(), app_web.cache_respostas
+        esvaziar_memoria = lambda: cache.configurar(cache.escopo, cache.diretorio, cache.limite_bytes_disco)
+
+        print(f"{args.linhas:,} transações; média de {args.repeticoes} GETs por célula (ms)")
+        print(f"{'rota':<44}{'sem cache':>10}{'memória':>10}{'304':>10}{'disco':>10}")
+        for rota in CAMINHOS:
+            cache.ativo = False
+            sem_cache = _medir(cliente, rota, args.repeticoes)
+            cache.ativo = True
+            etag = cliente.get(rota).headers['ETag']
+            memoria = _medir(cliente, rota, args.repeticoes)
+            revalidacao = _medir(cliente, rota, args.repeticoes, headers={'If-None-Match': etag})
+            disco = _medir(cliente, rota, args.repeticoes, antes=esvaziar_memoria)
+            print(f"{rota:<44}{sem_cache:>10.2f}{memoria:>10.3f}{revalidacao:>10.3f}{disco:>10.3f}")
+
+        etag = cliente.get('/resumo').headers['ETag']
+        banco_dados.adicionar_despesa_db("Depois do cache", 12_345, "Teste")
+        resposta = cliente.get('/resumo', headers={'If-None-Match': etag})
+        print(f"após uma escrita: status {resposta.status_code}, ETag {'novo' if resposta.headers['ETag'] != etag else 'IGUAL (FALHOU)'}")
+        print(cache.estatisticas())
+        banco_dados.fechar_conexoes_bd()
+
+
+if __name__ == '__main__':
+    main()
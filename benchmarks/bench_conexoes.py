@@ -0,0 +1,119 @@
+"""Compara ops/s das funções CRUD: uma conexão por chamada (antes) x pool de conexões (depois).
+
+Uso: python benchmarks/bench_conexoes.py [--operacoes 2000]
+"""
+import argparse
+import datetime
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import banco_dados
+
+
+# --- Implementação antiga: abre e fecha uma conexão a cada chamada ---
+def _conectar_legado():
+    conn = sqlite3.connect(banco_dados.NOME_BANCO_DADOS)
+    conn.row_factory = sqlite3.Row
+    return conn, conn.cursor()
+
+def _adicionar_despesa_legado(descricao, valor, categoria):
+    conn, cursor = _conectar_legado()
+    try:
+        cursor.execute("INSERT INTO transacoes_tb (tipo, descricao, valor, categoria, data_registro) VALUES (?, ?, ?, ?, ?)",
+                       ('despesa', descricao, valor, categoria, datetime.datetime.now().isoformat()))
+        conn.commit(); return True
+    finally: conn.close()
+
+def _buscar_por_id_legado(id_transacao):
+    conn, cursor = _conectar_legado()
+    try:
+        cursor.execute("SELECT * FROM transacoes_tb WHERE id = ?", (id_transacao,))
+        linha = cursor.fetchone()
+        return dict(linha) if linha else None
+    finally: conn.close()
+
+def _editar_legado(id_transacao, descricao, valor, categoria):
+    conn, cursor = _conectar_legado()
+    try:
+        cursor.execute("UPDATE transacoes_tb SET descricao = ?, valor = ?, categoria = ? WHERE id = ?",
+                       (descricao, valor, categoria, id_transacao))
+        conn.commit(); return True
+    finally: conn.close()
+
+def _buscar_mes_legado(ano, mes):
+    conn, cursor = _conectar_legado()
+    try:
+        cursor.execute("SELECT id, tipo, descricao, valor, categoria, data_registro FROM transacoes_tb "
+                       "WHERE strftime('%Y', data_registro) = ? AND strftime('%m', data_registro) = ? "
+                       "ORDER BY data_registro DESC, id DESC", (str(ano), f"{mes:02d}"))
+        return [dict(linha) for linha in cursor.fetchall()]
+    finally: conn.close()
+
+def _excluir_legado(id_transacao):
+    conn, cursor = _conectar_legado()
+    try:
+        cursor.execute("DELETE FROM transacoes_tb WHERE id = ?", (id_transacao,))
+        conn.commit(); return cursor.rowcount > 0
+    finally: conn.close()
+
+LEGADO = {
+    'inserir': lambda i: _adicionar_despesa_legado(f"Item {i}", 10.0 + i, "Bench"),
+    'buscar_id': lambda i: _buscar_por_id_legado(i + 1),
+    'editar': lambda i: _editar_legado(i + 1, f"Item {i}*", 11.0, "Bench"),
+    'buscar_mes': lambda i: _buscar_mes_legado(1900, 1),
+    'excluir': lambda i: _excluir_legado(i + 1),
+}
+
+POOL = {
+    'inserir': lambda i: banco_dados.adicionar_despesa_db(f"Item {i}", 1000 + i, "Bench"),
+    'buscar_id': lambda i: banco_dados._buscar_transacao_por_id_db(i + 1),
+    'editar': lambda i: banco_dados.editar_transacao_db(i + 1, f"Item {i}*", 1100, "Bench"),
+    'buscar_mes': lambda i: banco_dados.buscar_transacoes_db(ano=1900, mes=1),
+    'excluir': lambda i: banco_dados.excluir_transacao_db(i + 1),
+}
+
+
+def _medir(operacoes, n):
+    resultados = {}
+    for nome, funcao in operacoes.items():
+        inicio = time.perf_counter()
+        for i in range(n): funcao(i)
+        resultados[nome] = n / (time.perf_counter() - inicio)
+    return resultados
+
+def _preparar_banco(diretorio, nome):
+    caminho = os.path.join(diretorio, nome)
+    banco_dados.configurar_banco_dados(caminho)
+    banco_dados.inicializar_banco_de_dados()
+    return caminho
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--operacoes', type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        # O banco "antes" fica no modo de journal padrão (DELETE), como era criado originalmente.
+        caminho_antes = os.path.join(diretorio, 'antes.db')
+        conn = sqlite3.connect(caminho_antes)
+        conn.execute("CREATE TABLE transacoes_tb (id INTEGER PRIMARY KEY AUTOINCREMENT, tipo TEXT NOT NULL, descricao TEXT NOT NULL, "
+                     "valor REAL NOT NULL, categoria TEXT, data_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+        conn.commit(); conn.close()
+        banco_dados.NOME_BANCO_DADOS = caminho_antes
+        antes = _medir(LEGADO, args.operacoes)
+
+        _preparar_banco(diretorio, 'depois.db')
+        depois = _medir(POOL, args.operacoes)
+        banco_dados.fechar_conexoes_bd()
+
+    print(f"{'operação':<16}{'antes (ops/s)':>16}{'depois (ops/s)':>16}{'ganho':>10}")
+    for nome in LEGADO:
+        print(f"{nome:<16}{antes[nome]:>16,.0f}{depois[nome]:>16,.0f}{depois[nome] / antes[nome]:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
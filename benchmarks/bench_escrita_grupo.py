@@ -0,0 +1,107 @@
+"""Rajada de INSERTs de muitas threads: um commit por chamada x escrita em grupo (group commit).
+
+Uso: python benchmarks/bench_escrita_grupo.py [--threads 1 8 32] [--por-thread 200] [--lote 256] [--espera-ms 0]
+
+Cada rodada usa um banco temporário novo e N threads chamando adicionar_despesa_db o mais
+rápido que conseguem, como webhooks chegando ao mesmo tempo. Compara três modos:
+  direto NORMAL  - como hoje: um commit por chamada, synchronous=NORMAL (sem fsync por commit);
+  direto FULL    - um commit por chamada com fsync em cada um (confirmação durável);
+  em grupo FULL  - banco_dados.iniciar_escrita_em_grupo: confirmação durável, um fsync por lote.
+Mede linhas/s de ponta a ponta, latência p50/p95/p99 de cada chamada e erros
+("database is locked"), e confere que todas as linhas foram gravadas. Antes, confere um lote
+com um pedido inválido no meio dos válidos: só ele falha, e o lote seguinte grava normalmente;
+depois de parar o escritor, a gravação volta a ser direta.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+import banco_dados
+from escrita_em_grupo import EscritorParado
+
+PRAGMAS_ORIGINAIS = banco_dados.PRAGMAS_CONEXAO
+SINCRONO_FULL = tuple("PRAGMA synchronous = FULL" if 'synchronous' in pragma else pragma for pragma in PRAGMAS_ORIGINAIS)
+
+
+def _percentil(ordenados, p):
+    return ordenados[min(int(len(ordenados) * p), len(ordenados) - 1)] * 1000 if ordenados else float('nan')
+
+def _conferir_lote_misto(caminho):
+    banco_dados.configurar_banco_dados(caminho)
+    banco_dados.inicializar_banco_de_dados()
+    banco_dados.iniciar_escrita_em_grupo(max_lote=16, max_espera_ms=50.0)   # a espera junta os três pedidos num lote só
+    transacao = lambda descricao, valor: [{'tipo': 'despesa', 'descricao': descricao, 'valor_centavos': valor, 'categoria': 'Teste',
+                                           'data_registro': '2024-06-15T12:00:00'}]
+    futuros = [banco_dados.escritor_em_grupo.enviar(transacao(descricao, valor))
+               for descricao, valor in (("Válido 1", 100), ("Fora do INTEGER", 10 ** 19), ("Válido 2", 200))]
+    falhas = [type(futuro.exception(10)).__name__ if futuro.exception(10) else None for futuro in futuros]
+    try: banco_dados.adicionar_despesa_db("Lote seguinte", 300, "Teste", '2024-06-15T12:00:00'); seguinte = 'ok'
+    except Exception as e: seguinte = f"{type(e).__name__}: {e}"
+    banco_dados.parar_escrita_em_grupo()
+    try: banco_dados.escritor_em_grupo.enviar(transacao("Depois de parar", 400)); parado = 'aceito (FALHOU)'
+    except EscritorParado: parado = 'recusado'
+    banco_dados.adicionar_despesa_db("Direto", 500, "Teste", '2024-06-15T12:00:00')
+    banco_dados.fechar_conexoes_bd()
+    gravadas = [linha[0] for linha in sqlite3.connect(caminho).execute("SELECT descricao FROM transacoes_tb ORDER BY id")]
+    certo = falhas == [None, 'OverflowError', None] and seguinte == 'ok' and gravadas == ["Válido 1", "Válido 2", "Lote seguinte", "Direto"]
+    print(f"lote misto: falhas {falhas}, lote seguinte {seguinte}, enviar após parar {parado}, gravadas {gravadas}  {'ok' if certo and parado == 'recusado' else 'FALHOU'}")
+
+def _rodada(caminho, modo, threads, por_thread, lote, espera_ms):
+    banco_dados.PRAGMAS_CONEXAO = SINCRONO_FULL if modo == 'direto FULL' else PRAGMAS_ORIGINAIS
+    banco_dados.configurar_banco_dados(caminho, tamanho_pool=threads + 1, timeout=30.0)
+    banco_dados.inicializar_banco_de_dados()
+    if modo == 'em grupo FULL': banco_dados.iniciar_escrita_em_grupo(lote, espera_ms)
+    latencias, erros, largada = [], [], threading.Barrier(threads + 1)
+
+    def cliente(numero):
+        largada.wait()
+        minhas = []
+        for i in range(por_thread):
+            inicio = time.perf_counter()
+            try: banco_dados.adicionar_despesa_db(f"Webhook {numero}-{i}", 100 + i, f"Cartão {numero % 4}", '2024-06-15T12:00:00')
+            except sqlite3.Error as e: erros.append(e); continue
+            minhas.append(time.perf_counter() - inicio)
+        latencias.extend(minhas)
+        banco_dados.liberar_conexao_bd()
+
+    trabalhadores = [threading.Thread(target=cliente, args=(n,)) for n in range(threads)]
+    for trabalhador in trabalhadores: trabalhador.start()
+    largada.wait()
+    inicio = time.perf_counter()
+    for trabalhador in trabalhadores: trabalhador.join()
+    decorrido = time.perf_counter() - inicio
+    estatisticas = banco_dados.escritor_em_grupo.estatisticas()
+    banco_dados.parar_escrita_em_grupo()
+    banco_dados.fechar_conexoes_bd()
+    gravadas = sqlite3.connect(caminho).execute("SELECT COUNT(*) FROM transacoes_tb WHERE descricao LIKE 'Webhook %'").fetchone()[0]
+    latencias.sort()
+    lotes = f"{estatisticas['media_por_lote']:.1f}" if modo == 'em grupo FULL' else '1'
+    print(f"{modo:<15}{threads:>8}{len(latencias) / decorrido:>10,.0f}{_percentil(latencias, 0.5):>9.2f}{_percentil(latencias, 0.95):>9.2f}"
+          f"{_percentil(latencias, 0.99):>9.2f}{lotes:>8}{len(erros):>7}  {'ok' if gravadas == len(latencias) else 'FALHOU'} ({gravadas} linhas)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--por-thread', type=int, default=200)
+    parser.add_argument('--lote', type=int, default=256)
+    parser.add_argument('--espera-ms', type=float, default=0.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        _conferir_lote_misto(os.path.join(diretorio, 'lote_misto.db'))
+        print(f"{args.por_thread} INSERTs por thread; escrita em grupo com lotes de até {args.lote}, espera de {args.espera_ms} ms")
+        print(f"{'modo':<15}{'threads':>8}{'linhas/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'lote':>8}{'erros':>7}  gravação")
+        for threads in args.threads:
+            for modo in ('direto NORMAL', 'direto FULL', 'em grupo FULL'):
+                _rodada(os.path.join(diretorio, f"{modo.replace(' ', '_')}_{threads}.db"), modo, threads, args.por_thread, args.lote, args.espera_ms)
+    banco_dados.PRAGMAS_CONEXAO = PRAGMAS_ORIGINAIS
+
+
+if __name__ == '__main__':
+    main()
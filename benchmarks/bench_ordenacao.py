@@ -0,0 +1,73 @@
+"""Latência da ordenação por coluna: reconverter texto exibido (antes) x chaves tipadas (depois).
+
+Uso: python benchmarks/bench_ordenacao.py [--linhas 100000]
+
+O "antes" mede só a conversão + sort; a versão antiga ainda fazia um Treeview.move por
+item, custo que aqui não aparece (e que a ListaVirtual também eliminou).
+"""
+import argparse
+import calendar
+import datetime
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lista_virtual import chave_por_tipo
+from dinheiro import formatar_centavos
+
+# (nome, índice exibido, tipo, índice tipado) — mesmo layout de _linha_da_transacao
+COLUNAS = [('ID', 0, 'int', 0), ('Data', 1, 'date', 6), ('Tipo', 2, 'str', 2),
+           ('Descrição', 3, 'str', 3), ('Valor (R$)', 4, 'float', 7), ('Categoria', 5, 'str', 8)]
+
+
+def _converter_valor_legado(valor_str, tipo_coluna):
+    # Cópia do antigo AppControleFinanceiro._converter_valor_para_ordenacao
+    if valor_str is None or valor_str == "-": return "" if tipo_coluna == 'str' else (datetime.datetime.min if tipo_coluna == 'date' else 0)
+    if tipo_coluna == 'int': return int(valor_str)
+    elif tipo_coluna == 'float':
+        try: return float(str(valor_str).replace('R$', '').replace('.', '', 100).replace(',', '.').strip())
+        except ValueError: return 0.0
+    elif tipo_coluna == 'date':
+        try: return datetime.datetime.strptime(valor_str, '%d/%m/%Y')
+        except ValueError: return datetime.datetime.min
+    return str(valor_str).lower()
+
+def _gerar_linhas(n):
+    aleatorio = random.Random(42)
+    categorias = [None, 'Moradia', 'Mercado', 'Transporte', 'Lazer', 'Saúde']
+    inicio = datetime.datetime(2015, 1, 1)
+    linhas = []
+    for i in range(n):
+        data = inicio + datetime.timedelta(minutes=aleatorio.randrange(10 * 365 * 24 * 60))
+        valor_centavos = aleatorio.randrange(100, 500_000)
+        categoria = aleatorio.choice(categorias)
+        tipo = 'ganho' if categoria is None else 'despesa'
+        linhas.append((i + 1, data.strftime('%d/%m/%Y'), tipo.capitalize(), f"Transação {aleatorio.randrange(10**6)}",
+                       formatar_centavos(valor_centavos), categoria if categoria is not None else "-", calendar.timegm(data.timetuple()), valor_centavos, categoria))
+    return linhas
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--linhas', type=int, default=100_000)
+    args = parser.parse_args()
+    linhas = _gerar_linhas(args.linhas)
+
+    print(f"{args.linhas:,} linhas")
+    print(f"{'coluna':<12}{'antes (ms)':>12}{'depois (ms)':>13}{'ganho':>9}")
+    for nome, indice_exibido, tipo, indice_tipado in COLUNAS:
+        copia = list(linhas)
+        inicio = time.perf_counter()
+        copia.sort(key=lambda linha: _converter_valor_legado(linha[indice_exibido], tipo))
+        antes = (time.perf_counter() - inicio) * 1000
+
+        copia = list(linhas)
+        inicio = time.perf_counter()
+        copia.sort(key=chave_por_tipo(indice_tipado, tipo))
+        depois = (time.perf_counter() - inicio) * 1000
+        print(f"{nome:<12}{antes:>12.1f}{depois:>13.1f}{antes / depois:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
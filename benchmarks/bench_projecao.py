@@ -0,0 +1,106 @@
+"""Projeção de fluxo de caixa: laço por transação em Python (antes) x agregados + NumPy (depois).
+
+Uso: python benchmarks/bench_projecao.py [--linhas 1000000] [--anos 10] [--repeticoes 5]
+
+Gera um histórico de 10 anos terminando no mês corrente, com parcelas e regras recorrentes,
+e mede a mediana (ms) de uma projeção de `--anos` anos. O "antes" lê todas as transações
+e soma/projeta mês a mês em Python; o "depois" é projecao.projetar_fluxo_caixa, que lê só
+o resumo_mensal e as linhas agendadas e calcula em arrays. Confere que os dois chegam
+ao mesmo saldo final.
+"""
+import argparse
+import calendar
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import banco_dados
+import projecao
+from recorrencias import ocorrencias
+from dinheiro import formatar_centavos
+
+
+def _gerar_linhas(n, hoje):
+    aleatorio = random.Random(19)
+    inicio = datetime.datetime(hoje.year - 10, hoje.month, 1)
+    minutos = int((datetime.datetime(hoje.year, hoje.month, 1) - inicio).total_seconds() // 60)
+    for _ in range(n):
+        data = inicio + datetime.timedelta(minutes=aleatorio.randrange(minutos))
+        tipo = 'ganho' if aleatorio.random() < 0.1 else 'despesa'
+        yield (tipo, 'x', aleatorio.randrange(100, 50_000) * (8 if tipo == 'ganho' else 1), data.isoformat(), data.year, data.month,
+               calendar.timegm(data.timetuple()))
+
+def _projetar_por_linha(conn, anos, meses_historico, hoje):
+    # Sem agregados nem arrays: uma passada por transação e um laço por mês projetado.
+    mes_atual = hoje.year * 12 + hoje.month - 1
+    historico, agendado, saldo = {}, {}, 0
+    for tipo, valor, ano, mes, e_agendada in conn.execute("SELECT tipo, valor_centavos, ano, mes, compra_id IS NOT NULL OR recorrencia_id IS NOT NULL "
+                                                           "FROM transacoes_tb"):
+        indice = ano * 12 + mes - 1
+        if indice > mes_atual: agendado[(indice, tipo)] = agendado.get((indice, tipo), 0) + valor; continue
+        saldo += valor if tipo == 'ganho' else -valor
+        if indice >= mes_atual - meses_historico and indice < mes_atual and not e_agendada:
+            historico[(indice, tipo)] = historico.get((indice, tipo), 0) + valor
+    medias = {tipo: round(sum(historico.get((i, tipo), 0) for i in range(mes_atual - meses_historico, mes_atual)) / meses_historico)
+              for tipo in ('ganho', 'despesa')}
+    ano_limite, mes_limite = divmod(mes_atual + anos * 12 + 1, 12)
+    ultimo_dia = datetime.datetime(ano_limite, mes_limite + 1, 1)   # 1º dia depois do horizonte
+    for regra in banco_dados.listar_recorrencias_db():
+        if regra['proxima_data'] is None: continue
+        for _, data in ocorrencias(datetime.datetime.fromisoformat(regra['data_inicio']), regra['frequencia'], regra['intervalo'],
+                                   datetime.datetime.fromisoformat(regra['data_fim']) if regra['data_fim'] else None,
+                                   regra['total_ocorrencias'], regra['ocorrencias_geradas']):
+            if data >= ultimo_dia: break
+            indice = data.year * 12 + data.month - 1
+            agendado[(indice, regra['tipo'])] = agendado.get((indice, regra['tipo']), 0) + regra['valor_centavos']
+    for indice in range(mes_atual + 1, mes_atual + 1 + anos * 12):
+        saldo += medias['ganho'] + agendado.get((indice, 'ganho'), 0) - medias['despesa'] - agendado.get((indice, 'despesa'), 0)
+    return saldo
+
+def _mediana_ms(chamada, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter(); resultado = chamada(); tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos) * 1000, resultado
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--linhas', type=int, default=1_000_000)
+    parser.add_argument('--anos', type=int, default=10)
+    parser.add_argument('--repeticoes', type=int, default=5)
+    args = parser.parse_args()
+    hoje = datetime.date.today()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        banco_dados.configurar_banco_dados(os.path.join(diretorio, 'projecao.db'))
+        banco_dados.inicializar_banco_de_dados()
+        conn, _ = banco_dados.conectar_bd()
+        conn.executemany("INSERT INTO transacoes_tb (tipo, descricao, valor_centavos, data_registro, ano, mes, data_epoch) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         _gerar_linhas(args.linhas, hoje))
+        conn.commit()
+        for i in range(50):
+            banco_dados.adicionar_parcelas_db(f"Compra {i}", 10_000 + i, 'Parcelas', datetime.datetime(hoje.year - 1, 1 + i % 12, 1 + i % 28), 24)
+        for i, frequencia in enumerate(('semanal', 'mensal', 'anual') * 10):
+            banco_dados.criar_recorrencia_db('despesa' if i % 5 else 'ganho', f"Regra {i}", 5_000 + 100 * i, 'Assinaturas', frequencia,
+                                             datetime.datetime(hoje.year - 2, 1 + i % 12, 1 + 3 * (i % 10)),
+                                             total_ocorrencias=None if i % 3 else 300)
+        banco_dados.materializar_recorrencias_db()
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        print(f"{args.linhas:,} transações, 50 compras parceladas, 30 regras recorrentes; projeção de {args.anos} anos")
+
+        ms_antes, saldo_antes = _mediana_ms(lambda: _projetar_por_linha(conn, args.anos, projecao.MESES_HISTORICO_PADRAO, hoje), args.repeticoes)
+        ms_depois, resultado = _mediana_ms(lambda: projecao.projetar_fluxo_caixa(args.anos, hoje=hoje), args.repeticoes)
+        saldo_depois = resultado['meses'][-1]['saldo_acumulado_centavos']
+        print(f"{'laço por linha (Python)':<28}{ms_antes:>10.1f} ms   saldo final R$ {formatar_centavos(saldo_antes)}")
+        print(f"{'agregados + NumPy':<28}{ms_depois:>10.1f} ms   saldo final R$ {formatar_centavos(saldo_depois)}")
+        print(f"ganho: {ms_antes / ms_depois:.0f}x; diferença no saldo final: {saldo_depois - saldo_antes} centavos")
+        banco_dados.fechar_conexoes_bd()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+"""Aplicação web sob gunicorn com N workers: vazão, latência e consistência com leituras e escritas misturadas.
+
+Uso: python benchmarks/bench_workers.py [--workers 1 2 4] [--threads 4] [--requisicoes 2000] [--concorrencia 16]
+                                        [--escritas 0.2] [--linhas 100000]
+
+Precisa do gunicorn instalado (pip install gunicorn). Para cada N em --workers, cria um banco
+temporário com --linhas transações, sobe `gunicorn -w N` (gunicorn.conf.py) numa porta livre e
+dispara --requisicoes com --concorrencia threads: a fração --escritas são POST /api/transacoes e
+o resto GETs da página inicial, da API e do /resumo. Mede req/s, latência p50/p95/p99 e erros
+(ex.: "database is locked"). No fim confere, pelo servidor, que o /resumo de todos os workers já
+enxerga todas as escritas confirmadas (o cache de cada processo acompanha a versao_dados) e que
+resumo_mensal bate com as transações. Antes disso sobe os workers com um arquivo vazio, para
+exercitar as migrações disputadas por vários processos.
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from calendar import timegm
+from concurrent.futures import ThreadPoolExecutor
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+import banco_dados
+
+
+def _porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def _requisitar(url, metodo='GET', corpo=None):
+    dados = json.dumps(corpo).encode('utf-8') if corpo is not None else None
+    requisicao = urllib.request.Request(url, data=dados, method=metodo, headers={'Content-Type': 'application/json'} if dados else {})
+    try:
+        with urllib.request.urlopen(requisicao, timeout=60) as resposta:
+            return resposta.status, resposta.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+def _popular(caminho, linhas):
+    banco_dados.configurar_banco_dados(caminho)
+    banco_dados.inicializar_banco_de_dados()
+    conn, _ = banco_dados.conectar_bd()
+    aleatorio, inicio = random.Random(22), datetime.datetime(2020, 1, 1)
+    def gerar():
+        for i in range(linhas):
+            data = inicio + datetime.timedelta(minutes=aleatorio.randrange(6 * 365 * 24 * 60))
+            yield ('despesa', f"Compra {i}", aleatorio.randrange(100, 50_000), data.isoformat(), data.year, data.month, timegm(data.timetuple()))
+    conn.executemany("INSERT INTO transacoes_tb (tipo, descricao, valor_centavos, data_registro, ano, mes, data_epoch) VALUES (?, ?, ?, ?, ?, ?, ?)", gerar())
+    conn.commit()
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    banco_dados.fechar_conexoes_bd()
+
+class Servidor:
+    """gunicorn com gunicorn.conf.py, apontado para `caminho`, enquanto dura o bloco with."""
+
+    def __init__(self, caminho, workers, threads):
+        self.url = f"http://127.0.0.1:{_porta_livre()}"
+        self._ambiente = dict(os.environ, FINANCEIRO_BANCO_DADOS=caminho, FINANCEIRO_WORKERS=str(workers), FINANCEIRO_THREADS=str(threads),
+                              FINANCEIRO_TAMANHO_POOL=str(max(threads, 8)), FINANCEIRO_ENDERECO=self.url.removeprefix('http://'))
+        self._log = tempfile.TemporaryFile()
+
+    def __enter__(self):
+        self._processo = subprocess.Popen([sys.executable, '-m', 'gunicorn', '--log-level', 'warning'], cwd=RAIZ, env=self._ambiente,
+                                          stdout=self._log, stderr=subprocess.STDOUT)
+        limite = time.monotonic() + 60
+        while time.monotonic() < limite:
+            if self._processo.poll() is not None: break
+            try:
+                if _requisitar(self.url + '/api/cache')[0] == 200: return self
+            except OSError: pass
+            time.sleep(0.1)
+        self.__exit__(None, None, None)
+        raise RuntimeError(f"o gunicorn não subiu:\n{self.log()}")
+
+    def log(self):
+        self._log.seek(0)
+        return self._log.read().decode('utf-8', 'replace')
+
+    def __exit__(self, *exc):
+        self._processo.terminate()
+        self._processo.wait(30)
+
+def _percentil(ordenados, p):
+    return ordenados[min(int(len(ordenados) * p), len(ordenados) - 1)] * 1000
+
+def _carga(url, requisicoes, concorrencia, fracao_escritas):
+    aleatorio = random.Random(7)
+    leituras = ['/?limite=50', '/api/transacoes?limite=50&ano=2024', '/resumo?ano=2023', '/resumo']
+    plano = [None if aleatorio.random() < fracao_escritas else aleatorio.choice(leituras) for _ in range(requisicoes)]
+
+    def executar(i):
+        inicio = time.perf_counter()
+        if plano[i] is None:
+            status, _ = _requisitar(url + '/api/transacoes', 'POST', {'tipo': 'despesa', 'descricao': f"Carga {i}", 'valor_centavos': 100 + i,
+                                                                       'categoria': 'Carga', 'data_registro': '2024-06-15T12:00:00'})
+        else:
+            status, _ = _requisitar(url + plano[i])
+        return plano[i] is None, status, time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        resultados = list(executor.map(executar, range(requisicoes)))
+    return time.perf_counter() - inicio, resultados
+
+def _conferir(url, caminho, escritas_ok):
+    # Vários GETs para passar por todos os workers: cada um deve ver as escritas dos outros.
+    esperado = sqlite3.connect(caminho).execute("SELECT COALESCE(SUM(valor_centavos), 0), COUNT(*) FROM transacoes_tb "
+                                                "WHERE ano = 2024 AND mes = 6 AND descricao LIKE 'Carga %'").fetchone()
+    totais = {json.loads(_requisitar(url + '/resumo?ano=2024&mes=6')[1])['total_despesas_centavos'] for _ in range(50)}
+    base = sqlite3.connect(caminho).execute("SELECT COALESCE(SUM(valor_centavos), 0) FROM transacoes_tb WHERE ano = 2024 AND mes = 6").fetchone()[0]
+    banco_dados.configurar_banco_dados(caminho)
+    divergencias = banco_dados.verificar_resumo_mensal_db()
+    banco_dados.fechar_conexoes_bd()
+    return esperado[1] == escritas_ok and totais == {base}, len(divergencias), esperado[1]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--requisicoes', type=int, default=2000)
+    parser.add_argument('--concorrencia', type=int, default=16)
+    parser.add_argument('--escritas', type=float, default=0.2, help="fração das requisições que são POST")
+    parser.add_argument('--linhas', type=int, default=100_000)
+    args = parser.parse_args()
+    try: import gunicorn   # noqa: F401 (só confere que está instalado; roda como subprocesso)
+    except ImportError: sys.exit("este benchmark precisa do gunicorn: pip install gunicorn")
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        vazio = os.path.join(diretorio, 'vazio.db')
+        with Servidor(vazio, max(args.workers), args.threads):
+            versao = sqlite3.connect(vazio).execute("PRAGMA user_version").fetchone()[0]
+        print(f"subida de {max(args.workers)} workers com banco vazio: esquema na versão {versao} de {len(banco_dados.MIGRACOES)}")
+
+        print(f"{args.linhas:,} transações; {args.requisicoes} requisições, {args.concorrencia} clientes, {args.escritas:.0%} escritas; "
+              f"{args.threads} threads por worker")
+        print(f"{'workers':>7}{'req/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'erros':>7}  consistência")
+        for workers in args.workers:
+            caminho = os.path.join(diretorio, f'carga_{workers}.db')
+            _popular(caminho, args.linhas)
+            with Servidor(caminho, workers, args.threads) as servidor:
+                decorrido, resultados = _carga(servidor.url, args.requisicoes, args.concorrencia, args.escritas)
+                escritas_ok = sum(1 for escrita, status, _ in resultados if escrita and status == 201)
+                consistente, divergencias, gravadas = _conferir(servidor.url, caminho, escritas_ok)
+            latencias = sorted(tempo for _, _, tempo in resultados)
+            erros = sum(1 for escrita, status, _ in resultados if status != (201 if escrita else 200))
+            print(f"{workers:>7}{len(resultados) / decorrido:>10,.0f}{_percentil(latencias, 0.5):>9.1f}{_percentil(latencias, 0.95):>9.1f}"
+                  f"{_percentil(latencias, 0.99):>9.1f}{erros:>7}  {'ok' if consistente and not divergencias else 'FALHOU'} "
+                  f"({gravadas} escritas confirmadas, {divergencias} divergência(s) no resumo)")
+
+
+if __name__ == '__main__':
+    main()
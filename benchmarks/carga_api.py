@@ -0,0 +1,64 @@
+"""Teste de carga da API JSON: requisições/s de listagem, GET condicional e POST em lote.
+
+Uso: python app_web.py   (em outro terminal)
+     python benchmarks/carga_api.py [--url http://127.0.0.1:5000] [--requisicoes 500] [--concorrencia 8] [--lote 50]
+
+Cada cenário dispara `--requisicoes` chamadas com `--concorrencia` threads. O POST grava
+transações de verdade (categoria "Carga"); use um banco de teste.
+"""
+import argparse
+import json
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _requisitar(url, metodo='GET', corpo=None, cabecalhos=None):
+    dados = json.dumps(corpo).encode('utf-8') if corpo is not None else None
+    requisicao = urllib.request.Request(url, data=dados, method=metodo, headers=dict(cabecalhos or {}))
+    if dados is not None: requisicao.add_header('Content-Type', 'application/json')
+    try:
+        with urllib.request.urlopen(requisicao) as resposta:
+            return resposta.status, resposta.headers.get('ETag'), resposta.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers.get('ETag'), e.read()
+
+def _medir(nome, chamada, requisicoes, concorrencia):
+    status = {}
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        for codigo in executor.map(lambda i: chamada(i)[0], range(requisicoes)):
+            status[codigo] = status.get(codigo, 0) + 1
+    decorrido = time.perf_counter() - inicio
+    codigos = ", ".join(f"{codigo}x{quantidade}" for codigo, quantidade in sorted(status.items()))
+    print(f"{nome:<28}{requisicoes / decorrido:>12,.0f} req/s   ({codigos})")
+    return decorrido
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--requisicoes', type=int, default=500)
+    parser.add_argument('--concorrencia', type=int, default=8)
+    parser.add_argument('--lote', type=int, default=50, help="transações por POST em lote")
+    args = parser.parse_args()
+    url_lista = f"{args.url}/api/transacoes?limite=50"
+
+    def lote(i):
+        return [{'tipo': 'despesa', 'descricao': f"Carga {i}-{j}", 'valor': 1.0 + j, 'categoria': 'Carga'} for j in range(args.lote)]
+
+    print(f"{'cenário':<28}{'vazão':>12}")
+    _medir("GET /api/transacoes", lambda i: _requisitar(url_lista), args.requisicoes, args.concorrencia)
+    etag = _requisitar(url_lista)[1]
+    _medir("GET condicional (304)", lambda i: _requisitar(url_lista, cabecalhos={'If-None-Match': etag}),
+           args.requisicoes, args.concorrencia)
+    _medir("GET /resumo", lambda i: _requisitar(f"{args.url}/resumo"), args.requisicoes, args.concorrencia)
+    unitario = _medir("POST 1 item", lambda i: _requisitar(f"{args.url}/api/transacoes", 'POST', lote(i)[0]),
+                      args.requisicoes, args.concorrencia)
+    em_lote = _medir(f"POST {args.lote} itens", lambda i: _requisitar(f"{args.url}/api/transacoes", 'POST', lote(i)),
+                     args.requisicoes, args.concorrencia)
+    print(f"linhas/s: 1 item = {args.requisicoes / unitario:,.0f}, lote de {args.lote} = {args.requisicoes * args.lote / em_lote:,.0f}")
+
+
+if __name__ == '__main__':
+    main()
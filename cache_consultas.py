@@ -0,0 +1,143 @@
+import functools
+import sys
+import threading
+from collections import OrderedDict
+
+# --- CACHE DE RESULTADOS DE CONSULTAS ---
+# Resultados das leituras por período (lista, saldo, resumo...) ficam em memória, chaveados
+# por (tipo de consulta, ano, mes, demais argumentos). As escritas de banco_dados chamam
+# invalidar() com os períodos que tocaram: só as entradas que cobrem esses meses saem.
+# `versao` conta as escritas e impede que um resultado lido antes de uma escrita seja
+# guardado depois dela. Outros processos no mesmo banco (workers web, GUI) não chamam este
+# invalidar(): por isso o cache compara, antes de cada consulta, a versão persistida no banco
+# (`ler_versao_banco`) com a última que viu, e descarta tudo quando ela mudou por fora.
+
+
+AMOSTRA_TAMANHO = 16
+
+def _tamanho_aproximado(valor):
+    """Bytes ocupados por `valor` e pelo que ele contém (listas, tuplas, dicts e escalares).
+
+    Listas longas são estimadas por uma amostra de AMOSTRA_TAMANHO itens: as linhas de uma
+    consulta têm todas a mesma forma, e medir milhares delas custaria mais que a própria consulta.
+    """
+    tamanho = sys.getsizeof(valor)
+    if isinstance(valor, dict):   # as chaves (nomes de coluna) são as mesmas strings em todas as linhas
+        tamanho += sum(_tamanho_aproximado(v) for v in valor.values())
+    elif isinstance(valor, (list, tuple)) and valor:
+        passo = max(len(valor) // AMOSTRA_TAMANHO, 1)
+        amostra = valor[::passo]
+        tamanho += sum(_tamanho_aproximado(item) for item in amostra) * len(valor) // len(amostra)
+    return tamanho
+
+def _cobre(chave, periodos):
+    # Uma entrada de (ano, mes) com None como curinga cobre o mês escrito (a, m)?
+    _, ano, mes, *_ = chave
+    return any((ano is None or ano == a) and (mes is None or mes == m) for a, m in periodos)
+
+
+class CacheConsultas:
+    """LRU de resultados limitado por memória (`limite_bytes`) e por número de entradas.
+
+    Os resultados são compartilhados entre quem chama: trate-os como somente leitura.
+    Pode ser usado de várias threads. `ao_mudar_banco` é chamada quando uma escrita de outro
+    processo é detectada (para descartar outros caches em memória).
+    """
+
+    def __init__(self, limite_bytes=64 * 1024 * 1024, max_entradas=512, ler_versao_banco=None, ao_mudar_banco=None):
+        self.limite_bytes = limite_bytes
+        self.max_entradas = max_entradas
+        self.ler_versao_banco = ler_versao_banco
+        self.ao_mudar_banco = ao_mudar_banco
+        self.versao_banco = None   # última versão persistida vista (escrita própria ou leitura)
+        self.ativo = True
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()   # chave -> (resultado, bytes)
+        self._bytes = 0
+        self.versao = 0
+        self.acertos = self.faltas = self.descartes = self.invalidacoes = self.escritas_externas = 0
+
+    def _remover(self, chave):
+        _, tamanho = self._entradas.pop(chave)
+        self._bytes -= tamanho
+
+    def sincronizar(self):
+        """Descarta tudo se a versão persistida no banco mudou sem passar por invalidar() deste processo."""
+        if self.ler_versao_banco is None: return
+        versao_banco = self.ler_versao_banco()
+        with self._lock:
+            if self.versao_banco is not None and versao_banco <= self.versao_banco: return   # <: lida antes de uma escrita própria
+            externa = self.versao_banco is not None
+            self.versao_banco = versao_banco
+            self.versao += 1
+            self._entradas.clear(); self._bytes = 0
+            if externa: self.escritas_externas += 1
+        if externa and self.ao_mudar_banco: self.ao_mudar_banco()
+
+    def obter(self, chave, calcular):
+        """Resultado em cache para `chave` ou calcular(), guardado se nenhuma escrita ocorreu no meio."""
+        if self.ativo: self.sincronizar()
+        with self._lock:
+            if self.ativo and chave in self._entradas:
+                self.acertos += 1
+                self._entradas.move_to_end(chave)
+                return self._entradas[chave][0]
+            self.faltas += 1
+            versao = self.versao
+        resultado = calcular()
+        tamanho = _tamanho_aproximado(resultado)
+        with self._lock:
+            if not self.ativo or versao != self.versao or tamanho > self.limite_bytes: return resultado
+            if chave in self._entradas: self._remover(chave)
+            self._entradas[chave] = (resultado, tamanho)
+            self._bytes += tamanho
+            while self._bytes > self.limite_bytes or len(self._entradas) > self.max_entradas:
+                self._remover(next(iter(self._entradas)))
+                self.descartes += 1
+        return resultado
+
+    def invalidar(self, periodos=None, versao_banco=None):
+        """Descarta as entradas que cobrem algum (ano, mes) de `periodos`; None descarta tudo.
+
+        `versao_banco` é a versão persistida gravada pela escrita: se ela não for a seguinte à
+        última vista, outro processo escreveu no meio e tudo é descartado.
+        """
+        externa = False
+        with self._lock:
+            self.versao += 1
+            self.invalidacoes += 1
+            if versao_banco is not None:
+                externa = self.versao_banco is not None and versao_banco != self.versao_banco + 1
+                if externa: periodos = None; self.escritas_externas += 1
+                self.versao_banco = max(versao_banco, self.versao_banco or 0)
+            if periodos is None:
+                self._entradas.clear(); self._bytes = 0
+            else:
+                periodos = set(periodos)
+                for chave in [chave for chave in self._entradas if _cobre(chave, periodos)]: self._remover(chave)
+        if externa and self.ao_mudar_banco: self.ao_mudar_banco()
+
+    def consulta(self, tipo, por_periodo=True):
+        """Decorador para funções de leitura com assinatura (ano=None, mes=None, ...).
+
+        por_periodo=False é para resultados que dependem também de outros meses (saldo
+        acumulado): a entrada continua separada por período, mas qualquer escrita a descarta.
+        """
+        def decorador(funcao):
+            @functools.wraps(funcao)
+            def em_cache(ano=None, mes=None, *args, **kwargs):
+                periodo = (int(ano) if ano else None, int(mes) if mes else None)
+                if por_periodo: chave = (tipo, *periodo, args, tuple(sorted(kwargs.items())))
+                else: chave = (tipo, None, None, (periodo, *args), tuple(sorted(kwargs.items())))
+                return self.obter(chave, lambda: funcao(ano, mes, *args, **kwargs))
+            em_cache.sem_cache = funcao
+            return em_cache
+        return decorador
+
+    def estatisticas(self):
+        with self._lock:
+            consultas = self.acertos + self.faltas
+            return {'acertos': self.acertos, 'faltas': self.faltas, 'taxa_acerto': self.acertos / consultas if consultas else 0.0,
+                    'entradas': len(self._entradas), 'bytes': self._bytes, 'limite_bytes': self.limite_bytes,
+                    'descartes': self.descartes, 'invalidacoes': self.invalidacoes, 'versao': self.versao,
+                    'versao_banco': self.versao_banco, 'escritas_externas': self.escritas_externas}
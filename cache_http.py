@@ -0,0 +1,146 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from urllib.parse import urlencode
+
+# --- CACHE DE RESPOSTAS HTTP ---
+# Corpo pronto (HTML, JSON, SVG) de cada GET, chaveado por (caminho, parâmetros, versao_dados).
+# Como toda escrita incrementa versao_dados, uma entrada nunca fica velha: só deixa de ser
+# encontrada e sai pelo LRU. O ETag é o hash do corpo (forte), então um cliente que já tem a
+# resposta recebe 304 sem que a página seja montada de novo.
+# Opcionalmente as respostas também vão para um diretório em disco, compartilhado pelos workers
+# e mantido abaixo de `limite_bytes_disco` (saem as de uso mais antigo, pela mtime).
+
+RespostaEmCache = namedtuple('RespostaEmCache', 'corpo etag tipo')
+EXTENSAO_DISCO = '.resposta'
+FRACAO_APOS_LIMPEZA = 0.9   # a limpeza do disco desce até 90% do limite, para não rodar a cada gravação
+
+
+class CacheRespostas:
+    """LRU em memória (limitado a `limite_bytes`) e, se houver `diretorio`, cópia em disco.
+
+    Pode ser usado de várias threads; o diretório pode ser compartilhado entre processos.
+    """
+
+    def __init__(self, limite_bytes=32 * 1024 * 1024, diretorio=None, limite_bytes_disco=256 * 1024 * 1024):
+        self.limite_bytes = limite_bytes
+        self.ativo = True
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()   # chave -> (RespostaEmCache, versao)
+        self._bytes = 0
+        self._versao = 0   # maior versao_dados vista: entradas de versões anteriores já não servem
+        self.acertos_memoria = self.acertos_disco = self.faltas = self.erros_disco = 0
+        self.configurar('', diretorio, limite_bytes_disco)
+
+    def configurar(self, escopo, diretorio=None, limite_bytes_disco=256 * 1024 * 1024):
+        """Recomeça o cache para o banco `escopo` (entra na chave: versões de bancos diferentes não se misturam)
+        e liga a cópia em disco em `diretorio` (None desliga)."""
+        with self._lock:
+            self.escopo, self._versao = escopo, 0
+            self._entradas.clear(); self._bytes = 0
+        self.diretorio, self.limite_bytes_disco, self._bytes_disco = diretorio or None, limite_bytes_disco, 0
+        if self.diretorio:
+            os.makedirs(self.diretorio, exist_ok=True)
+            self._limpar_disco()
+
+    def _chave(self, caminho, parametros, versao):
+        return hashlib.sha1(f"{self.escopo}\0{versao}\0{caminho}\0{urlencode(sorted(parametros))}".encode('utf-8')).hexdigest()
+
+    def obter(self, caminho, parametros, versao):
+        """Resposta guardada para o GET `caminho` com os `parametros` [(nome, valor)] na versão dos dados, ou None."""
+        chave = self._chave(caminho, parametros, versao)
+        with self._lock:
+            if versao > self._versao:
+                self._versao = versao
+                self._entradas.clear(); self._bytes = 0
+            if chave in self._entradas:
+                self.acertos_memoria += 1
+                self._entradas.move_to_end(chave)
+                return self._entradas[chave][0]
+        resposta = self._ler_disco(chave) if self.diretorio else None
+        with self._lock:
+            if resposta is None: self.faltas += 1; return None
+            self.acertos_disco += 1
+        self._guardar_memoria(chave, resposta, versao)
+        return resposta
+
+    def guardar(self, caminho, parametros, versao, corpo, tipo):
+        """Guarda o corpo de uma resposta 200 e devolve a RespostaEmCache, com o ETag calculado."""
+        chave = self._chave(caminho, parametros, versao)
+        resposta = RespostaEmCache(corpo, hashlib.sha1(corpo).hexdigest(), tipo)
+        self._guardar_memoria(chave, resposta, versao)
+        if self.diretorio: self._gravar_disco(chave, resposta)
+        return resposta
+
+    def _guardar_memoria(self, chave, resposta, versao):
+        tamanho = len(resposta.corpo)
+        with self._lock:
+            if versao < self._versao or tamanho > self.limite_bytes: return
+            if chave in self._entradas: self._bytes -= len(self._entradas.pop(chave)[0].corpo)
+            self._entradas[chave] = (resposta, versao)
+            self._bytes += tamanho
+            while self._bytes > self.limite_bytes:
+                self._bytes -= len(self._entradas.popitem(last=False)[1][0].corpo)
+
+    # Em disco: uma linha JSON com etag e tipo, depois o corpo. A escrita vai para um arquivo
+    # temporário e troca de nome no fim, então um leitor nunca vê uma resposta pela metade.
+    def _caminho_disco(self, chave):
+        return os.path.join(self.diretorio, chave + EXTENSAO_DISCO)
+
+    def _ler_disco(self, chave):
+        caminho = self._caminho_disco(chave)
+        try:
+            with open(caminho, 'rb') as arquivo:
+                cabecalho = json.loads(arquivo.readline())
+                corpo = arquivo.read()
+            os.utime(caminho)   # mtime = último uso, para a limpeza por LRU
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            with self._lock: self.erros_disco += 1
+            return None
+        return RespostaEmCache(corpo, cabecalho['etag'], cabecalho['tipo'])
+
+    def _gravar_disco(self, chave, resposta):
+        caminho = self._caminho_disco(chave)
+        temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temporario, 'wb') as arquivo:
+                arquivo.write(json.dumps({'etag': resposta.etag, 'tipo': resposta.tipo}).encode('utf-8') + b'\n')
+                arquivo.write(resposta.corpo)
+            os.replace(temporario, caminho)
+        except OSError:
+            with self._lock: self.erros_disco += 1
+            return
+        with self._lock:
+            self._bytes_disco += len(resposta.corpo)
+            limpar = self._bytes_disco > self.limite_bytes_disco
+        if limpar: self._limpar_disco()
+
+    def _limpar_disco(self):
+        # O total é recontado no diretório: outros processos também gravam nele.
+        arquivos = []
+        for entrada in os.scandir(self.diretorio):
+            if not entrada.name.endswith(EXTENSAO_DISCO): continue
+            try: estado = entrada.stat()
+            except FileNotFoundError: continue
+            arquivos.append((estado.st_mtime, estado.st_size, entrada.path))
+        total = sum(tamanho for _, tamanho, _ in arquivos)
+        if total > self.limite_bytes_disco:
+            for _, tamanho, caminho in sorted(arquivos):
+                if total <= self.limite_bytes_disco * FRACAO_APOS_LIMPEZA: break
+                try: os.remove(caminho)
+                except FileNotFoundError: pass
+                total -= tamanho
+        with self._lock: self._bytes_disco = total
+
+    def estatisticas(self):
+        with self._lock:
+            consultas = self.acertos_memoria + self.acertos_disco + self.faltas
+            return {'acertos_memoria': self.acertos_memoria, 'acertos_disco': self.acertos_disco, 'faltas': self.faltas,
+                    'taxa_acerto': (self.acertos_memoria + self.acertos_disco) / consultas if consultas else 0.0,
+                    'entradas': len(self._entradas), 'bytes': self._bytes, 'limite_bytes': self.limite_bytes,
+                    'diretorio': self.diretorio, 'bytes_disco': self._bytes_disco if self.diretorio else 0,
+                    'limite_bytes_disco': self.limite_bytes_disco, 'erros_disco': self.erros_disco, 'versao_dados': self._versao}
@@ -0,0 +1,81 @@
+import threading
+import unicodedata
+from collections import OrderedDict
+
+# --- CATEGORIAS: NORMALIZAÇÃO E AUTOCOMPLETAR ---
+# As categorias ficam na tabela `categorias` (transacoes_tb guarda só o categoria_id).
+# Grafias que diferem apenas em maiúsculas, acentos ou espaços são a mesma categoria.
+
+
+def normalizar_categoria(nome):
+    """Chave de comparação de uma categoria: ' Saúde ', 'saude' e 'SAÚDE' viram 'saude'."""
+    sem_acentos = ''.join(c for c in unicodedata.normalize('NFD', nome) if not unicodedata.combining(c))
+    return ' '.join(sem_acentos.split()).casefold()
+
+def limpar_nome_categoria(nome):
+    """Nome exibido: só tira os espaços sobrando, mantendo a grafia digitada."""
+    return ' '.join(nome.split())
+
+
+class AutocompletarCategorias:
+    """Sugestões de categoria por prefixo, servidas da memória.
+
+    `carregar` é a função que lê os nomes do banco (já na ordem de preferência, os mais
+    usados primeiro); ela roda uma vez e depois só de novo após `invalidar()`, que as
+    escritas chamam. As respostas por prefixo ficam num LRU de `tamanho_maximo` entradas.
+    Pode ser usado de várias threads.
+    """
+
+    def __init__(self, carregar, tamanho_maximo=256):
+        self._funcao_carregar = carregar
+        self.tamanho_maximo = tamanho_maximo
+        self._lock = threading.Lock()
+        self._nomes = None          # [(nome normalizado, nome)] ou None se precisa recarregar
+        self._versao = 0            # incrementada a cada invalidação
+        self._lru = OrderedDict()   # (prefixo normalizado, limite) -> tupla de nomes
+        self.acertos = self.faltas = 0
+
+    @property
+    def carregado(self):
+        return self._nomes is not None
+
+    def carregar(self):
+        with self._lock: versao = self._versao
+        nomes = [(normalizar_categoria(nome), nome) for nome in self._funcao_carregar()]
+        with self._lock:
+            # Uma escrita durante a leitura deixaria a lista velha: nesse caso ela é descartada.
+            if versao == self._versao: self._nomes = nomes; self._lru.clear()
+        return nomes
+
+    def invalidar(self):
+        with self._lock:
+            self._versao += 1
+            self._nomes = None
+            self._lru.clear()
+
+    def sugerir(self, prefixo="", limite=10, sem_banco=False):
+        """Até `limite` nomes que começam com `prefixo` (ou com uma palavra que começa com ele).
+
+        sem_banco=True nunca lê o banco (ex.: na thread do Tk): sem a lista em memória devolve [].
+        """
+        chave = (normalizar_categoria(prefixo or ""), limite)
+        with self._lock:
+            if chave in self._lru:
+                self.acertos += 1
+                self._lru.move_to_end(chave)
+                return list(self._lru[chave])
+            self.faltas += 1
+            nomes = self._nomes
+        if nomes is None:
+            if sem_banco: return []
+            nomes = self.carregar()
+        inicio = [nome for normalizado, nome in nomes if normalizado.startswith(chave[0])]
+        if len(inicio) < limite and chave[0]:
+            inicio += [nome for normalizado, nome in nomes
+                       if not normalizado.startswith(chave[0]) and any(p.startswith(chave[0]) for p in normalizado.split()[1:])]
+        sugestoes = tuple(inicio[:limite])
+        with self._lock:
+            if self._nomes is nomes:   # não guarda resposta calculada sobre uma lista já invalidada
+                self._lru[chave] = sugestoes
+                if len(self._lru) > self.tamanho_maximo: self._lru.popitem(last=False)
+        return list(sugestoes)
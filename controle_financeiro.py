@@ -1,139 +1,26 @@
 import tkinter as tk
 from tkinter import ttk
 from tkinter import messagebox
-import sqlite3
+from tkinter import filedialog
 import datetime
+import time
 from functools import partial
-from calendar import month_name, monthrange
+from calendar import month_name
 
 # --- LÓGICA DO BANCO DE DADOS (Backend) ---
-# Esta seção não mudou, mas está inclusa para garantir que você tenha o código completo.
-NOME_BANCO_DADOS = 'controle_financeiro.db'
-
-def conectar_bd():
-    conn = sqlite3.connect(NOME_BANCO_DADOS)
-    conn.row_factory = sqlite3.Row
-    return conn, conn.cursor()
-
-def inicializar_banco_de_dados():
-    conn, cursor = conectar_bd()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS transacoes_tb (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            tipo TEXT NOT NULL,
-            descricao TEXT NOT NULL,
-            valor REAL NOT NULL,
-            categoria TEXT,
-            data_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    conn.commit()
-    conn.close()
-
-def buscar_transacoes_db(ano=None, mes=None):
-    conn, cursor = conectar_bd()
-    try:
-        query = "SELECT id, tipo, descricao, valor, categoria, data_registro FROM transacoes_tb"
-        params = []
-        conditions = []
-        if ano:
-            conditions.append("strftime('%Y', data_registro) = ?")
-            params.append(str(ano))
-        if mes:
-            mes_formatado = f"{int(mes):02d}"
-            conditions.append("strftime('%m', data_registro) = ?")
-            params.append(mes_formatado)
-        
-        if conditions:
-            query += " WHERE " + " AND ".join(conditions)
-        
-        query += " ORDER BY data_registro DESC, id DESC"
-        cursor.execute(query, params)
-        linhas_db = cursor.fetchall()
-        return [dict(linha) for linha in linhas_db]
-    except sqlite3.Error as e: raise e
-    finally: conn.close()
-
-def calcular_saldo_db(ano=None, mes=None):
-    total_ganhos, total_despesas = 0.0, 0.0
-    conn, cursor = conectar_bd()
-    try:
-        query = "SELECT tipo, valor FROM transacoes_tb"
-        params = []
-        conditions = []
-        if ano:
-            conditions.append("strftime('%Y', data_registro) = ?")
-            params.append(str(ano))
-        if mes:
-            mes_formatado = f"{int(mes):02d}"
-            conditions.append("strftime('%m', data_registro) = ?")
-            params.append(mes_formatado)
-
-        if conditions:
-            query += " WHERE " + " AND ".join(conditions)
-            
-        cursor.execute(query, params)
-        for linha in cursor.fetchall():
-            transacao = dict(linha)
-            if transacao['tipo'] == 'ganho': total_ganhos += transacao['valor']
-            elif transacao['tipo'] == 'despesa': total_despesas += transacao['valor']
-        return total_ganhos, total_despesas, total_ganhos - total_despesas
-    except sqlite3.Error as e: raise e
-    finally: conn.close()
-
-def buscar_anos_disponiveis_db():
-    conn, cursor = conectar_bd()
-    try:
-        cursor.execute("SELECT DISTINCT strftime('%Y', data_registro) as ano FROM transacoes_tb ORDER BY ano DESC")
-        anos = [row['ano'] for row in cursor.fetchall() if row['ano'] is not None]
-        return anos
-    except sqlite3.Error as e: raise e
-    finally: conn.close()
-
-def adicionar_ganho_db(descricao, valor):
-    conn, cursor = conectar_bd()
-    try:
-        cursor.execute("INSERT INTO transacoes_tb (tipo, descricao, valor, categoria, data_registro) VALUES (?, ?, ?, ?, ?)",
-                       ('ganho', descricao, valor, None, datetime.datetime.now().isoformat()))
-        conn.commit(); return True
-    except sqlite3.Error as e: conn.rollback(); raise e
-    finally: conn.close()
-
-def adicionar_despesa_db(descricao, valor, categoria, data_registro_iso=None):
-    conn, cursor = conectar_bd()
-    if data_registro_iso is None: data_registro_iso = datetime.datetime.now().isoformat()
-    try:
-        cursor.execute("INSERT INTO transacoes_tb (tipo, descricao, valor, categoria, data_registro) VALUES (?, ?, ?, ?, ?)",
-                       ('despesa', descricao, valor, categoria, data_registro_iso))
-        conn.commit(); return True
-    except sqlite3.Error as e: conn.rollback(); raise e
-    finally: conn.close()
-
-def _buscar_transacao_por_id_db(id_transacao):
-    conn, cursor = conectar_bd()
-    try:
-        cursor.execute("SELECT * FROM transacoes_tb WHERE id = ?", (id_transacao,))
-        linha_db = cursor.fetchone()
-        return dict(linha_db) if linha_db else None
-    except sqlite3.Error as e: raise e
-    finally: conn.close()
-
-def editar_transacao_db(id_transacao, descricao, valor, categoria):
-    conn, cursor = conectar_bd()
-    try:
-        cursor.execute("UPDATE transacoes_tb SET descricao = ?, valor = ?, categoria = ? WHERE id = ?",
-                       (descricao, valor, categoria, id_transacao))
-        conn.commit(); return True
-    except sqlite3.Error as e: conn.rollback(); raise e
-    finally: conn.close()
-
-def excluir_transacao_db(id_transacao):
-    conn, cursor = conectar_bd()
-    try:
-        cursor.execute("DELETE FROM transacoes_tb WHERE id = ?", (id_transacao,))
-        conn.commit(); return cursor.rowcount > 0
-    except sqlite3.Error as e: conn.rollback(); raise e
-    finally: conn.close()
+# Toda a persistência fica em banco_dados.py, compartilhado com a versão web.
+from banco_dados import (
+    inicializar_banco_de_dados, buscar_transacoes_db, buscar_texto_db, resumir_transacoes_db, buscar_anos_disponiveis_db,
+    adicionar_ganho_db, adicionar_despesa_db, adicionar_parcelas_db, _buscar_transacao_por_id_db, editar_transacao_db, excluir_transacao_db,
+    autocompletar_categorias, criar_recorrencia_db, listar_recorrencias_db, encerrar_recorrencia_db, materializar_recorrencias_db,
+)
+from lista_virtual import ListaVirtual, chave_por_tipo
+from tarefas_segundo_plano import ExecutorTarefas
+from importador import importar_extrato, resumo_importacao
+from exportador import exportar_para_arquivo
+from dinheiro import para_centavos, formatar_centavos
+from recorrencias import FREQUENCIAS, horizonte_recorrencias
+from projecao import ANOS_MAXIMO as ANOS_MAXIMO_PROJECAO, MESES_HISTORICO_PADRAO, projetar_fluxo_caixa
 
 
 class AppControleFinanceiro:
@@ -179,6 +66,16 @@ class AppControleFinanceiro:
         self.root.option_add('*TCombobox*Listbox.selectBackground', self.cor_selecao_treeview)
         self.root.option_add('*TCombobox*Listbox.selectForeground', self.cor_texto_principal)
 
+        barra_menu = tk.Menu(self.root)
+        self.menu_arquivo = tk.Menu(barra_menu, tearoff=0)
+        self.menu_arquivo.add_command(label="Importar Extrato (CSV/OFX)...", command=self.importar_extrato_bancario)
+        self.menu_arquivo.add_command(label="Exportar Transações...", command=self.exportar_transacoes)
+        barra_menu.add_cascade(label="Arquivo", menu=self.menu_arquivo)
+        menu_relatorios = tk.Menu(barra_menu, tearoff=0)
+        menu_relatorios.add_command(label="Projeção de Saldo...", command=self.abrir_painel_projecao)
+        barra_menu.add_cascade(label="Relatórios", menu=menu_relatorios)
+        self.root.config(menu=barra_menu)
+
         labelframe_acoes = ttk.Labelframe(self.root, text="Ações", padding=(10, 10))
         labelframe_acoes.pack(fill=tk.X, padx=10, pady=(10,5))
         self.btn_add_ganho = ttk.Button(labelframe_acoes, text="Adicionar Ganho", command=self.abrir_janela_adicionar_ganho)
@@ -189,6 +86,8 @@ class AppControleFinanceiro:
         self.btn_editar.pack(side=tk.LEFT, padx=5)
         self.btn_excluir = ttk.Button(labelframe_acoes, text="Excluir Selecionada", command=self.iniciar_exclusao_transacao, state=tk.DISABLED)
         self.btn_excluir.pack(side=tk.LEFT, padx=5)
+        self.btn_recorrencias = ttk.Button(labelframe_acoes, text="Recorrências...", command=self.abrir_janela_recorrencias)
+        self.btn_recorrencias.pack(side=tk.LEFT, padx=5)
 
         labelframe_filtros = ttk.Labelframe(self.root, text="Filtrar por Período", padding=(10,10))
         labelframe_filtros.pack(fill=tk.X, padx=10, pady=5)
@@ -197,7 +96,6 @@ class AppControleFinanceiro:
         self.combo_ano = ttk.Combobox(labelframe_filtros, textvariable=self.ano_selecionado_var, width=8, state="readonly", style='TCombobox')
         self.combo_ano.pack(side=tk.LEFT, padx=(0,10))
         self.combo_ano.bind('<<ComboboxSelected>>', self._on_filtro_periodo_changed)
-        self._popular_combobox_ano()
         ttk.Label(labelframe_filtros, text="Mês:").pack(side=tk.LEFT, padx=(0,5))
         self.mes_selecionado_var = tk.StringVar()
         self.nomes_meses_pt = [""] + [month_name[i].capitalize() for i in range(1,13)]
@@ -208,12 +106,21 @@ class AppControleFinanceiro:
         btn_limpar_filtro = ttk.Button(labelframe_filtros, text="Ver Todos/Limpar Filtro", command=self._limpar_filtro_periodo)
         btn_limpar_filtro.pack(side=tk.LEFT, padx=10)
         self.filtro_mes_ano_ativo = True
+        # Busca por texto (FTS5) dentro do período filtrado; a consulta só sai depois de uma pausa na digitação.
+        ttk.Label(labelframe_filtros, text="Buscar:").pack(side=tk.LEFT, padx=(10,5))
+        self.busca_var = tk.StringVar()
+        entry_busca = ttk.Entry(labelframe_filtros, textvariable=self.busca_var, width=30)
+        entry_busca.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        entry_busca.bind('<Escape>', lambda e: self.busca_var.set(""))
+        self.busca_var.trace_add('write', self._agendar_busca)
+        self._busca_job, self._busca_lista = None, ""
 
         self.labelframe_lista = ttk.Labelframe(self.root, text="Transações Registradas", padding=(10,10))
         self.labelframe_lista.pack(expand=True, fill=tk.BOTH, padx=10, pady=5)
-        btn_atualizar = ttk.Button(self.labelframe_lista, text="Atualizar Exibição Atual", command=self.atualizar_tudo)
+        btn_atualizar = ttk.Button(self.labelframe_lista, text=self.TEXTO_BOTAO_ATUALIZAR, command=self.atualizar_tudo)
         btn_atualizar.pack(pady=(0,10))
-        self.cols_info = {'ID': {'index': 0, 'type': 'int', 'width': 50, 'anchor': tk.CENTER}, 'Data': {'index': 1, 'type': 'date', 'width': 100, 'anchor': tk.CENTER}, 'Tipo': {'index': 2, 'type': 'str', 'width': 100}, 'Descrição': {'index': 3, 'type': 'str', 'width': 250}, 'Valor (R$)': {'index': 4, 'type': 'float', 'width': 120, 'anchor': tk.E}, 'Categoria': {'index': 5, 'type': 'str', 'width': 150}}
+        # key_index: posição na linha da ListaVirtual do valor tipado usado para ordenar (ver _linha_da_transacao)
+        self.cols_info = {'ID': {'index': 0, 'key_index': 0, 'type': 'int', 'width': 50, 'anchor': tk.CENTER}, 'Data': {'index': 1, 'key_index': 6, 'type': 'date', 'width': 100, 'anchor': tk.CENTER}, 'Tipo': {'index': 2, 'key_index': 2, 'type': 'str', 'width': 100}, 'Descrição': {'index': 3, 'key_index': 3, 'type': 'str', 'width': 250}, 'Valor (R$)': {'index': 4, 'key_index': 7, 'type': 'float', 'width': 120, 'anchor': tk.E}, 'Categoria': {'index': 5, 'key_index': 8, 'type': 'str', 'width': 150}}
         self.tree_transacoes_cols = list(self.cols_info.keys())
         self.tree_transacoes = ttk.Treeview(self.labelframe_lista, columns=self.tree_transacoes_cols, show='headings', selectmode="browse")
         self.sort_by_column_states = {}
@@ -223,8 +130,8 @@ class AppControleFinanceiro:
             self.tree_transacoes.column(col_name, width=col_data['width'], anchor=col_data.get('anchor', tk.W))
             self.sort_by_column_states[col_name] = False
         self.tree_transacoes.pack(expand=True, fill=tk.BOTH, pady=(0,5))
-        scrollbar = ttk.Scrollbar(self.tree_transacoes, orient=tk.VERTICAL, command=self.tree_transacoes.yview, style='Vertical.TScrollbar')
-        self.tree_transacoes.configure(yscroll=scrollbar.set)
+        scrollbar = ttk.Scrollbar(self.tree_transacoes, orient=tk.VERTICAL, style='Vertical.TScrollbar')
+        self.lista_transacoes = ListaVirtual(self.tree_transacoes, scrollbar, len(self.tree_transacoes_cols)) # só as linhas visíveis viram itens do Treeview
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.tree_transacoes.bind('<<TreeviewSelect>>', self._on_treeview_select)
         self.tree_transacoes.bind('<Double-1>', self._on_treeview_double_click)
@@ -250,21 +157,27 @@ class AppControleFinanceiro:
         self.status_bar = ttk.Label(self.root, textvariable=self.status_bar_var, style="Status.TLabel", anchor=tk.W)
         self.status_bar.pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=(0,5))
         self._status_bar_job = None
+        self.tarefas = ExecutorTarefas(self.root, ao_mudar_ocupado=self._indicar_carregamento) # consultas/escritas fora do loop do Tk
+        self._periodo_lista, self._periodo_saldo = (None, None), (None, None)
+        self._totais_saldo = {'ganho': 0, 'despesa': 0}   # centavos
+        self._popular_combobox_ano()
         self.atualizar_tudo()
-
-    def _popular_combobox_ano(self):
-        try:
-            anos_db = buscar_anos_disponiveis_db()
-            ano_atual_str = str(datetime.datetime.now().year)
+        self.root.after(self.INTERVALO_RECORRENCIAS_MS, self._materializar_recorrencias_periodicamente)
+
+    TEXTO_BOTAO_ATUALIZAR = "Atualizar Exibição Atual"
+
+    def _popular_combobox_ano(self, manter_selecao=False):
+        # O ano atual está sempre na lista, então já pode ser selecionado; os anos com transações
+        # vêm do banco em segundo plano e só completam as opções do combobox.
+        ano_atual_str = str(datetime.datetime.now().year)
+        if not manter_selecao:
+            self.ano_selecionado_var.set(ano_atual_str)
+            self.combo_ano['values'] = [ano_atual_str]
+        def exibir_anos(anos_db):
             if ano_atual_str not in anos_db: anos_db.append(ano_atual_str)
-            anos_db.sort(key=int, reverse=True)
-            self.combo_ano['values'] = anos_db
-            if anos_db: self.ano_selecionado_var.set(ano_atual_str if ano_atual_str in anos_db else anos_db[0])
-            else: self.ano_selecionado_var.set(ano_atual_str)
-        except Exception as e:
-            self.mostrar_mensagem_status(f"Erro ao popular anos: {e}", tipo='erro')
-            self.ano_selecionado_var.set(str(datetime.datetime.now().year))
-            self.combo_ano['values'] = [str(datetime.datetime.now().year)]
+            self.combo_ano['values'] = sorted(anos_db, key=int, reverse=True)
+        self.tarefas.submeter(buscar_anos_disponiveis_db, chave='anos', ao_concluir=exibir_anos,
+                              ao_falhar=lambda e: self.mostrar_mensagem_status(f"Erro ao popular anos: {e}", tipo='erro'))
 
     def _on_filtro_periodo_changed(self, event=None):
         ano_val = self.ano_selecionado_var.get()
@@ -277,6 +190,16 @@ class AppControleFinanceiro:
         self.filtro_mes_ano_ativo = False
         self.atualizar_tudo()
 
+    ATRASO_BUSCA_MS = 250
+    def _agendar_busca(self, *args):
+        # Debounce: cada tecla reinicia o prazo, então só a última digitação vira consulta.
+        if self._busca_job is not None: self.root.after_cancel(self._busca_job)
+        self._busca_job = self.root.after(self.ATRASO_BUSCA_MS, self._executar_busca)
+
+    def _executar_busca(self):
+        self._busca_job = None
+        if self.busca_var.get().strip() != self._busca_lista: self.atualizar_lista_transacoes()
+
     def _configurar_janela_top_level_dark_mode(self, janela_top_level, form_title="Formulário"):
         janela_top_level.configure(bg=self.cor_fundo_principal)
         main_form_labelframe = ttk.Labelframe(janela_top_level, text=form_title, padding=(15,10))
@@ -299,25 +222,20 @@ class AppControleFinanceiro:
 
     def _limpar_mensagem_status(self): self.status_bar_var.set(""); self._status_bar_job = None
 
-    def _converter_valor_para_ordenacao(self, valor_str, tipo_coluna):
-        if valor_str is None or valor_str == "-": return "" if tipo_coluna == 'str' else (datetime.datetime.min if tipo_coluna == 'date' else 0)
-        if tipo_coluna == 'int': return int(valor_str)
-        elif tipo_coluna == 'float':
-            try: return float(str(valor_str).replace('R$', '').replace('.', '',100).replace(',', '.').strip())
-            except ValueError: return 0.0
-        elif tipo_coluna == 'date':
-            try: return datetime.datetime.strptime(valor_str, '%d/%m/%Y')
-            except ValueError: return datetime.datetime.min 
-        return str(valor_str).lower() 
+    def _indicar_carregamento(self, ocupado):
+        # Indicador de consultas em segundo plano; não sobrescreve outras mensagens da barra de status.
+        if ocupado and not self.status_bar_var.get():
+            self.status_bar_var.set("Carregando..."); self.status_bar.config(foreground=self.cor_texto_secundario)
+        elif not ocupado and self.status_bar_var.get() == "Carregando...":
+            self.status_bar_var.set("")
 
     def _sort_treeview_column(self, col_name, reverse):
-        col_type = self.cols_info[col_name]['type']
-        try:
-            data_list = [(self._converter_valor_para_ordenacao(self.tree_transacoes.set(item_id, col_name), col_type), item_id)
-                         for item_id in self.tree_transacoes.get_children('')]
+        col_data = self.cols_info[col_name]
+        inicio = time.perf_counter()
+        try: self.lista_transacoes.ordenar(key=chave_por_tipo(col_data['key_index'], col_data['type']), reverse=reverse)
         except Exception as e: self.mostrar_mensagem_status(f"Erro ao ordenar: {e}", tipo='erro'); return
-        data_list.sort(key=lambda x: x[0], reverse=reverse)
-        for i, (val, item_id) in enumerate(data_list): self.tree_transacoes.move(item_id, '', i)
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+        self.mostrar_mensagem_status(f"{len(self.lista_transacoes)} transações ordenadas por {col_name} em {duracao_ms:.1f} ms", tipo='info')
         for c in self.tree_transacoes_cols:
              current_text = c
              if c == col_name: current_text += ' ▼' if reverse else ' ▲'
@@ -332,16 +250,19 @@ class AppControleFinanceiro:
     def _on_treeview_double_click(self, event):
         if self.tree_transacoes.selection(): self.iniciar_edicao_transacao()
 
-    def formatar_data_para_exibicao(self, data_iso):
-        if not data_iso: return ""
-        if isinstance(data_iso, str):
-            try: data_obj = datetime.datetime.fromisoformat(data_iso)
-            except ValueError: return data_iso 
-        else: data_obj = data_iso
-        return data_obj.strftime('%d/%m/%Y')
+    def _linha_da_transacao(self, transacao):
+        # Colunas exibidas + valores tipados ocultos (data_epoch, valor em centavos, categoria sem "-")
+        # usados na ordenação, para não reconverter o texto exibido a cada clique. A data já vem
+        # formatada do SQLite (data_formatada), sem fromisoformat por linha.
+        return (transacao['id'], transacao['data_formatada'],
+                transacao['tipo'].capitalize(), transacao['descricao'],
+                formatar_centavos(transacao['valor_centavos']), transacao['categoria'] if transacao['categoria'] is not None else "-",
+                transacao['data_epoch'], transacao['valor_centavos'], transacao['categoria'])
+
+    @staticmethod
+    def _chave_ordem_padrao(linha): return (linha[6], linha[0]) # ORDER BY data_epoch DESC, id DESC
 
     def atualizar_lista_transacoes(self):
-        for i in self.tree_transacoes.get_children(): self.tree_transacoes.delete(i)
         
         ano_f, mes_f, titulo_lista = None, None, "Todas as Transações Registradas"
         
@@ -358,20 +279,31 @@ class AppControleFinanceiro:
                  self.mostrar_mensagem_status("Seleção de Ano/Mês inválida.", tipo='erro')
                  ano_f, mes_f, self.filtro_mes_ano_ativo = None, None, False
         
+        self._periodo_lista = (ano_f, mes_f)
+        self._busca_lista = self.busca_var.get().strip()
+        if self._busca_lista: titulo_lista = f"Busca por \"{self._busca_lista}\" em {titulo_lista[0].lower()}{titulo_lista[1:]}"
         self.labelframe_lista.config(text=titulo_lista)
-        try:
-            transacoes = buscar_transacoes_db(ano=ano_f, mes=mes_f)
-            if transacoes:
-                for transacao in transacoes:
-                    self.tree_transacoes.insert('', tk.END, values=(
-                        transacao['id'], self.formatar_data_para_exibicao(transacao['data_registro']),
-                        transacao['tipo'].capitalize(), transacao['descricao'],
-                        f"{transacao['valor']:.2f}", transacao['categoria'] if transacao['categoria'] is not None else "-"
-                    ))
-            for col_name in self.tree_transacoes_cols:
-                 self.tree_transacoes.heading(col_name, text=col_name, command=partial(self._sort_treeview_column, col_name, False))
-                 self.sort_by_column_states[col_name] = False
-        except Exception as e: self.mostrar_mensagem_status(f"Erro ao buscar transações: {e}", tipo='erro')
+        # Um novo pedido (ex.: troca rápida de mês ou nova busca) descarta o resultado do anterior, que ficou obsoleto.
+        self.tarefas.submeter(self._buscar_linhas_transacoes, ano_f, mes_f, self._busca_lista, chave='lista', ao_concluir=self._exibir_linhas_transacoes,
+                              ao_falhar=lambda e: self.mostrar_mensagem_status(f"Erro ao buscar transações: {e}", tipo='erro'))
+
+    def _buscar_linhas_transacoes(self, ano_f, mes_f, texto_busca=""):
+        # Roda em segundo plano: a consulta e a formatação das linhas ficam fora do loop do Tk.
+        # Com busca, as linhas já vêm na ordem de relevância e não são reordenadas por data.
+        # Antes, grava as ocorrências recorrentes que caem até o fim do período (as de um futuro
+        # além de HORIZONTE_MESES_MAXIMO vêm calculadas na consulta, sem gravar).
+        materializar_recorrencias_db(horizonte_recorrencias(ano_f, mes_f))
+        if texto_busca: return [self._linha_da_transacao(t) for t in buscar_texto_db(texto_busca, ano=ano_f, mes=mes_f, limite=self.LIMITE_BUSCA)], None
+        return [self._linha_da_transacao(t) for t in buscar_transacoes_db(ano=ano_f, mes=mes_f)], self._chave_ordem_padrao
+
+    LIMITE_BUSCA = 500
+    def _exibir_linhas_transacoes(self, resultado):
+        linhas, chave = resultado
+        self.lista_transacoes.carregar(linhas, key=chave, reverse=chave is not None)
+        for col_name in self.tree_transacoes_cols:
+             self.tree_transacoes.heading(col_name, text=col_name, command=partial(self._sort_treeview_column, col_name, False))
+             self.sort_by_column_states[col_name] = False
+        self._on_treeview_select(None)
 
     def atualizar_exibicao_saldo(self):
         ano_f, mes_f = None, None
@@ -383,17 +315,89 @@ class AppControleFinanceiro:
                 if mes_nome and mes_nome in self.nomes_meses_pt: mes_f = self.nomes_meses_pt.index(mes_nome)
             except (ValueError, IndexError):
                 ano_f, mes_f = None, None
-        try:
-            total_ganhos, total_despesas, saldo_liquido = calcular_saldo_db(ano=ano_f, mes=mes_f)
-            self.lbl_total_ganhos_valor.config(text=f"R$ {total_ganhos:.2f}")
-            self.lbl_total_despesas_valor.config(text=f"R$ {total_despesas:.2f}")
-            cor_saldo_texto = "#77dd77" if saldo_liquido >= 0 else "#ff6961"
-            self.lbl_saldo_liquido_valor.config(text=f"R$ {saldo_liquido:.2f}", foreground=cor_saldo_texto)
-        except Exception as e: self.mostrar_mensagem_status(f"Erro ao calcular saldo: {e}", tipo='erro')
+        self._periodo_saldo = (ano_f, mes_f)
+        self.tarefas.submeter(self._resumir_periodo, ano_f, mes_f, chave='saldo', ao_concluir=self._receber_resumo,
+                              ao_falhar=lambda e: self.mostrar_mensagem_status(f"Erro ao calcular saldo: {e}", tipo='erro'))
+
+    def _receber_resumo(self, resumo):
+        self._totais_saldo = {'ganho': resumo['total_ganhos_centavos'], 'despesa': resumo['total_despesas_centavos']}
+        self._exibir_saldo()
+
+    def _exibir_saldo(self):
+        total_ganhos, total_despesas = self._totais_saldo['ganho'], self._totais_saldo['despesa']
+        saldo_liquido = total_ganhos - total_despesas
+        self.lbl_total_ganhos_valor.config(text=f"R$ {formatar_centavos(total_ganhos)}")
+        self.lbl_total_despesas_valor.config(text=f"R$ {formatar_centavos(total_despesas)}")
+        cor_saldo_texto = "#77dd77" if saldo_liquido >= 0 else "#ff6961"
+        self.lbl_saldo_liquido_valor.config(text=f"R$ {formatar_centavos(saldo_liquido)}", foreground=cor_saldo_texto)
 
     def atualizar_tudo(self):
         self.atualizar_lista_transacoes()
         self.atualizar_exibicao_saldo()
+        self._carregar_categorias()
+        self._on_treeview_select(None)
+
+    def _carregar_categorias(self):
+        # As sugestões de categoria são lidas em segundo plano na abertura e de novo depois das
+        # escritas (que invalidam o cache), para o campo não consultar o banco enquanto se digita.
+        if not autocompletar_categorias.carregado:
+            self.tarefas.submeter(autocompletar_categorias.carregar, chave='categorias')
+
+    def _criar_campo_categoria(self, pai):
+        """Combobox editável: as opções são as categorias que casam com o texto já digitado."""
+        campo = ttk.Combobox(pai, width=33, style='TCombobox')
+        def preencher(_=None):
+            if campo.winfo_exists(): campo['values'] = autocompletar_categorias.sugerir(campo.get(), limite=self.LIMITE_SUGESTOES, sem_banco=True)
+        def atualizar_sugestoes(event=None):
+            if event is not None and event.keysym in ('Up', 'Down', 'Return', 'Escape', 'Tab'): return
+            # Só da memória: sem a lista carregada (abertura, escrita recente) o banco é lido em
+            # segundo plano e as sugestões aparecem quando ela chega.
+            preencher()
+            if not autocompletar_categorias.carregado: self.tarefas.submeter(autocompletar_categorias.carregar, chave='categorias', ao_concluir=preencher)
+        atualizar_sugestoes()
+        campo.bind('<KeyRelease>', atualizar_sugestoes)
+        return campo
+
+    LIMITE_SUGESTOES = 15
+    def _salvar_em_segundo_plano(self, janela, tarefa, mensagem_sucesso, titulo_erro, texto_erro, ao_concluir):
+        """Roda uma escrita no executor; a janela só fecha (e a lista só muda) depois do commit."""
+        if janela is not None:
+            if getattr(janela, '_salvando', False): return # Enter repetido não grava duas vezes
+            janela._salvando = True
+        def concluir(resultado):
+            if mensagem_sucesso: self.mostrar_mensagem_status(mensagem_sucesso, tipo='sucesso')
+            if janela is not None and janela.winfo_exists(): janela.destroy()
+            ao_concluir(resultado)
+        def falhar(erro):
+            if janela is not None: janela._salvando = False
+            pai = janela if janela is not None and janela.winfo_exists() else self.root
+            messagebox.showerror(titulo_erro, f"{texto_erro}: {erro}", parent=pai)
+        self.tarefas.submeter(tarefa, ao_concluir=concluir, ao_falhar=falhar)
+
+    # --- Atualização incremental após adicionar/editar/excluir (sem recarregar a lista inteira) ---
+    @staticmethod
+    def _no_periodo(transacao, periodo):
+        ano_f, mes_f = periodo
+        return (not ano_f or transacao['ano'] == ano_f) and (not mes_f or transacao['mes'] == mes_f)
+
+    def _ajustar_saldo(self, transacao, sinal):
+        # Com um resumo ainda em andamento o delta poderia se perder; pede o resumo de novo.
+        if self.tarefas.pendente('saldo'): self.atualizar_exibicao_saldo(); return
+        if transacao['tipo'] in self._totais_saldo and self._no_periodo(transacao, self._periodo_saldo):
+            self._totais_saldo[transacao['tipo']] += sinal * transacao['valor_centavos']
+            self._exibir_saldo()
+
+    def _aplicar_transacao_incremental(self, antiga=None, nova=None):
+        """Reflete uma escrita na lista e nos totais: antiga=None é inclusão, nova=None é exclusão."""
+        # Resultado de busca depende do texto casar: nesse caso refaz a busca (leva milissegundos).
+        if self._busca_lista or self.tarefas.pendente('lista'): self.atualizar_lista_transacoes()
+        if antiga is not None:
+            self._ajustar_saldo(antiga, -1)
+            if not self._busca_lista and (nova is None or not self._no_periodo(nova, self._periodo_lista)): self.lista_transacoes.remover(antiga['id'])
+        if nova is not None:
+            self._ajustar_saldo(nova, +1)
+            if self._no_periodo(nova, self._periodo_lista) and not self.tarefas.pendente('lista'): self.lista_transacoes.atualizar(self._linha_da_transacao(nova))
+        self._carregar_categorias()
         self._on_treeview_select(None)
 
     # (Os métodos para adicionar, editar e excluir permanecem aqui, inalterados da versão anterior)
@@ -403,14 +407,12 @@ class AppControleFinanceiro:
         if not descricao: messagebox.showerror("Erro de Validação", "Descrição: * não pode ser vazia.", parent=janela_adicionar); return
         if not valor_str: messagebox.showerror("Erro de Validação", "Valor (R$): * não pode ser vazio.", parent=janela_adicionar); return
         try:
-            valor = float(valor_str)
-            if valor <= 0: messagebox.showerror("Erro de Validação", "Valor deve ser positivo.", parent=janela_adicionar); return
+            valor_centavos = para_centavos(valor_str)
+            if valor_centavos <= 0: messagebox.showerror("Erro de Validação", "Valor deve ser positivo.", parent=janela_adicionar); return
         except ValueError: messagebox.showerror("Erro de Validação", "Valor inválido.", parent=janela_adicionar); return
-        try:
-            if adicionar_ganho_db(descricao, valor):
-                self.mostrar_mensagem_status("Ganho adicionado com sucesso!", tipo='sucesso')
-                janela_adicionar.destroy(); self.atualizar_tudo()
-        except Exception as e: messagebox.showerror("Erro ao Salvar", f"Não foi possível salvar o ganho: {e}", parent=janela_adicionar)
+        self._salvar_em_segundo_plano(janela_adicionar, lambda: _buscar_transacao_por_id_db(adicionar_ganho_db(descricao, valor_centavos)),
+                                      "Ganho adicionado com sucesso!", "Erro ao Salvar", "Não foi possível salvar o ganho",
+                                      lambda nova: self._aplicar_transacao_incremental(nova=nova))
 
     def abrir_janela_adicionar_ganho(self):
         janela_ganho = tk.Toplevel(self.root)
@@ -436,6 +438,18 @@ class AppControleFinanceiro:
         btn_cancelar.pack(side=tk.LEFT, padx=10)
         self._centralizar_janela_toplevel(janela_ganho)
 
+    def _toggle_campos_parcela(self, var_parcelado, lbl_num_parcelas, entry_num_parcelas, lbl_valor_parcela, entry_valor_parcela, lbl_valor_original, entry_valor_original, lbl_data_primeira_parcela, entry_data_primeira_parcela):
+        if var_parcelado.get():
+            lbl_num_parcelas.grid(); entry_num_parcelas.grid()
+            lbl_valor_parcela.grid(); entry_valor_parcela.grid()
+            lbl_data_primeira_parcela.grid(); entry_data_primeira_parcela.grid()
+            lbl_valor_original.config(text="Valor Total (R$): *") # Muda o label do valor original
+        else:
+            lbl_num_parcelas.grid_remove(); entry_num_parcelas.grid_remove()
+            lbl_valor_parcela.grid_remove(); entry_valor_parcela.grid_remove()
+            lbl_data_primeira_parcela.grid_remove(); entry_data_primeira_parcela.grid_remove()
+            lbl_valor_original.config(text="Valor (R$): *") # Volta o label do valor original
+
     def _salvar_nova_despesa(self, janela_adicionar, entry_descricao, entry_valor_principal, entry_categoria, var_parcelado, entry_num_parcelas, entry_valor_parcela, entry_data_primeira_parcela):
         descricao_base = entry_descricao.get().strip()
         categoria = entry_categoria.get().strip()
@@ -450,8 +464,8 @@ class AppControleFinanceiro:
             if not num_parcelas_str: messagebox.showerror("Erro de Validação", "No. de Parcelas: * não pode ser vazio.", parent=janela_adicionar); return
             if not data_primeira_str: messagebox.showerror("Erro de Validação", "Data da 1ª Parcela: * não pode ser vazia (DD/MM/AAAA).", parent=janela_adicionar); return
             try:
-                valor_da_parcela = float(valor_parcela_str)
-                if valor_da_parcela <= 0: messagebox.showerror("Erro de Validação", "Valor da parcela deve ser positivo.", parent=janela_adicionar); return
+                valor_parcela_centavos = para_centavos(valor_parcela_str)
+                if valor_parcela_centavos <= 0: messagebox.showerror("Erro de Validação", "Valor da parcela deve ser positivo.", parent=janela_adicionar); return
             except ValueError: messagebox.showerror("Erro de Validação", "Valor da parcela inválido.", parent=janela_adicionar); return
             try:
                 total_parcelas = int(num_parcelas_str)
@@ -460,38 +474,19 @@ class AppControleFinanceiro:
             try:
                 data_primeira_obj = datetime.datetime.strptime(data_primeira_str, "%d/%m/%Y")
             except ValueError: messagebox.showerror("Erro de Validação", "Formato da Data da 1ª Parcela inválido. Use DD/MM/AAAA.", parent=janela_adicionar); return
-            sucesso_total = True
-            for i in range(total_parcelas):
-                descricao_parcela = f"{descricao_base} (Parcela {i+1}/{total_parcelas})"
-                current_month = data_primeira_obj.month + i
-                current_year = data_primeira_obj.year + (current_month - 1) // 12
-                current_month = (current_month - 1) % 12 + 1
-                day_of_installment = data_primeira_obj.day
-                _, last_day_of_target_month = monthrange(current_year, current_month)
-                if day_of_installment > last_day_of_target_month: day_of_installment = last_day_of_target_month
-                data_parcela_obj = datetime.datetime(current_year, current_month, day_of_installment)
-                data_parcela_iso = data_parcela_obj.isoformat()
-                try:
-                    if not adicionar_despesa_db(descricao_parcela, valor_da_parcela, categoria, data_parcela_iso):
-                        sucesso_total = False; break 
-                except Exception as e:
-                    messagebox.showerror("Erro ao Salvar Parcela", f"Não foi possível salvar a parcela {i+1}: {e}", parent=janela_adicionar)
-                    sucesso_total = False; break
-            if sucesso_total:
-                self.mostrar_mensagem_status(f"{total_parcelas} parcelas adicionadas com sucesso!", tipo='sucesso')
-                janela_adicionar.destroy(); self.atualizar_tudo()
+            self._salvar_em_segundo_plano(janela_adicionar, partial(adicionar_parcelas_db, descricao_base, valor_parcela_centavos, categoria, data_primeira_obj, total_parcelas),
+                                          f"{total_parcelas} parcelas adicionadas com sucesso!", "Erro ao Salvar Parcelas", "Nenhuma parcela foi salva",
+                                          lambda compra_id: self.atualizar_tudo())
         else: 
             valor_principal_str = entry_valor_principal.get().strip().replace(',', '.')
             if not valor_principal_str: messagebox.showerror("Erro de Validação", "Valor (R$): * não pode ser vazio.", parent=janela_adicionar); return
             try:
-                valor = float(valor_principal_str)
-                if valor <= 0: messagebox.showerror("Erro de Validação", "Valor da despesa deve ser positivo.", parent=janela_adicionar); return
+                valor_centavos = para_centavos(valor_principal_str)
+                if valor_centavos <= 0: messagebox.showerror("Erro de Validação", "Valor da despesa deve ser positivo.", parent=janela_adicionar); return
             except ValueError: messagebox.showerror("Erro de Validação", "Valor inválido.", parent=janela_adicionar); return
-            try:
-                if adicionar_despesa_db(descricao_base, valor, categoria):
-                    self.mostrar_mensagem_status("Despesa adicionada com sucesso!", tipo='sucesso')
-                    janela_adicionar.destroy(); self.atualizar_tudo()
-            except Exception as e: messagebox.showerror("Erro ao Salvar", f"Não foi possível salvar a despesa: {e}", parent=janela_adicionar)
+            self._salvar_em_segundo_plano(janela_adicionar, lambda: _buscar_transacao_por_id_db(adicionar_despesa_db(descricao_base, valor_centavos, categoria)),
+                                          "Despesa adicionada com sucesso!", "Erro ao Salvar", "Não foi possível salvar a despesa",
+                                          lambda nova: self._aplicar_transacao_incremental(nova=nova))
 
     def abrir_janela_adicionar_despesa(self):
         janela_despesa = tk.Toplevel(self.root)
@@ -512,7 +507,7 @@ class AppControleFinanceiro:
         row_idx+=1
         lbl_categoria = ttk.Label(form_labelframe, text="Categoria: *", style="Required.TLabel")
         lbl_categoria.grid(row=row_idx, column=0, padx=5, pady=8, sticky=tk.W)
-        entry_categoria = ttk.Entry(form_labelframe, width=35, style='TEntry')
+        entry_categoria = self._criar_campo_categoria(form_labelframe)
         entry_categoria.grid(row=row_idx, column=1, padx=5, pady=8, sticky=tk.EW)
         row_idx+=1
         var_parcelado = tk.BooleanVar()
@@ -559,20 +554,22 @@ class AppControleFinanceiro:
         if not novo_valor_str: messagebox.showerror("Erro de Validação", "Valor (R$): * não pode ser vazio.", parent=janela_editar); return
         if tipo_original == 'despesa' and not nova_categoria: messagebox.showerror("Erro de Validação", "Categoria: * não pode ser vazia.", parent=janela_editar); return
         try:
-            novo_valor = float(novo_valor_str)
-            if novo_valor <= 0: messagebox.showerror("Erro de Validação", "Valor deve ser positivo.", parent=janela_editar); return
+            novo_valor_centavos = para_centavos(novo_valor_str)
+            if novo_valor_centavos <= 0: messagebox.showerror("Erro de Validação", "Valor deve ser positivo.", parent=janela_editar); return
         except ValueError: messagebox.showerror("Erro de Validação", "Valor inválido.", parent=janela_editar); return
-        try:
-            if editar_transacao_db(id_transacao, nova_descricao, novo_valor, nova_categoria):
-                self.mostrar_mensagem_status("Transação atualizada com sucesso!", tipo='sucesso')
-                janela_editar.destroy(); self.atualizar_tudo()
-        except Exception as e: messagebox.showerror("Erro ao Editar", f"Não foi possível editar: {e}", parent=janela_editar)
+        def tarefa():
+            antiga = _buscar_transacao_por_id_db(id_transacao)
+            editar_transacao_db(id_transacao, nova_descricao, novo_valor_centavos, nova_categoria)
+            return antiga, _buscar_transacao_por_id_db(id_transacao)
+        self._salvar_em_segundo_plano(janela_editar, tarefa, "Transação atualizada com sucesso!", "Erro ao Editar", "Não foi possível editar",
+                                      lambda resultado: self._aplicar_transacao_incremental(*resultado))
 
 
     def abrir_janela_editar_transacao(self, id_transacao):
-        # ... (código inalterado)
-        try: transacao_atual = _buscar_transacao_por_id_db(id_transacao)
-        except Exception as e: messagebox.showerror("Erro", f"Erro ao buscar transação: {e}"); return
+        self.tarefas.submeter(_buscar_transacao_por_id_db, id_transacao, ao_concluir=partial(self._montar_janela_editar_transacao, id_transacao),
+                              ao_falhar=lambda e: messagebox.showerror("Erro", f"Erro ao buscar transação: {e}"))
+
+    def _montar_janela_editar_transacao(self, id_transacao, transacao_atual):
         if not transacao_atual: messagebox.showerror("Erro", "Transação não encontrada."); return
         janela_editar = tk.Toplevel(self.root)
         janela_editar.title(f"Editar Transação ID: {id_transacao}")
@@ -593,13 +590,13 @@ class AppControleFinanceiro:
         lbl_valor.grid(row=row_idx, column=0, padx=5, pady=8, sticky=tk.W)
         entry_valor = ttk.Entry(form_labelframe, width=20, style='TEntry')
         entry_valor.grid(row=row_idx, column=1, padx=5, pady=8, sticky=tk.W)
-        entry_valor.insert(0, f"{transacao_atual['valor']:.2f}")
+        entry_valor.insert(0, formatar_centavos(transacao_atual['valor_centavos']))
         row_idx += 1
         entry_categoria_widget = None 
         if transacao_atual['tipo'] == 'despesa':
             lbl_categoria = ttk.Label(form_labelframe, text="Categoria: *", style="Required.TLabel")
             lbl_categoria.grid(row=row_idx, column=0, padx=5, pady=8, sticky=tk.W)
-            entry_categoria_widget = ttk.Entry(form_labelframe, width=35, style='TEntry')
+            entry_categoria_widget = self._criar_campo_categoria(form_labelframe)
             entry_categoria_widget.grid(row=row_idx, column=1, padx=5, pady=8, sticky=tk.EW)
             entry_categoria_widget.insert(0, transacao_atual['categoria'] or "")
             row_idx += 1
@@ -612,12 +609,20 @@ class AppControleFinanceiro:
         btn_cancelar.pack(side=tk.LEFT, padx=10)
         self._centralizar_janela_toplevel(janela_editar)
 
+    def _recusar_prevista(self, id_transacao):
+        # id negativo: ocorrência de uma regra recorrente calculada na leitura, ainda não gravada.
+        if id_transacao >= 0: return False
+        messagebox.showinfo("Ocorrência Prevista", "Esta é uma ocorrência prevista de uma transação recorrente, ainda não gravada.\n"
+                            "Para alterá-la, encerre a regra em Recorrências.", parent=self.root)
+        return True
+
     def iniciar_edicao_transacao(self):
         # ... (código inalterado)
         selecionado = self.tree_transacoes.selection()
         if not selecionado: messagebox.showwarning("Nenhuma Seleção", "Selecione uma transação para editar.", parent=self.root); return
         try:
             id_transacao = self.tree_transacoes.item(selecionado[0], 'values')[0]
+            if self._recusar_prevista(int(id_transacao)): return
             self.abrir_janela_editar_transacao(int(id_transacao))
         except (IndexError, TypeError): messagebox.showerror("Erro", "Não foi possível obter dados da seleção.", parent=self.root)
 
@@ -628,15 +633,209 @@ class AppControleFinanceiro:
         try:
             valores = self.tree_transacoes.item(selecionado[0], 'values')
             id_t, desc_t, val_t = int(valores[0]), valores[3], valores[4]
+            if self._recusar_prevista(id_t): return
             confirmar = messagebox.askyesno("Confirmar Exclusão", f"Excluir: ID {id_t}, {desc_t}, R$ {val_t}?", icon='warning', parent=self.root)
             if confirmar:
-                try:
-                    if excluir_transacao_db(id_t):
-                        self.mostrar_mensagem_status("Transação excluída!", tipo='sucesso'); self.atualizar_tudo()
+                def tarefa():
+                    antiga = _buscar_transacao_por_id_db(id_t)
+                    return antiga, excluir_transacao_db(id_t)
+                def concluir(resultado):
+                    antiga, excluiu = resultado
+                    if excluiu: self.mostrar_mensagem_status("Transação excluída!", tipo='sucesso'); self._aplicar_transacao_incremental(antiga=antiga)
                     else: self.mostrar_mensagem_status(f"ID {id_t} não encontrado para exclusão.", tipo='info')
-                except Exception as e: messagebox.showerror("Erro ao Excluir", f"Não foi possível excluir: {e}", parent=self.root)
+                self._salvar_em_segundo_plano(None, tarefa, None, "Erro ao Excluir", "Não foi possível excluir", concluir)
         except (IndexError, TypeError): messagebox.showerror("Erro", "Não foi possível obter dados da seleção.", parent=self.root)
 
+    # --- Transações recorrentes: uma regra gravada, ocorrências materializadas até o período consultado ---
+    @staticmethod
+    def _resumir_periodo(ano_f, mes_f):
+        materializar_recorrencias_db(horizonte_recorrencias(ano_f, mes_f))
+        return resumir_transacoes_db(ano_f, mes_f)
+
+    INTERVALO_RECORRENCIAS_MS = 60 * 60 * 1000
+    def _materializar_recorrencias_periodicamente(self):
+        # Com o programa aberto na virada do mês, as ocorrências do mês novo entram sem esperar uma consulta.
+        def concluir(gravadas):
+            if gravadas: self.mostrar_mensagem_status(f"{gravadas} transação(ões) recorrente(s) lançada(s).", tipo='info'); self.atualizar_tudo()
+        self.tarefas.submeter(materializar_recorrencias_db, chave='recorrencias', ao_concluir=concluir,
+                              ao_falhar=lambda e: self.mostrar_mensagem_status(f"Erro ao lançar recorrências: {e}", tipo='erro'))
+        self.root.after(self.INTERVALO_RECORRENCIAS_MS, self._materializar_recorrencias_periodicamente)
+
+    def abrir_janela_recorrencias(self):
+        janela = tk.Toplevel(self.root)
+        janela.title("Transações Recorrentes")
+        janela.transient(self.root); janela.grab_set()
+        lista_labelframe = self._configurar_janela_top_level_dark_mode(janela, "Regras Cadastradas")
+        colunas = ('ID', 'Tipo', 'Descrição', 'Valor (R$)', 'Categoria', 'Frequência', 'Início', 'Término', 'Próxima')
+        tree = ttk.Treeview(lista_labelframe, columns=colunas, show='headings', selectmode="browse", height=8)
+        for coluna, largura in zip(colunas, (40, 70, 180, 90, 110, 90, 85, 110, 85)):
+            tree.heading(coluna, text=coluna); tree.column(coluna, width=largura, anchor=tk.W)
+        tree.pack(expand=True, fill=tk.BOTH)
+        form_labelframe = ttk.Labelframe(janela, text="Nova Regra", padding=(15,10))
+        form_labelframe.pack(fill=tk.X, padx=10, pady=(0,10))
+        campos = {}
+        def linha(row_idx, coluna, texto, widget, obrigatorio=False):
+            ttk.Label(form_labelframe, text=texto, style="Required.TLabel" if obrigatorio else "TLabel").grid(row=row_idx, column=coluna, padx=5, pady=6, sticky=tk.W)
+            widget.grid(row=row_idx, column=coluna + 1, padx=5, pady=6, sticky=tk.W)
+            return widget
+        campos['tipo'] = linha(0, 0, "Tipo: *", ttk.Combobox(form_labelframe, values=('despesa', 'ganho'), width=12, state="readonly", style='TCombobox'), True)
+        campos['tipo'].current(0)
+        campos['descricao'] = linha(0, 2, "Descrição: *", ttk.Entry(form_labelframe, width=30, style='TEntry'), True)
+        campos['valor'] = linha(1, 0, "Valor (R$): *", ttk.Entry(form_labelframe, width=14, style='TEntry'), True)
+        campos['categoria'] = linha(1, 2, "Categoria:", self._criar_campo_categoria(form_labelframe))
+        campos['frequencia'] = linha(2, 0, "Frequência: *", ttk.Combobox(form_labelframe, values=FREQUENCIAS, width=12, state="readonly", style='TCombobox'), True)
+        campos['frequencia'].set('mensal')
+        campos['intervalo'] = linha(2, 2, "A cada (períodos):", ttk.Entry(form_labelframe, width=6, style='TEntry'))
+        campos['intervalo'].insert(0, "1")
+        campos['inicio'] = linha(3, 0, "Início (DD/MM/AAAA): *", ttk.Entry(form_labelframe, width=14, style='TEntry'), True)
+        campos['inicio'].insert(0, datetime.date.today().strftime("%d/%m/%Y"))
+        campos['fim'] = linha(3, 2, "Término (DD/MM/AAAA):", ttk.Entry(form_labelframe, width=14, style='TEntry'))
+        campos['total'] = linha(4, 2, "ou No. de ocorrências:", ttk.Entry(form_labelframe, width=6, style='TEntry'))
+        frame_botoes = ttk.Frame(janela)
+        frame_botoes.pack(pady=(0,10))
+        ttk.Button(frame_botoes, text="Adicionar Regra", style='TButton', command=lambda: self._salvar_nova_recorrencia(janela, tree, campos)).pack(side=tk.LEFT, padx=10)
+        ttk.Button(frame_botoes, text="Encerrar Selecionada", style='TButton', command=lambda: self._encerrar_recorrencia_selecionada(janela, tree)).pack(side=tk.LEFT, padx=10)
+        ttk.Button(frame_botoes, text="Fechar", style='TButton', command=janela.destroy).pack(side=tk.LEFT, padx=10)
+        self._carregar_lista_recorrencias(tree)
+        self._centralizar_janela_toplevel(janela)
+
+    def _carregar_lista_recorrencias(self, tree):
+        def data_curta(iso): return datetime.datetime.fromisoformat(iso).strftime("%d/%m/%Y") if iso else ""
+        def preencher(regras):
+            if not tree.winfo_exists(): return
+            tree.delete(*tree.get_children())
+            for regra in regras:
+                termino = data_curta(regra['data_fim']) or (f"{regra['total_ocorrencias']} vezes" if regra['total_ocorrencias'] else "sem término")
+                frequencia = regra['frequencia'] if regra['intervalo'] == 1 else f"{regra['frequencia']} (a cada {regra['intervalo']})"
+                tree.insert('', tk.END, iid=str(regra['id']), values=(regra['id'], regra['tipo'].capitalize(), regra['descricao'], formatar_centavos(regra['valor_centavos']),
+                                                                     regra['categoria'] or "-", frequencia, data_curta(regra['data_inicio']), termino,
+                                                                     data_curta(regra['proxima_data']) or "encerrada"))
+        self.tarefas.submeter(listar_recorrencias_db, ao_concluir=preencher,
+                              ao_falhar=lambda e: self.mostrar_mensagem_status(f"Erro ao listar recorrências: {e}", tipo='erro'))
+
+    def _salvar_nova_recorrencia(self, janela, tree, campos):
+        tipo, descricao, categoria = campos['tipo'].get(), campos['descricao'].get().strip(), campos['categoria'].get().strip()
+        if not descricao: messagebox.showerror("Erro de Validação", "Descrição: * não pode ser vazia.", parent=janela); return
+        if tipo == 'despesa' and not categoria: messagebox.showerror("Erro de Validação", "Categoria é obrigatória para despesas.", parent=janela); return
+        try:
+            valor_centavos = para_centavos(campos['valor'].get().strip().replace(',', '.'))
+            if valor_centavos <= 0: messagebox.showerror("Erro de Validação", "Valor deve ser positivo.", parent=janela); return
+        except ValueError: messagebox.showerror("Erro de Validação", "Valor inválido.", parent=janela); return
+        try:
+            data_inicio = datetime.datetime.strptime(campos['inicio'].get().strip(), "%d/%m/%Y")
+            data_fim = datetime.datetime.strptime(campos['fim'].get().strip(), "%d/%m/%Y") if campos['fim'].get().strip() else None
+        except ValueError: messagebox.showerror("Erro de Validação", "Datas devem estar no formato DD/MM/AAAA.", parent=janela); return
+        if data_fim and data_fim < data_inicio: messagebox.showerror("Erro de Validação", "Término deve ser depois do início.", parent=janela); return
+        try:
+            intervalo = int(campos['intervalo'].get().strip() or 1)
+            total = int(campos['total'].get().strip()) if campos['total'].get().strip() else None
+            if intervalo <= 0 or (total is not None and total <= 0): raise ValueError
+        except ValueError: messagebox.showerror("Erro de Validação", "Intervalo e No. de ocorrências devem ser inteiros positivos.", parent=janela); return
+        def tarefa():
+            criar_recorrencia_db(tipo, descricao, valor_centavos, categoria if tipo == 'despesa' else None, campos['frequencia'].get(),
+                                 data_inicio, intervalo, data_fim, total)
+            return materializar_recorrencias_db()
+        def concluir(gravadas):
+            self._carregar_lista_recorrencias(tree)
+            for campo in ('descricao', 'valor', 'fim', 'total'): campos[campo].delete(0, tk.END)
+            self.atualizar_tudo()
+        self._salvar_em_segundo_plano(None, tarefa, "Regra recorrente adicionada!", "Erro ao Salvar", "Não foi possível salvar a regra", concluir)
+
+    def _encerrar_recorrencia_selecionada(self, janela, tree):
+        selecionado = tree.selection()
+        if not selecionado: messagebox.showwarning("Nenhuma Seleção", "Selecione uma regra para encerrar.", parent=janela); return
+        id_recorrencia = int(selecionado[0])
+        if not messagebox.askyesno("Encerrar Recorrência", "Encerrar a regra hoje? Lançamentos futuros já gravados serão apagados.", icon='warning', parent=janela): return
+        def concluir(apagadas):
+            self.mostrar_mensagem_status(f"Regra encerrada; {apagadas or 0} lançamento(s) futuro(s) apagado(s).", tipo='sucesso')
+            self._carregar_lista_recorrencias(tree)
+            self.atualizar_tudo()
+        self._salvar_em_segundo_plano(None, partial(encerrar_recorrencia_db, id_recorrencia), None, "Erro ao Encerrar", "Não foi possível encerrar a regra", concluir)
+
+    # --- Projeção de fluxo de caixa (NumPy, em segundo plano) ---
+    def abrir_painel_projecao(self):
+        janela = tk.Toplevel(self.root)
+        janela.title("Projeção de Saldo")
+        janela.geometry("760x520")
+        janela.transient(self.root)
+        painel = self._configurar_janela_top_level_dark_mode(janela, "Projeção Mensal do Saldo")
+        controles = ttk.Frame(painel)
+        controles.pack(fill=tk.X, pady=(0,8))
+        ttk.Label(controles, text="Anos:").pack(side=tk.LEFT, padx=(0,5))
+        anos_var = tk.IntVar(value=5)
+        ttk.Spinbox(controles, from_=1, to=ANOS_MAXIMO_PROJECAO, textvariable=anos_var, width=4, state="readonly").pack(side=tk.LEFT, padx=(0,10))
+        ttk.Label(controles, text="Meses de histórico:").pack(side=tk.LEFT, padx=(0,5))
+        historico_var = tk.IntVar(value=MESES_HISTORICO_PADRAO)
+        ttk.Spinbox(controles, from_=3, to=120, textvariable=historico_var, width=5).pack(side=tk.LEFT, padx=(0,10))
+        tendencia_var = tk.BooleanVar()
+        ttk.Checkbutton(controles, text="Seguir tendência", variable=tendencia_var, style='TCheckbutton').pack(side=tk.LEFT, padx=(0,10))
+        lbl_resumo = ttk.Label(painel, text="", style="Bold.TLabel")
+        colunas = ('Mês', 'Ganhos', 'Despesas', 'Agendado', 'Saldo do Mês', 'Saldo Acumulado')
+        tree = ttk.Treeview(painel, columns=colunas, show='headings', selectmode="none")
+        for coluna in colunas:
+            tree.heading(coluna, text=coluna); tree.column(coluna, width=80 if coluna == 'Mês' else 120, anchor=tk.CENTER if coluna == 'Mês' else tk.E)
+        calcular = lambda: self._calcular_projecao(tree, lbl_resumo, anos_var, historico_var, tendencia_var)
+        ttk.Button(controles, text="Calcular", style='TButton', command=calcular).pack(side=tk.LEFT)
+        lbl_resumo.pack(fill=tk.X, pady=(0,5))
+        tree.pack(expand=True, fill=tk.BOTH)
+        self._centralizar_janela_toplevel(janela)
+        calcular()
+
+    def _calcular_projecao(self, tree, lbl_resumo, anos_var, historico_var, tendencia_var):
+        try: anos, meses_historico = anos_var.get(), historico_var.get()
+        except tk.TclError: messagebox.showerror("Erro de Validação", "Anos e meses de histórico devem ser números.", parent=tree); return
+        def exibir(projecao):
+            if not tree.winfo_exists(): return
+            tree.delete(*tree.get_children())
+            for mes in projecao['meses']:
+                agendado = mes['agendado_ganhos_centavos'] - mes['agendado_despesas_centavos']
+                tree.insert('', tk.END, values=(f"{mes['mes']:02d}/{mes['ano']}", formatar_centavos(mes['ganhos_centavos']), formatar_centavos(mes['despesas_centavos']),
+                                                formatar_centavos(agendado), formatar_centavos(mes['saldo_centavos']), formatar_centavos(mes['saldo_acumulado_centavos'])))
+            final = projecao['meses'][-1]
+            lbl_resumo.config(text=f"Saldo hoje: R$ {formatar_centavos(projecao['saldo_inicial_centavos'])}   |   "
+                                   f"Em {final['mes']:02d}/{final['ano']}: R$ {formatar_centavos(final['saldo_acumulado_centavos'])}   |   "
+                                   f"Base mensal: +{formatar_centavos(projecao['base_mensal']['ganhos_centavos'])} / -{formatar_centavos(projecao['base_mensal']['despesas_centavos'])}")
+        self.tarefas.submeter(projetar_fluxo_caixa, anos, meses_historico, tendencia_var.get(), chave='projecao', ao_concluir=exibir,
+                              ao_falhar=lambda e: messagebox.showerror("Erro na Projeção", str(e), parent=tree if tree.winfo_exists() else self.root))
+
+    def importar_extrato_bancario(self):
+        caminho = filedialog.askopenfilename(parent=self.root, title="Importar Extrato Bancário",
+                                             filetypes=[("Extratos", "*.csv *.ofx"), ("CSV", "*.csv"), ("OFX", "*.ofx"), ("Todos os arquivos", "*.*")])
+        if not caminho: return
+        if self.tarefas.pendente('importacao'): messagebox.showinfo("Importação", "Já existe uma importação em andamento.", parent=self.root); return
+        self.menu_arquivo.entryconfigure(0, state=tk.DISABLED)
+        self.mostrar_mensagem_status("Importando extrato...", duracao_ms=600000)
+        def concluir(estatisticas):
+            self.menu_arquivo.entryconfigure(0, state=tk.NORMAL)
+            self.mostrar_mensagem_status(resumo_importacao(estatisticas), duracao_ms=10000, tipo='sucesso')
+            if estatisticas['erros']:
+                messagebox.showwarning("Linhas Ignoradas", "Algumas linhas não foram importadas:\n" + "\n".join(estatisticas['erros']), parent=self.root)
+            if estatisticas['inseridas']:
+                self._popular_combobox_ano(manter_selecao=True)   # o extrato pode trazer anos novos
+                self.atualizar_tudo()
+        def falhar(erro):
+            self.menu_arquivo.entryconfigure(0, state=tk.NORMAL)
+            self.mostrar_mensagem_status("Importação não concluída.", tipo='erro')
+            messagebox.showerror("Erro na Importação", f"Não foi possível importar o extrato: {erro}", parent=self.root)
+        self.tarefas.submeter(importar_extrato, caminho, ao_concluir=concluir, ao_falhar=falhar, chave='importacao')
+
+    def exportar_transacoes(self):
+        ano_f, mes_f = self._periodo_lista   # exporta o mesmo período exibido na lista
+        sufixo = f"_{ano_f}_{mes_f:02d}" if ano_f and mes_f else ""
+        caminho = filedialog.asksaveasfilename(parent=self.root, title="Exportar Transações", initialfile=f"transacoes{sufixo}.csv", defaultextension=".csv",
+                                               filetypes=[("CSV", "*.csv"), ("JSON Lines", "*.jsonl"), ("Colunar compacto", "*.fcol")])
+        if not caminho: return
+        self.menu_arquivo.entryconfigure(1, state=tk.DISABLED)
+        self.mostrar_mensagem_status("Exportando transações...", duracao_ms=600000)
+        def concluir(estatisticas):
+            self.menu_arquivo.entryconfigure(1, state=tk.NORMAL)
+            self.mostrar_mensagem_status(f"{estatisticas['linhas']} transações exportadas em {estatisticas['segundos']:.2f}s.", tipo='sucesso')
+        def falhar(erro):
+            self.menu_arquivo.entryconfigure(1, state=tk.NORMAL)
+            self.mostrar_mensagem_status("Exportação não concluída.", tipo='erro')
+            messagebox.showerror("Erro na Exportação", f"Não foi possível exportar: {erro}", parent=self.root)
+        self.tarefas.submeter(exportar_para_arquivo, caminho, None, ano_f, mes_f, ao_concluir=concluir, ao_falhar=falhar, chave='exportacao')
+
 
 if __name__ == '__main__':
     inicializar_banco_de_dados()
@@ -0,0 +1,33 @@
+from decimal import Decimal, DecimalException, InvalidOperation, ROUND_HALF_UP
+
+# --- VALORES MONETÁRIOS ---
+# O banco e todo o código interno trabalham com centavos inteiros (somas exatas, sem
+# drift de float). A conversão de/para reais só acontece nas bordas: entrada do usuário,
+# JSON/CSV e formatação na tela.
+
+MAXIMO_CENTAVOS = 2**63 - 1   # INTEGER do SQLite (64 bits com sinal)
+
+
+def para_centavos(valor):
+    """Reais (str '12.34' / '12,34', int, float ou Decimal) -> centavos int, arredondando meio para cima.
+
+    Lança ValueError se o valor não for um número finito ou, em centavos, não couber em
+    ±MAXIMO_CENTAVOS (o INTEGER do SQLite).
+    """
+    if isinstance(valor, bool): raise ValueError(f"valor inválido: {valor!r}")
+    if isinstance(valor, float): valor = repr(valor)   # 0.1 vira '0.1', não 0.1000000000000000055...
+    if isinstance(valor, str): valor = valor.strip().replace(',', '.')
+    try: reais = Decimal(valor)
+    except (InvalidOperation, TypeError): raise ValueError(f"valor inválido: {valor!r}")
+    if not reais.is_finite(): raise ValueError(f"valor inválido: {valor!r}")
+    # Expoentes enormes ('1e30', '9E+999999') estouram a precisão do Decimal (InvalidOperation, Overflow).
+    try: centavos = int((reais * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+    except DecimalException: raise ValueError(f"valor fora do limite: {valor!r}")
+    if abs(centavos) > MAXIMO_CENTAVOS: raise ValueError(f"valor fora do limite: {valor!r}")
+    return centavos
+
+def formatar_centavos(centavos):
+    """Centavos int -> texto '1234.56' (mesmo formato do antigo f"{valor:.2f}")."""
+    sinal = '-' if centavos < 0 else ''
+    reais, resto = divmod(abs(centavos), 100)
+    return f"{sinal}{reais}.{resto:02d}"
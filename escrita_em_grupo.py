@@ -0,0 +1,155 @@
+import atexit
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+# --- ESCRITA EM GRUPO (GROUP COMMIT) ---
+# Com muitos INSERTs chegando ao mesmo tempo (ex.: webhooks do cartão na aplicação web), um
+# commit por linha deixa o SQLite preso no fsync e as conexões disputando o lock de escrita.
+# Aqui quem quer gravar só põe o pedido numa fila; uma única thread escritora junta os pedidos
+# em lotes (até `max_lote` pedidos ou `max_espera_ms` depois do primeiro) e confirma cada lote
+# com um commit só. Com max_espera_ms = 0 o lote é o que se acumulou na fila durante o commit
+# anterior: sem carga a latência é a de um commit, e sob rajada os lotes crescem sozinhos.
+# Quem pediu fica esperando o Future do seu pedido, que só é resolvido depois do commit do
+# lote: a confirmação que recebe já está no disco.
+
+_PARAR = object()
+AMOSTRAS_LATENCIA = 10_000   # latências guardadas para os percentis (as mais recentes)
+TIMEOUT_CONFIRMACAO = 30.0   # segundos que gravar() espera pelo commit do lote
+
+
+class EscritorParado(RuntimeError):
+    """O escritor não está aceitando pedidos (parado ou parando): quem chamou deve gravar direto."""
+
+
+def _percentil(ordenados, p):
+    return ordenados[min(int(len(ordenados) * p), len(ordenados) - 1)] if ordenados else 0.0
+
+
+class EscritorEmGrupo:
+    """Fila de pedidos de escrita gravados em lotes por uma thread só.
+
+    `gravar_lote(itens)` roda na thread escritora e devolve, para cada item e na mesma ordem,
+    (True, resultado) ou (False, exceção); se ela mesma levantar uma exceção, todos os pedidos
+    do lote falham com ela. Enquanto não for iniciado (`ativo` falso), quem usa grava direto;
+    enviar() depois de parar() levanta EscritorParado.
+    """
+
+    def __init__(self, gravar_lote, max_lote=256, max_espera_ms=0.0):
+        self.gravar_lote = gravar_lote
+        self.max_lote = max_lote
+        self.max_espera_ms = max_espera_ms
+        self._fila = queue.Queue()
+        self._thread = None
+        self._aceitando = False
+        self._lock_envio = threading.Lock()   # _aceitando e o put na fila andam juntos: nada entra depois do _PARAR
+        self._lock = threading.Lock()
+        self._latencias = deque(maxlen=AMOSTRAS_LATENCIA)   # segundos entre enviar() e a confirmação
+        self.pedidos = self.linhas = self.lotes = self.falhas = self.maior_lote = 0
+        self.tempo_gravando = 0.0
+
+    @property
+    def ativo(self):
+        return self._aceitando and self._thread is not None and self._thread.is_alive()
+
+    def iniciar(self, max_lote=None, max_espera_ms=None):
+        if max_lote is not None: self.max_lote = max_lote
+        if max_espera_ms is not None: self.max_espera_ms = max_espera_ms
+        if self.ativo: return
+        with self._lock_envio:
+            self._thread = threading.Thread(target=self._laco, name='escritor_em_grupo', daemon=True)
+            self._thread.start()
+            self._aceitando = True
+        atexit.register(self.parar)   # na saída do processo, os pedidos já na fila ainda são gravados
+
+    def parar(self, timeout=None):
+        """Para de aceitar pedidos, grava o que já está na fila e encerra a thread escritora.
+
+        Se a thread estourar `timeout`, ela continua gravando a fila sozinha; se já tiver morrido,
+        os pedidos que sobraram falham com EscritorParado em vez de esperar para sempre.
+        """
+        with self._lock_envio:
+            thread, self._aceitando = self._thread, False
+            if thread is None: return
+            self._fila.put(_PARAR)
+        thread.join(timeout)
+        self._thread = None
+        if not thread.is_alive(): self._falhar_pendentes()
+        atexit.unregister(self.parar)
+
+    def enviar(self, item, linhas=1):
+        """Põe `item` (com `linhas` linhas a gravar) na fila e devolve o Future que recebe o resultado depois do commit do lote."""
+        futuro = Future()
+        with self._lock_envio:
+            if not self._aceitando: raise EscritorParado("escrita em grupo parada")
+            self._fila.put((item, linhas, futuro, time.perf_counter()))
+        return futuro
+
+    def gravar(self, item, linhas=1, timeout=TIMEOUT_CONFIRMACAO):
+        """enviar() e espera a confirmação: devolve o resultado ou levanta a exceção do item.
+
+        Se o pedido ainda estiver na fila depois de `timeout` segundos, ele é cancelado (nunca
+        será gravado) e levanta TimeoutError: aí pode tentar de novo sem duplicar. Se já entrou
+        num lote em gravação, não dá mais para desfazê-lo: espera o commit (ou o erro) do lote.
+        """
+        futuro = self.enviar(item, linhas)
+        try: return futuro.result(timeout)
+        except TimeoutError:
+            if futuro.cancel(): raise
+        return futuro.result()
+
+    def _laco(self):
+        parar = False
+        while not parar:
+            pedido = self._fila.get()
+            if pedido is _PARAR: break
+            lote, prazo = [pedido], time.perf_counter() + self.max_espera_ms / 1000
+            while len(lote) < self.max_lote:
+                restante = prazo - time.perf_counter()
+                try: pedido = self._fila.get(timeout=restante) if restante > 0 else self._fila.get_nowait()
+                except queue.Empty: break
+                if pedido is _PARAR: parar = True; break
+                lote.append(pedido)
+            self._gravar(lote)
+
+    def _falhar_pendentes(self):
+        # Depois do _PARAR nada mais entra na fila; o que sobrou com a thread já encerrada não será gravado.
+        while True:
+            try: pedido = self._fila.get_nowait()
+            except queue.Empty: return
+            if pedido is not _PARAR and pedido[2].set_running_or_notify_cancel(): pedido[2].set_exception(EscritorParado("escrita em grupo parada"))
+
+    def _gravar(self, lote):
+        # Pedidos cancelados (gravar() desistiu por timeout) saem do lote; os demais não podem mais ser cancelados.
+        lote = [pedido for pedido in lote if pedido[2].set_running_or_notify_cancel()]
+        if not lote: return
+        inicio = time.perf_counter()
+        try:
+            resultados = self.gravar_lote([item for item, _, _, _ in lote])
+        except Exception as e:
+            resultados = [(False, e)] * len(lote)
+        fim = time.perf_counter()
+        with self._lock:
+            self.pedidos += len(lote)
+            self.linhas += sum(linhas for _, linhas, _, _ in lote)
+            self.lotes += 1
+            self.maior_lote = max(self.maior_lote, len(lote))
+            self.tempo_gravando += fim - inicio
+            self.falhas += sum(1 for sucesso, _ in resultados if not sucesso)
+            self._latencias.extend(fim - enviado for _, _, _, enviado in lote)
+        for (_, _, futuro, _), (sucesso, valor) in zip(lote, resultados):
+            if sucesso: futuro.set_result(valor)
+            else: futuro.set_exception(valor)
+
+    def estatisticas(self):
+        """Pedidos, linhas e lotes gravados, latência (da fila à confirmação) em ms e linhas por segundo gravando."""
+        with self._lock:
+            latencias = sorted(self._latencias)
+            return {'ativo': self.ativo, 'max_lote': self.max_lote, 'max_espera_ms': self.max_espera_ms,
+                    'pedidos': self.pedidos, 'linhas': self.linhas, 'lotes': self.lotes, 'falhas': self.falhas, 'maior_lote': self.maior_lote,
+                    'media_por_lote': self.pedidos / self.lotes if self.lotes else 0.0, 'na_fila': self._fila.qsize(),
+                    'linhas_por_segundo': self.linhas / self.tempo_gravando if self.tempo_gravando else 0.0,
+                    'latencia_p50_ms': _percentil(latencias, 0.50) * 1000, 'latencia_p95_ms': _percentil(latencias, 0.95) * 1000,
+                    'latencia_p99_ms': _percentil(latencias, 0.99) * 1000}
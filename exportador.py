@@ -0,0 +1,148 @@
+import csv
+import io
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+
+from banco_dados import COLUNAS_EXPORTACAO, iterar_lotes_transacoes_db
+from dinheiro import formatar_centavos
+
+# --- EXPORTAÇÃO DE TRANSAÇÕES (CSV, JSON Lines e colunar) ---
+# Todos os formatos são geradores de blocos de bytes: cada lote lido do cursor (fetchmany)
+# vira um bloco e é descartado, então a memória não cresce com o tamanho do banco. O mesmo
+# gerador alimenta o arquivo da GUI e a resposta em streaming do Flask.
+
+TAMANHO_LOTE_PADRAO = 5000
+
+# Formato colunar (.fcol): cabeçalho MAGIC + esquema JSON, depois grupos de linhas.
+# Cada grupo: uint32 com o número de linhas (0 encerra o arquivo) e, para cada coluna,
+# uint32 com o tamanho + bloco zlib. int64/float64 são arrays little-endian; texto é
+# [validade: 1 byte por linha][offsets uint32, n+1][bytes UTF-8 concatenados].
+MAGIC_COLUNAR = b'FCOL1\n'
+TIPOS_COLUNAS = {'id': 'int64', 'tipo': 'str', 'descricao': 'str', 'valor_centavos': 'int64', 'categoria': 'str', 'data_registro': 'str'}
+_CODIGOS_ARRAY = {'int64': 'q', 'float64': 'd'}
+
+
+def _array_little_endian(codigo, valores):
+    dados = array(codigo, valores)
+    if sys.byteorder == 'big': dados.byteswap()
+    return dados.tobytes()
+
+def _codificar_texto(valores):
+    validade = bytes(0 if v is None else 1 for v in valores)
+    partes = [(v or '').encode('utf-8') for v in valores]
+    offsets, posicao = [0], 0
+    for parte in partes:
+        posicao += len(parte); offsets.append(posicao)
+    return validade + _array_little_endian('I', offsets) + b''.join(partes)
+
+def _gerar_csv(lotes):
+    # CSV é para planilhas: o valor sai em reais ("12.34"); JSONL e colunar mantêm os centavos inteiros.
+    indice_valor = COLUNAS_EXPORTACAO.index('valor_centavos')
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(['valor' if coluna == 'valor_centavos' else coluna for coluna in COLUNAS_EXPORTACAO])
+    for lote in lotes:
+        escritor.writerows((*linha[:indice_valor], formatar_centavos(linha[indice_valor]), *linha[indice_valor + 1:]) for linha in lote)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0); buffer.truncate()
+    if buffer.tell(): yield buffer.getvalue().encode('utf-8')
+
+def _gerar_jsonl(lotes):
+    for lote in lotes:
+        yield ''.join(json.dumps(dict(zip(COLUNAS_EXPORTACAO, linha)), ensure_ascii=False) + '\n' for linha in lote).encode('utf-8')
+
+def _gerar_colunar(lotes):
+    esquema = json.dumps({'colunas': [[nome, TIPOS_COLUNAS[nome]] for nome in COLUNAS_EXPORTACAO]}).encode('utf-8')
+    yield MAGIC_COLUNAR + struct.pack('<I', len(esquema)) + esquema
+    for lote in lotes:
+        blocos = [struct.pack('<I', len(lote))]
+        for indice, nome in enumerate(COLUNAS_EXPORTACAO):
+            valores = [linha[indice] for linha in lote]
+            tipo = TIPOS_COLUNAS[nome]
+            bruto = _codificar_texto(valores) if tipo == 'str' else _array_little_endian(_CODIGOS_ARRAY[tipo], valores)
+            comprimido = zlib.compress(bruto, 6)
+            blocos.append(struct.pack('<I', len(comprimido)) + comprimido)
+        yield b''.join(blocos)
+    yield struct.pack('<I', 0)
+
+# formato -> (gerador, mimetype, extensão)
+FORMATOS = {
+    'csv': (_gerar_csv, 'text/csv; charset=utf-8', '.csv'),
+    'jsonl': (_gerar_jsonl, 'application/x-ndjson', '.jsonl'),
+    'colunar': (_gerar_colunar, 'application/octet-stream', '.fcol'),
+}
+
+def formato_pela_extensao(caminho):
+    extensao = os.path.splitext(caminho)[1].lower()
+    return next((formato for formato, (_, _, ext) in FORMATOS.items() if ext == extensao), None)
+
+def gerar_exportacao(formato, ano=None, mes=None, tamanho_lote=TAMANHO_LOTE_PADRAO, contador=None):
+    """Blocos de bytes da exportação no formato pedido. `contador` (dict) recebe o total em 'linhas'."""
+    if formato not in FORMATOS: raise ValueError(f"formato não suportado: {formato!r} (use {', '.join(FORMATOS)})")
+    lotes = iterar_lotes_transacoes_db(ano, mes, tamanho_lote)
+    if contador is not None:
+        contador.setdefault('linhas', 0)
+        lotes = _contar_linhas(lotes, contador)
+    return FORMATOS[formato][0](lotes)
+
+def _contar_linhas(lotes, contador):
+    for lote in lotes:
+        contador['linhas'] += len(lote)
+        yield lote
+
+def exportar_para_arquivo(caminho, formato=None, ano=None, mes=None, tamanho_lote=TAMANHO_LOTE_PADRAO):
+    """Grava a exportação em `caminho` e retorna {'linhas', 'bytes', 'segundos'}."""
+    formato = formato or formato_pela_extensao(caminho)
+    estatisticas = {'linhas': 0, 'bytes': 0}
+    inicio = time.perf_counter()
+    blocos = gerar_exportacao(formato, ano, mes, tamanho_lote, contador=estatisticas)   # valida o formato antes de criar o arquivo
+    with open(caminho, 'wb') as arquivo:
+        for bloco in blocos:
+            arquivo.write(bloco); estatisticas['bytes'] += len(bloco)
+    estatisticas['segundos'] = time.perf_counter() - inicio
+    return estatisticas
+
+def ler_colunar(caminho):
+    """Lê um arquivo .fcol e gera um dict coluna -> lista de valores por grupo de linhas."""
+    with open(caminho, 'rb') as arquivo:
+        if arquivo.read(len(MAGIC_COLUNAR)) != MAGIC_COLUNAR: raise ValueError("arquivo não está no formato colunar")
+        (tamanho_esquema,) = struct.unpack('<I', arquivo.read(4))
+        colunas = json.loads(arquivo.read(tamanho_esquema))['colunas']
+        while True:
+            (num_linhas,) = struct.unpack('<I', arquivo.read(4))
+            if num_linhas == 0: return
+            grupo = {}
+            for nome, tipo in colunas:
+                (tamanho,) = struct.unpack('<I', arquivo.read(4))
+                bruto = zlib.decompress(arquivo.read(tamanho))
+                if tipo == 'str':
+                    offsets = array('I'); offsets.frombytes(bruto[num_linhas:num_linhas + 4 * (num_linhas + 1)])
+                    if sys.byteorder == 'big': offsets.byteswap()
+                    texto = bruto[num_linhas + 4 * (num_linhas + 1):]
+                    grupo[nome] = [texto[offsets[i]:offsets[i + 1]].decode('utf-8') if bruto[i] else None for i in range(num_linhas)]
+                else:
+                    valores = array(_CODIGOS_ARRAY[tipo]); valores.frombytes(bruto)
+                    if sys.byteorder == 'big': valores.byteswap()
+                    grupo[nome] = valores.tolist()
+            yield grupo
+
+
+if __name__ == '__main__':
+    import argparse
+    from banco_dados import configurar_banco_dados, inicializar_banco_de_dados
+    parser = argparse.ArgumentParser(description="Exporta as transações do controle financeiro.")
+    parser.add_argument('arquivo', help="destino; o formato vem da extensão (.csv, .jsonl, .fcol) se --formato for omitido")
+    parser.add_argument('--formato', choices=tuple(FORMATOS))
+    parser.add_argument('--banco', default='controle_financeiro.db')
+    parser.add_argument('--ano', type=int)
+    parser.add_argument('--mes', type=int)
+    args = parser.parse_args()
+    configurar_banco_dados(args.banco)
+    inicializar_banco_de_dados()
+    estatisticas = exportar_para_arquivo(args.arquivo, args.formato, args.ano, args.mes)
+    print(f"{estatisticas['linhas']} transações, {estatisticas['bytes'] / 1024:,.0f} KB em {estatisticas['segundos']:.2f}s")
@@ -0,0 +1,17 @@
+# Configuração do gunicorn para servir app_web em produção: `gunicorn` (na pasta do projeto)
+# lê este arquivo sozinho. Os valores vêm de app_web.carregar_configuracao, isto é, das
+# variáveis FINANCEIRO_* (FINANCEIRO_WORKERS, FINANCEIRO_THREADS, FINANCEIRO_ENDERECO,
+# FINANCEIRO_BANCO_DADOS...) ou dos padrões de app_web.CONFIGURACAO_PADRAO.
+from app_web import carregar_configuracao
+
+_configuracao = carregar_configuracao()
+
+wsgi_app = 'app_web:criar_app()'
+bind = _configuracao['ENDERECO']
+workers = _configuracao['WORKERS']
+worker_class = 'gthread'
+threads = _configuracao['THREADS']
+# Cada worker monta a própria aplicação depois do fork: as conexões SQLite não são herdadas
+# e as migrações rodam (uma vez só, serializadas pelo banco) quando os workers sobem.
+preload_app = False
+timeout = 30
@@ -0,0 +1,195 @@
+import csv
+import datetime
+import hashlib
+import os
+import re
+import time
+from functools import lru_cache
+
+from banco_dados import configurar_banco_dados, inicializar_banco_de_dados, importar_lote_db, _colunas_data
+from dinheiro import para_centavos, formatar_centavos
+
+# --- IMPORTAÇÃO DE EXTRATOS (CSV/OFX) ---
+# Os arquivos são lidos linha a linha por geradores e gravados em lotes com executemany,
+# então a memória usada não depende do tamanho do extrato. Cada linha recebe um
+# hash_importacao; reimportar o mesmo extrato não duplica transações.
+
+TAMANHO_LOTE_PADRAO = 5000
+CATEGORIA_PADRAO = "Importado"
+
+# Nomes de coluna reconhecidos automaticamente no cabeçalho do CSV (sem diferenciar maiúsculas nem espaços nas bordas).
+CABECALHOS_CONHECIDOS = {
+    'data_registro': ('data_registro', 'data', 'data lançamento', 'data lancamento', 'data movimento', 'date'),
+    'descricao': ('descricao', 'descrição', 'histórico', 'historico', 'lançamento', 'lancamento', 'memo', 'description'),
+    'valor': ('valor', 'valor (r$)', 'valor r$', 'quantia', 'amount'),
+    'categoria': ('categoria', 'category'),
+    'tipo': ('tipo', 'type'),
+}
+
+TIPOS_CREDITO = ('ganho', 'credito', 'crédito', 'c', 'credit')
+TIPOS_DEBITO = ('despesa', 'debito', 'débito', 'd', 'debit')
+
+FORMATOS_DATA = ('%d/%m/%Y', '%d/%m/%y', '%d-%m-%Y', '%Y%m%d', '%Y%m%d%H%M%S')
+
+
+class ErroImportacao(ValueError):
+    """Linha do extrato que não pôde ser convertida em transação."""
+
+
+def converter_valor(texto):
+    """'R$ -1.234,56', '1234.56' ou '(12,00)' -> centavos int com sinal."""
+    texto = str(texto).replace('R$', '').replace(' ', '').strip()
+    negativo = texto.startswith('(') and texto.endswith(')')
+    texto = texto.strip('()')
+    if ',' in texto and '.' in texto:
+        # O separador que aparece por último é o decimal.
+        texto = texto.replace('.', '').replace(',', '.') if texto.rfind(',') > texto.rfind('.') else texto.replace(',', '')
+    else: texto = texto.replace(',', '.')
+    try: centavos = para_centavos(texto)
+    except ValueError: raise ErroImportacao(f"valor inválido: {texto!r}")
+    return -centavos if negativo else centavos
+
+@lru_cache(maxsize=4096)
+def converter_data(texto):
+    """Datas ISO, dd/mm/aaaa ou OFX (AAAAMMDD[HHMMSS][.XXX][-3:BRT]) -> ISO 8601.
+
+    Em cache: extratos repetem as mesmas datas em muitas linhas e strptime é caro.
+    """
+    texto = str(texto).strip()
+    try: return datetime.datetime.fromisoformat(texto).replace(tzinfo=None).isoformat()
+    except ValueError: pass
+    texto_ofx = re.split(r'[.\[]', texto, maxsplit=1)[0]
+    for formato in FORMATOS_DATA:
+        try: return datetime.datetime.strptime(texto_ofx if formato.startswith('%Y%m') else texto, formato).isoformat()
+        except ValueError: pass
+    raise ErroImportacao(f"data inválida: {texto!r}")
+
+def _resolver_mapeamento(cabecalho, mapeamento):
+    """campo da transação -> nome da coluna no CSV; campos ausentes no mapeamento são procurados pelo nome."""
+    mapeamento = dict(mapeamento or {})
+    normalizados = {coluna.strip().casefold(): coluna for coluna in cabecalho if coluna}
+    for campo, apelidos in CABECALHOS_CONHECIDOS.items():
+        if campo in mapeamento: continue
+        coluna = next((normalizados[a] for a in apelidos if a in normalizados), None)
+        if coluna is not None: mapeamento[campo] = coluna
+    faltando = [campo for campo in ('data_registro', 'descricao', 'valor') if campo not in mapeamento]
+    if faltando: raise ErroImportacao(f"colunas não encontradas no cabeçalho: {', '.join(faltando)} (use o mapeamento)")
+    return mapeamento
+
+def ler_csv(caminho, mapeamento=None, delimitador=None, encoding='utf-8-sig'):
+    """Gera um dict por linha do CSV com as chaves da transação (e 'linha' para mensagens de erro)."""
+    with open(caminho, newline='', encoding=encoding) as arquivo:
+        if delimitador is None:
+            primeira = arquivo.readline()
+            delimitador = ';' if primeira.count(';') > primeira.count(',') else ','
+            arquivo.seek(0)
+        leitor = csv.DictReader(arquivo, delimiter=delimitador)
+        colunas = _resolver_mapeamento(leitor.fieldnames or [], mapeamento)
+        for registro in leitor:
+            yield {campo: registro.get(coluna) for campo, coluna in colunas.items()} | {'linha': leitor.line_num}
+
+def ler_ofx(caminho, encoding='latin-1'):
+    """Gera um dict por <STMTTRN> do OFX (SGML ou XML), sem carregar o arquivo inteiro."""
+    padrao_tag = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+    atual = None
+    with open(caminho, encoding=encoding, errors='replace') as arquivo:
+        for numero_linha, texto in enumerate(arquivo, start=1):
+            for fechamento, tag, valor in padrao_tag.findall(texto):
+                tag = tag.upper()
+                if tag == 'STMTTRN':
+                    if atual is not None: yield atual   # OFX SGML pode omitir </STMTTRN>
+                    atual = None if fechamento else {'linha': numero_linha}
+                elif atual is not None and not fechamento and valor.strip():
+                    atual[tag] = valor.strip()
+        if atual is not None: yield atual
+
+def _registros_ofx(caminho, encoding):
+    for transacao in ler_ofx(caminho, encoding):
+        yield {'data_registro': transacao.get('DTPOSTED'), 'valor': transacao.get('TRNAMT'),
+               'descricao': transacao.get('MEMO') or transacao.get('NAME'), 'id_externo': transacao.get('FITID'),
+               'linha': transacao['linha']}
+
+def normalizar_registro(registro, categoria_padrao=CATEGORIA_PADRAO):
+    """Converte um registro lido do extrato em (tipo, descricao, valor_centavos, categoria, data_registro_iso)."""
+    if not registro.get('data_registro') or not registro.get('valor'): raise ErroImportacao("data e valor são obrigatórios")
+    descricao = (registro.get('descricao') or '').strip()
+    if not descricao: raise ErroImportacao("descrição vazia")
+    valor_centavos = converter_valor(registro['valor'])
+    tipo_texto = (registro.get('tipo') or '').strip().casefold()
+    if tipo_texto in TIPOS_CREDITO: tipo = 'ganho'
+    elif tipo_texto in TIPOS_DEBITO: tipo = 'despesa'
+    else: tipo = 'despesa' if valor_centavos < 0 else 'ganho'   # sem coluna de tipo, o sinal decide
+    if valor_centavos == 0: raise ErroImportacao("valor zero")
+    categoria = None if tipo == 'ganho' else ((registro.get('categoria') or '').strip() or categoria_padrao)
+    return tipo, descricao, abs(valor_centavos), categoria, converter_data(registro['data_registro'])
+
+def _hash_importacao(transacao, id_externo, ocorrencia):
+    # Com FITID (OFX) o banco já identifica a transação; sem ele, usa o conteúdo + a ordem
+    # entre linhas idênticas do mesmo dia (duas passagens de ônibus iguais são duas transações).
+    tipo, descricao, valor_centavos, _, data_iso = transacao
+    chave = f"id|{id_externo}" if id_externo else f"conteudo|{data_iso[:10]}|{tipo}|{formatar_centavos(valor_centavos)}|{descricao.casefold()}|{ocorrencia}"
+    return hashlib.sha1(chave.encode('utf-8')).hexdigest()
+
+def importar_extrato(caminho, formato=None, mapeamento=None, delimitador=None, encoding=None,
+                     categoria_padrao=CATEGORIA_PADRAO, tamanho_lote=TAMANHO_LOTE_PADRAO):
+    """Importa um extrato CSV ou OFX para transacoes_tb.
+
+    Retorna um dict com lidas, inseridas, duplicadas, invalidas, erros (até 20 mensagens),
+    segundos e linhas_por_segundo.
+    """
+    formato = (formato or os.path.splitext(caminho)[1].lstrip('.')).lower()
+    if formato == 'ofx': registros = _registros_ofx(caminho, encoding or 'latin-1')
+    elif formato == 'csv': registros = ler_csv(caminho, mapeamento, delimitador, encoding or 'utf-8-sig')
+    else: raise ErroImportacao(f"formato não suportado: {formato!r} (use csv ou ofx)")
+
+    estatisticas = {'lidas': 0, 'inseridas': 0, 'duplicadas': 0, 'invalidas': 0, 'erros': []}
+    inicio = time.perf_counter()
+    lote, ocorrencias, dia_atual = [], {}, None
+    for registro in registros:
+        estatisticas['lidas'] += 1
+        try: transacao = normalizar_registro(registro, categoria_padrao)
+        except ErroImportacao as e:
+            estatisticas['invalidas'] += 1
+            if len(estatisticas['erros']) < 20: estatisticas['erros'].append(f"linha {registro.get('linha')}: {e}")
+            continue
+        # Contagem de linhas idênticas só dentro do dia corrente: extratos vêm ordenados por data,
+        # então o dicionário fica pequeno e a memória não cresce com o arquivo.
+        if transacao[4][:10] != dia_atual: ocorrencias, dia_atual = {}, transacao[4][:10]
+        chave_conteudo = transacao[:3]
+        ocorrencias[chave_conteudo] = ocorrencias.get(chave_conteudo, 0) + 1
+        lote.append((*transacao, *_colunas_data(transacao[4]), _hash_importacao(transacao, registro.get('id_externo'), ocorrencias[chave_conteudo])))
+        if len(lote) >= tamanho_lote:
+            estatisticas['inseridas'] += importar_lote_db(lote); lote = []
+    if lote: estatisticas['inseridas'] += importar_lote_db(lote)
+
+    estatisticas['segundos'] = time.perf_counter() - inicio
+    estatisticas['duplicadas'] = estatisticas['lidas'] - estatisticas['invalidas'] - estatisticas['inseridas']
+    estatisticas['linhas_por_segundo'] = estatisticas['lidas'] / estatisticas['segundos'] if estatisticas['segundos'] else 0.0
+    return estatisticas
+
+def resumo_importacao(estatisticas):
+    return (f"{estatisticas['inseridas']} importada(s), {estatisticas['duplicadas']} duplicada(s), "
+            f"{estatisticas['invalidas']} inválida(s) em {estatisticas['segundos']:.2f}s "
+            f"({estatisticas['linhas_por_segundo']:,.0f} linhas/s)")
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Importa extratos bancários (CSV/OFX) para o controle financeiro.")
+    parser.add_argument('arquivo')
+    parser.add_argument('--formato', choices=('csv', 'ofx'), help="padrão: extensão do arquivo")
+    parser.add_argument('--banco', default='controle_financeiro.db')
+    parser.add_argument('--mapa', action='append', default=[], metavar='CAMPO=COLUNA',
+                        help="coluna do CSV para data_registro/descricao/valor/categoria/tipo (repetível)")
+    parser.add_argument('--delimitador')
+    parser.add_argument('--encoding')
+    parser.add_argument('--categoria-padrao', default=CATEGORIA_PADRAO, help="categoria das despesas sem categoria")
+    parser.add_argument('--lote', type=int, default=TAMANHO_LOTE_PADRAO, help="linhas por transação")
+    args = parser.parse_args()
+    mapeamento = dict(item.split('=', 1) for item in args.mapa)
+    configurar_banco_dados(args.banco)
+    inicializar_banco_de_dados()
+    estatisticas = importar_extrato(args.arquivo, args.formato, mapeamento, args.delimitador, args.encoding,
+                                    args.categoria_padrao, args.lote)
+    for erro in estatisticas['erros']: print(erro)
+    print(resumo_importacao(estatisticas))
@@ -0,0 +1,170 @@
+import tkinter as tk
+from operator import itemgetter
+
+# --- LISTA VIRTUAL PARA O TREEVIEW ---
+# O Treeview do Tk fica lento com dezenas de milhares de itens: cada insert custa uma
+# chamada Tcl e o widget guarda todos na memória. Aqui as linhas ficam numa lista de
+# tuplas e só uma "janela" ao redor da área visível vira item do Treeview.
+
+
+def chave_por_tipo(indice, tipo):
+    """Chave de ordenação sobre um valor já tipado da linha (sem reconverter texto exibido)."""
+    if tipo == 'str': return lambda linha: (linha[indice] or "").casefold()
+    return itemgetter(indice)
+
+
+class ListaVirtual:
+    """Mostra no Treeview apenas as linhas visíveis mais um buffer, trocando a janela durante a rolagem.
+
+    Cada linha é uma tupla: as `num_colunas` primeiras posições são exibidas, as demais ficam
+    ocultas (ex.: data completa para ordenação). O primeiro valor (id) vira o iid do item.
+    """
+
+    def __init__(self, tree, scrollbar, num_colunas, buffer=100):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.num_colunas = num_colunas
+        self.buffer = buffer
+        self.margem = buffer // 2   # quão perto da borda da janela a rolagem pode chegar antes de trocá-la
+        self._linhas = []
+        self._por_id = {}   # id -> linha, para achar a linha das atualizações incrementais sem percorrer a lista
+        self._ini, self._fim = 0, 0
+        self._visiveis = 20
+        self._reposicionamento_agendado = False
+        self._id_selecionado = None
+        self._chave, self._reverso = None, False   # ordem atual das linhas, usada pelas atualizações incrementais
+        self.tree.configure(yscrollcommand=self._on_tree_yscroll)
+        self.scrollbar.configure(command=self._on_scrollbar)
+
+    @property
+    def linhas(self):
+        return self._linhas
+
+    def __len__(self):
+        return len(self._linhas)
+
+    def carregar(self, linhas, key=None, reverse=False):
+        """Substitui todas as linhas (já ordenadas segundo key/reverse) e volta ao topo."""
+        self._linhas = linhas if isinstance(linhas, list) else list(linhas)
+        self._por_id = {linha[0]: linha for linha in self._linhas}
+        self._chave, self._reverso = key, reverse
+        self._id_selecionado = None
+        self._renderizar(0, min(len(self._linhas), self._visiveis + 2 * self.buffer))
+        self.tree.yview_moveto(0)
+
+    def ordenar(self, key, reverse=False):
+        """Ordena as linhas guardadas (não os itens do Treeview) e volta ao topo."""
+        self._linhas.sort(key=key, reverse=reverse)
+        self._chave, self._reverso = key, reverse
+        self._renderizar(0, min(len(self._linhas), self._visiveis + 2 * self.buffer))
+        self.tree.yview_moveto(0)
+
+    def _renderizar(self, ini, fim):
+        selecao = self.tree.selection()
+        if selecao: self._id_selecionado = selecao[0]
+        foco = self.tree.focus()
+        filhos = self.tree.get_children('')
+        if filhos: self.tree.delete(*filhos)
+        for linha in self._linhas[ini:fim]:
+            self.tree.insert('', tk.END, iid=str(linha[0]), values=linha[:self.num_colunas])
+        self._ini, self._fim = ini, fim
+        if self._id_selecionado is not None and self.tree.exists(self._id_selecionado):
+            self.tree.selection_set(self._id_selecionado)
+        if foco and self.tree.exists(foco): self.tree.focus(foco)
+
+    # --- Atualizações incrementais: mexem em um item só, sem recriar a janela ---
+    def _busca_binaria(self, chave, depois_dos_empates=True):
+        # Primeira posição depois (ou antes, com depois_dos_empates=False) das linhas com a mesma chave, na ordem atual.
+        baixo, alto = 0, len(self._linhas)
+        while baixo < alto:
+            meio = (baixo + alto) // 2
+            chave_meio = self._chave(self._linhas[meio])
+            if self._reverso: vem_antes = chave_meio < chave if depois_dos_empates else chave_meio <= chave
+            else: vem_antes = chave < chave_meio if depois_dos_empates else chave <= chave_meio
+            if vem_antes: alto = meio
+            else: baixo = meio + 1
+        return baixo
+
+    def _posicao_ordenada(self, linha):
+        # Empates ficam depois das linhas existentes, como no sort estável.
+        return len(self._linhas) if self._chave is None else self._busca_binaria(self._chave(linha))
+
+    def _indice_do_id(self, id_linha):
+        linha = self._por_id.get(id_linha)
+        if linha is None: return None
+        if self._chave is None: return self._linhas.index(linha)   # sem ordem conhecida (ex.: relevância da busca)
+        # Busca binária pela chave da linha guardada; entre empates, procura o id.
+        indice = self._busca_binaria(self._chave(linha), depois_dos_empates=False)
+        while self._linhas[indice][0] != id_linha: indice += 1
+        return indice
+
+    def inserir(self, linha):
+        """Insere uma linha na posição correta da ordem atual."""
+        posicao = self._posicao_ordenada(linha)
+        self._linhas.insert(posicao, linha)
+        self._por_id[linha[0]] = linha
+        if posicao < self._ini:
+            self._ini += 1; self._fim += 1
+        elif posicao <= self._fim:
+            self.tree.insert('', posicao - self._ini, iid=str(linha[0]), values=linha[:self.num_colunas])
+            self._fim += 1
+
+    def remover(self, id_linha):
+        indice = self._indice_do_id(id_linha)
+        if indice is None: return False
+        del self._linhas[indice]
+        del self._por_id[id_linha]
+        if indice < self._ini:
+            self._ini -= 1; self._fim -= 1
+        elif indice < self._fim:
+            self.tree.delete(str(id_linha))
+            self._fim -= 1
+        if self._id_selecionado == str(id_linha): self._id_selecionado = None
+        return True
+
+    def atualizar(self, linha):
+        """Troca os valores de uma linha existente; se a chave de ordenação mudou, ela muda de lugar."""
+        indice = self._indice_do_id(linha[0])
+        if indice is None: self.inserir(linha); return
+        antiga = self._linhas[indice]
+        if self._chave is not None and self._chave(antiga) != self._chave(linha):
+            selecionado = str(linha[0]) in self.tree.selection()
+            self.remover(linha[0]); self.inserir(linha)
+            if selecionado and self.tree.exists(str(linha[0])): self.tree.selection_set(str(linha[0]))
+            return
+        self._linhas[indice] = linha
+        self._por_id[linha[0]] = linha
+        if self._ini <= indice < self._fim: self.tree.item(str(linha[0]), values=linha[:self.num_colunas])
+
+    def _reposicionar(self, primeiro):
+        """Garante que a linha global `primeiro` seja a primeira visível, trocando a janela se preciso."""
+        self._reposicionamento_agendado = False
+        total = len(self._linhas)
+        primeiro = max(0, min(primeiro, total - self._visiveis))
+        dentro_da_janela = ((self._ini == 0 or primeiro - self._ini >= self.margem) and
+                            (self._fim == total or self._fim - (primeiro + self._visiveis) >= self.margem))
+        if not dentro_da_janela:
+            self._renderizar(max(0, primeiro - self.buffer), min(total, primeiro + self._visiveis + self.buffer))
+        tamanho = self._fim - self._ini
+        if tamanho: self.tree.yview_moveto((primeiro - self._ini) / tamanho)
+
+    def _on_tree_yscroll(self, first, last):
+        # Chamado pelo Treeview com frações relativas aos itens da janela; convertemos para o total.
+        first, last = float(first), float(last)
+        total, tamanho = len(self._linhas), self._fim - self._ini
+        if not total or not tamanho: self.scrollbar.set(0, 1); return
+        primeiro = self._ini + int(round(first * tamanho))
+        self._visiveis = max(1, int(round((last - first) * tamanho)))
+        self.scrollbar.set(primeiro / total, min(1.0, (primeiro + self._visiveis) / total))
+        perto_do_inicio = self._ini > 0 and primeiro - self._ini < self.margem
+        perto_do_fim = self._fim < total and self._fim - (primeiro + self._visiveis) < self.margem
+        if (perto_do_inicio or perto_do_fim) and not self._reposicionamento_agendado:
+            self._reposicionamento_agendado = True
+            self.tree.after_idle(self._reposicionar, primeiro)
+
+    def _on_scrollbar(self, *args):
+        if args and args[0] == 'moveto':
+            self._reposicionar(int(float(args[1]) * len(self._linhas)))
+        else:
+            # 'scroll N units|pages': o próprio Treeview rola; a troca de janela vem pelo yscrollcommand.
+            self.tree.yview(*args)
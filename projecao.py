@@ -0,0 +1,144 @@
+import datetime
+
+try:
+    import numpy as np
+except ImportError:   # a projeção é opcional: sem NumPy o resto do app funciona normalmente
+    np = None
+
+from banco_dados import (buscar_totais_mensais_db, buscar_totais_agendados_db, listar_recorrencias_db, materializar_recorrencias_db,
+                         _colunas_data)
+
+# --- PROJEÇÃO DE FLUXO DE CAIXA ---
+# Parte do saldo até o fim do mês corrente e projeta mês a mês:
+#   gasto/ganho "variável" = média (ou reta de tendência) dos últimos meses fechados, sem as
+#   parcelas e recorrências, que não se repetem do mesmo jeito;
+#   + agendado = transações já gravadas em meses futuros (parcelas, recorrências materializadas)
+#   + ocorrências futuras das regras recorrentes ainda não materializadas.
+# Tudo em arrays NumPy indexados por mês (ano * 12 + mes - 1); as consultas leem só agregados.
+
+NUMPY_DISPONIVEL = np is not None
+ANOS_MAXIMO = 10
+MESES_HISTORICO_PADRAO = 24
+TIPOS = ('ganho', 'despesa')
+
+
+class ErroProjecao(RuntimeError):
+    """Projeção indisponível (NumPy não instalado) ou parâmetros inválidos."""
+
+
+def _indice_mes(ano, mes):
+    return ano * 12 + mes - 1
+
+def _somar_por_mes(linhas, inicio, tamanho):
+    """[(ano, mes, tipo, total)] -> array (2, tamanho) de centavos, linha 0 = ganhos e 1 = despesas, a partir do mês `inicio`."""
+    totais = np.zeros((2, tamanho), dtype=np.int64)
+    if not linhas: return totais
+    dados = np.array([(_indice_mes(ano, mes), TIPOS.index(tipo), total) for ano, mes, tipo, total in linhas if tipo in TIPOS],
+                     dtype=np.int64).reshape(-1, 3)
+    posicoes = dados[:, 0] - inicio
+    dentro = (posicoes >= 0) & (posicoes < tamanho)
+    np.add.at(totais, (dados[dentro, 1], posicoes[dentro]), dados[dentro, 2])
+    return totais
+
+def _datas_da_regra(regra, limite):
+    """datetime64[D] das ocorrências ainda não materializadas da regra, até `limite` (datetime64[D])."""
+    inicio = np.datetime64(regra['data_inicio'][:10], 'D')
+    primeira = regra['ocorrencias_geradas']
+    restantes = None if regra['total_ocorrencias'] is None else regra['total_ocorrencias'] - primeira
+    if regra['frequencia'] == 'semanal':
+        passo = 7 * regra['intervalo']
+        datas = np.arange(inicio + primeira * passo, limite + 1, passo, dtype='datetime64[D]')
+    else:
+        # Mensal/anual: mesmo dia a partir da data inicial, ajustado ao último dia do mês (como recorrencias.somar_meses).
+        passo = regra['intervalo'] * (12 if regra['frequencia'] == 'anual' else 1)
+        mes_inicio = inicio.astype('datetime64[M]')
+        meses = np.arange(mes_inicio + primeira * passo, limite.astype('datetime64[M]') + 1, passo, dtype='datetime64[M]')
+        dias_no_mes = ((meses + 1).astype('datetime64[D]') - meses.astype('datetime64[D]')).astype(np.int64)
+        dia = (inicio - mes_inicio.astype('datetime64[D]')).astype(np.int64) + 1
+        datas = meses.astype('datetime64[D]') + (np.minimum(dia, dias_no_mes) - 1)
+        datas = datas[datas <= limite]
+    if restantes is not None: datas = datas[:max(restantes, 0)]
+    if regra['data_fim']: datas = datas[datas <= np.datetime64(regra['data_fim'][:10], 'D')]
+    return datas
+
+def _mes_numpy(indice):
+    return np.datetime64('1970-01', 'M') + (indice - _indice_mes(1970, 1))
+
+def _somar_recorrencias(regras, inicio, tamanho):
+    """Ocorrências futuras das regras ativas, somadas por mês como em _somar_por_mes."""
+    totais = np.zeros((2, tamanho), dtype=np.int64)
+    primeiro_dia = _mes_numpy(inicio).astype('datetime64[D]')
+    ultimo_dia = _mes_numpy(inicio + tamanho).astype('datetime64[D]') - 1
+    for regra in regras:
+        if regra['proxima_data'] is None: continue
+        datas = _datas_da_regra(regra, ultimo_dia)
+        datas = datas[datas >= primeiro_dia]
+        posicoes = (datas.astype('datetime64[M]') - _mes_numpy(inicio)).astype(np.int64)
+        np.add.at(totais[TIPOS.index(regra['tipo'])], posicoes, regra['valor_centavos'])
+    return totais
+
+def calcular_projecao(historico, agendado_historico, agendado_futuro, saldo_inicial, meses_futuros, tendencia=False):
+    """Núcleo vetorizado, sem acesso ao banco.
+
+    historico e agendado_historico: arrays (2, H) dos meses fechados usados como base;
+    agendado_futuro: array (2, meses_futuros). Retorna (ganhos, despesas, saldo_mes, saldo_acumulado),
+    arrays int64 de centavos com meses_futuros posições.
+    """
+    variavel = np.maximum(historico - agendado_historico, 0).astype(np.float64)
+    meses_historico = variavel.shape[1]
+    if tendencia and meses_historico >= 2:
+        # Reta de mínimos quadrados por tipo (polyfit aceita as duas séries de uma vez).
+        inclinacao, intercepto = np.polyfit(np.arange(meses_historico), variavel.T, 1)
+        futuro = np.arange(meses_historico, meses_historico + meses_futuros)
+        base = intercepto[:, None] + inclinacao[:, None] * futuro[None, :]
+    else:
+        media = variavel.mean(axis=1) if meses_historico else np.zeros(2)
+        base = np.repeat(media[:, None], meses_futuros, axis=1)
+    projetado = np.rint(np.maximum(base, 0)).astype(np.int64) + agendado_futuro
+    saldo_mes = projetado[0] - projetado[1]
+    return projetado[0], projetado[1], saldo_mes, saldo_inicial + np.cumsum(saldo_mes)
+
+def projetar_fluxo_caixa(anos=5, meses_historico=MESES_HISTORICO_PADRAO, tendencia=False, hoje=None):
+    """Projeção mês a mês do saldo para os próximos `anos` (1 a 10), em centavos.
+
+    Retorna um dict com os parâmetros, saldo_inicial_centavos (até o fim do mês corrente),
+    base_mensal (médias variáveis usadas) e meses: [{ano, mes, ganhos_centavos,
+    despesas_centavos, agendado_ganhos_centavos, agendado_despesas_centavos, saldo_centavos,
+    saldo_acumulado_centavos}].
+    """
+    if not NUMPY_DISPONIVEL: raise ErroProjecao("a projeção precisa do NumPy (pip install numpy)")
+    if not 1 <= int(anos) <= ANOS_MAXIMO: raise ErroProjecao(f"anos deve estar entre 1 e {ANOS_MAXIMO}")
+    if int(meses_historico) < 1: raise ErroProjecao("meses_historico deve ser positivo")
+    anos, meses_historico = int(anos), int(meses_historico)
+    hoje = hoje or datetime.date.today()
+    mes_atual = _indice_mes(hoje.year, hoje.month)
+    inicio_historico, inicio_futuro, meses_futuros = mes_atual - meses_historico, mes_atual + 1, anos * 12
+
+    materializar_recorrencias_db()   # o mês corrente completo entra no saldo inicial
+    totais = buscar_totais_mensais_db()
+    ano_hist, mes_hist = divmod(inicio_historico, 12)
+    agendados = buscar_totais_agendados_db(_colunas_data(datetime.date(ano_hist, mes_hist + 1, 1).isoformat())[2])
+    historico = _somar_por_mes(totais, inicio_historico, meses_historico)
+    agendado_historico = _somar_por_mes(agendados, inicio_historico, meses_historico)
+    agendado_futuro = (_somar_por_mes(totais, inicio_futuro, meses_futuros)
+                       + _somar_recorrencias(listar_recorrencias_db(), inicio_futuro, meses_futuros))
+    ate_mes_atual = np.array([total if tipo == 'ganho' else -total for ano, mes, tipo, total in totais
+                              if tipo in TIPOS and _indice_mes(ano, mes) <= mes_atual], dtype=np.int64)
+    saldo_inicial = int(ate_mes_atual.sum())
+
+    ganhos, despesas, saldo_mes, saldo_acumulado = calcular_projecao(historico, agendado_historico, agendado_futuro,
+                                                                     saldo_inicial, meses_futuros, tendencia)
+    variavel = np.maximum(historico - agendado_historico, 0)
+    indices = np.arange(inicio_futuro, inicio_futuro + meses_futuros)
+    colunas = zip((indices // 12).tolist(), (indices % 12 + 1).tolist(), ganhos.tolist(), despesas.tolist(),
+                  agendado_futuro[0].tolist(), agendado_futuro[1].tolist(), saldo_mes.tolist(), saldo_acumulado.tolist())
+    return {
+        'anos': anos,
+        'meses_historico': meses_historico,
+        'tendencia': bool(tendencia),
+        'saldo_inicial_centavos': saldo_inicial,
+        'base_mensal': {'ganhos_centavos': int(round(variavel[0].mean())), 'despesas_centavos': int(round(variavel[1].mean()))},
+        'meses': [{'ano': ano, 'mes': mes, 'ganhos_centavos': g, 'despesas_centavos': d, 'agendado_ganhos_centavos': ag,
+                   'agendado_despesas_centavos': ad, 'saldo_centavos': s, 'saldo_acumulado_centavos': acumulado}
+                  for ano, mes, g, d, ag, ad, s, acumulado in colunas],
+    }
@@ -0,0 +1,64 @@
+import datetime
+from calendar import monthrange
+
+# --- TRANSAÇÕES RECORRENTES: CÁLCULO DAS OCORRÊNCIAS ---
+# Uma regra (tabela `recorrencias`) guarda só a data inicial, a frequência e o término
+# (data final e/ou número de ocorrências). As datas são calculadas aqui, sempre a partir
+# da data inicial: uma mensal do dia 31 cai em 28/29 de fevereiro e volta ao 31 em março.
+
+FREQUENCIAS = ('semanal', 'mensal', 'anual')
+HORIZONTE_MESES_PADRAO = 0   # meses além do corrente já gravados em transacoes_tb
+HORIZONTE_MESES_MAXIMO = 24  # consultar um período futuro grava no máximo até aqui; depois, as ocorrências são calculadas na leitura
+ANO_MINIMO, ANO_MAXIMO = 1900, 2100   # períodos aceitos nas consultas (?ano=)
+
+
+def somar_meses(data, meses):
+    """Mesma data `meses` depois; o dia é ajustado ao último dia do mês quando não existe nele."""
+    indice = data.year * 12 + data.month - 1 + meses
+    ano, mes = divmod(indice, 12)
+    return data.replace(year=ano, month=mes + 1, day=min(data.day, monthrange(ano, mes + 1)[1]))
+
+def data_da_ocorrencia(inicio, frequencia, numero, intervalo=1):
+    """Data da ocorrência `numero` (0 = a própria data inicial)."""
+    if frequencia == 'semanal': return inicio + datetime.timedelta(weeks=numero * intervalo)
+    if frequencia == 'mensal': return somar_meses(inicio, numero * intervalo)
+    if frequencia == 'anual': return somar_meses(inicio, 12 * numero * intervalo)
+    raise ValueError(f"frequência desconhecida: {frequencia!r} (use {', '.join(FREQUENCIAS)})")
+
+def ocorrencias(inicio, frequencia, intervalo=1, data_fim=None, total=None, a_partir=0):
+    """Gera (numero, data) das ocorrências a partir da de número `a_partir`, até o término da regra.
+
+    Sem data_fim nem total a regra não termina: quem consome o gerador decide onde parar.
+    """
+    numero = a_partir
+    while total is None or numero < total:
+        data = data_da_ocorrencia(inicio, frequencia, numero, intervalo)
+        if data_fim is not None and data > data_fim: return
+        yield numero, data
+        numero += 1
+
+def fim_do_mes(ano, mes):
+    return datetime.datetime(ano, mes, monthrange(ano, mes)[1], 23, 59, 59)
+
+def periodo_valido(ano, mes=None):
+    """ano (se houver) entre ANO_MINIMO e ANO_MAXIMO e mes (se houver) entre 1 e 12."""
+    return (ano is None or ANO_MINIMO <= ano <= ANO_MAXIMO) and (mes is None or 1 <= mes <= 12)
+
+def intervalo_periodo(ano, mes=None):
+    """(início, fim) do período como datetime: o mês, ou o ano todo sem mes."""
+    return datetime.datetime(ano, mes or 1, 1), fim_do_mes(ano, mes or 12)
+
+def horizonte_recorrencias(ano=None, mes=None, hoje=None, meses_adiante=HORIZONTE_MESES_PADRAO):
+    """Até quando as ocorrências precisam estar gravadas para consultar o período (ano, mes).
+
+    Nunca antes do fim do mês corrente (+ meses_adiante), para que saldos e listas do
+    presente estejam completos; um período futuro estende o horizonte até o fim dele, mas
+    no máximo HORIZONTE_MESES_MAXIMO meses depois do corrente. Período inválido não estende.
+    """
+    mes_corrente = (hoje or datetime.date.today()).replace(day=1)
+    referencia = somar_meses(mes_corrente, meses_adiante)
+    horizonte = fim_do_mes(referencia.year, referencia.month)
+    if ano and periodo_valido(int(ano), int(mes) if mes else None):
+        limite = somar_meses(mes_corrente, HORIZONTE_MESES_MAXIMO)
+        horizonte = max(horizonte, fim_do_mes(*min((int(ano), int(mes) if mes else 12), (limite.year, limite.month))))
+    return horizonte
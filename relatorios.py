@@ -0,0 +1,110 @@
+from html import escape
+
+from banco_dados import cache_consultas, resumir_transacoes_db, calcular_saldo_anterior_db
+from dinheiro import formatar_centavos
+
+# --- RELATÓRIOS: SÉRIES AGREGADAS E GRÁFICOS SVG ---
+# Tudo sai do resumo_mensal (via resumir_transacoes_db), nunca das linhas de transacoes_tb.
+# Séries e SVGs ficam no cache de consultas por período; como o saldo acumulado depende dos
+# meses anteriores, qualquer escrita descarta os relatórios (nova versão dos dados).
+
+MAX_CATEGORIAS_GRAFICO = 10
+COR_GANHO, COR_DESPESA, COR_SALDO = '#8fd18f', '#e08080', '#75aadb'
+COR_TEXTO, COR_EIXO = '#e0e0e0', '#707070'
+GRAFICOS = ('categorias', 'mensal', 'saldo')
+
+
+@cache_consultas.consulta('relatorio', por_periodo=False)
+def gerar_relatorio(ano=None, mes=None):
+    """Séries do período (valores em centavos): despesas por categoria, ganhos/despesas por mês e saldo acumulado.
+
+    O saldo acumulado parte do saldo anterior ao período quando há ano; sem ano (todos os
+    anos ou um mês de todos os anos) parte de zero.
+    """
+    resumo = resumir_transacoes_db(ano, mes)
+    saldo = calcular_saldo_anterior_db(ano, mes) if ano else 0
+    saldo_acumulado = []
+    for linha in resumo['por_mes']:
+        saldo += linha['saldo_centavos']
+        saldo_acumulado.append({'ano': linha['ano'], 'mes': linha['mes'], 'saldo_acumulado_centavos': saldo})
+    return {
+        'periodo': {'ano': ano, 'mes': mes},
+        'total_ganhos_centavos': resumo['total_ganhos_centavos'],
+        'total_despesas_centavos': resumo['total_despesas_centavos'],
+        'saldo_liquido_centavos': resumo['saldo_liquido_centavos'],
+        'despesas_por_categoria': [{'categoria': linha['categoria'] or 'Sem categoria', 'total_centavos': linha['total_centavos']}
+                                   for linha in resumo['por_categoria'] if linha['tipo'] == 'despesa'],
+        'por_mes': resumo['por_mes'],
+        'saldo_acumulado': saldo_acumulado,
+    }
+
+def _reais(centavos):
+    return formatar_centavos(centavos).replace('.', ',')
+
+def _svg(largura, altura, corpo, titulo):
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {largura} {altura}" width="{largura}" height="{altura}" '
+            f'font-family="Arial, sans-serif" font-size="11" fill="{COR_TEXTO}" role="img"><title>{escape(titulo)}</title>{"".join(corpo)}</svg>')
+
+def _sem_dados(titulo):
+    return _svg(480, 40, ['<text x="240" y="24" text-anchor="middle">Sem dados no período</text>'], titulo)
+
+def svg_categorias(relatorio):
+    """Barras horizontais das despesas por categoria (as maiores; o resto vira "Outras")."""
+    itens = [(linha['categoria'], linha['total_centavos']) for linha in relatorio['despesas_por_categoria']]
+    if len(itens) > MAX_CATEGORIAS_GRAFICO:
+        itens = itens[:MAX_CATEGORIAS_GRAFICO - 1] + [('Outras', sum(total for _, total in itens[MAX_CATEGORIAS_GRAFICO - 1:]))]
+    titulo = "Despesas por categoria"
+    if not itens or max(total for _, total in itens) <= 0: return _sem_dados(titulo)
+    maior, largura_barra = max(total for _, total in itens), 260
+    corpo = []
+    for i, (categoria, total) in enumerate(itens):
+        y = 6 + i * 22
+        corpo.append(f'<text x="128" y="{y + 12}" text-anchor="end">{escape(categoria[:20])}</text>'
+                     f'<rect x="134" y="{y}" width="{max(round(largura_barra * total / maior), 1)}" height="16" fill="{COR_DESPESA}"/>'
+                     f'<text x="{138 + round(largura_barra * total / maior)}" y="{y + 12}">{_reais(total)}</text>')
+    return _svg(480, 12 + 22 * len(itens), corpo, titulo)
+
+def _rotulo_mes(linha):
+    return f"{linha['mes']:02d}/{linha['ano'] % 100:02d}"
+
+def svg_mensal(relatorio):
+    """Colunas de ganhos e despesas lado a lado, uma dupla por mês."""
+    meses, titulo = relatorio['por_mes'], "Ganhos e despesas por mês"
+    if not meses: return _sem_dados(titulo)
+    maior = max(max(linha['ganhos_centavos'], linha['despesas_centavos']) for linha in meses) or 1
+    altura_util, passo = 150, max(480 // len(meses), 6)
+    largura, rotulo_cada = max(480, passo * len(meses) + 20), max(len(meses) // 12, 1)
+    corpo = [f'<line x1="10" y1="{10 + altura_util}" x2="{largura - 10}" y2="{10 + altura_util}" stroke="{COR_EIXO}"/>']
+    for i, linha in enumerate(meses):
+        x = 10 + i * passo
+        for deslocamento, valor, cor in ((0, linha['ganhos_centavos'], COR_GANHO), (passo // 2, linha['despesas_centavos'], COR_DESPESA)):
+            altura = round(altura_util * valor / maior)
+            corpo.append(f'<rect x="{x + deslocamento}" y="{10 + altura_util - altura}" width="{max(passo // 2 - 1, 1)}" height="{altura}" fill="{cor}">'
+                         f'<title>{_rotulo_mes(linha)}: {_reais(valor)}</title></rect>')
+        if i % rotulo_cada == 0: corpo.append(f'<text x="{x + passo // 2}" y="{26 + altura_util}" text-anchor="middle">{_rotulo_mes(linha)}</text>')
+    return _svg(largura, 36 + altura_util, corpo, titulo)
+
+def svg_saldo(relatorio):
+    """Linha do saldo acumulado ao fim de cada mês, com a linha do zero quando ela cabe no gráfico."""
+    pontos, titulo = relatorio['saldo_acumulado'], "Saldo acumulado"
+    if not pontos: return _sem_dados(titulo)
+    valores = [ponto['saldo_acumulado_centavos'] for ponto in pontos]
+    minimo, maximo = min(valores + [0]), max(valores + [0])
+    escala, altura_util, largura = (maximo - minimo) or 1, 150, 480
+    passo = (largura - 20) / max(len(valores) - 1, 1)
+    y = lambda valor: round(10 + altura_util * (maximo - valor) / escala)
+    coordenadas = ' '.join(f"{round(10 + i * passo)},{y(valor)}" for i, valor in enumerate(valores))
+    corpo = [f'<line x1="10" y1="{y(0)}" x2="{largura - 10}" y2="{y(0)}" stroke="{COR_EIXO}" stroke-dasharray="4 3"/>',
+             f'<polyline points="{coordenadas}" fill="none" stroke="{COR_SALDO}" stroke-width="2"/>',
+             f'<circle cx="{round(10 + (len(valores) - 1) * passo)}" cy="{y(valores[-1])}" r="3" fill="{COR_SALDO}"/>',
+             f'<text x="10" y="{26 + altura_util}">{_rotulo_mes(pontos[0])}</text>',
+             f'<text x="{largura - 10}" y="{26 + altura_util}" text-anchor="end">{_rotulo_mes(pontos[-1])}: {_reais(valores[-1])}</text>']
+    return _svg(largura, 36 + altura_util, corpo, titulo)
+
+_GERADORES_SVG = {'categorias': svg_categorias, 'mensal': svg_mensal, 'saldo': svg_saldo}
+
+@cache_consultas.consulta('graficos', por_periodo=False)
+def gerar_graficos_svg(ano=None, mes=None):
+    """nome -> documento SVG de cada gráfico em GRAFICOS, a partir de gerar_relatorio."""
+    relatorio = gerar_relatorio(ano, mes)
+    return {nome: _GERADORES_SVG[nome](relatorio) for nome in GRAFICOS}
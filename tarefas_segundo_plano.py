@@ -0,0 +1,83 @@
+import itertools
+import queue
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+# --- TAREFAS DE BANCO FORA DA THREAD DO TK ---
+# As funções de banco_dados rodam numa pool de threads (cada thread tem sua conexão no
+# pool de conexões) e os resultados voltam por uma fila lida com root.after, de modo
+# que os callbacks sempre executam no loop de eventos do Tk.
+
+
+class ExecutorTarefas:
+    """Executa funções em segundo plano e entrega resultado/erro na thread do Tk.
+
+    Tarefas submetidas com a mesma `chave` se substituem: a anterior é cancelada se ainda
+    não começou e, se já estiver rodando, seu resultado é descartado ao chegar.
+    """
+
+    def __init__(self, root, max_workers=2, intervalo_ms=30, ao_mudar_ocupado=None):
+        self.root = root
+        self.intervalo_ms = intervalo_ms
+        self.ao_mudar_ocupado = ao_mudar_ocupado
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tarefa_bd')
+        self._resultados = queue.Queue()
+        self._contador = itertools.count(1)
+        self._mais_recente = {}   # chave -> número da última tarefa submetida
+        self._futuros = {}        # chave -> future da última tarefa submetida
+        self._pendentes = 0
+        self._job = None
+
+    @property
+    def ocupado(self):
+        return self._pendentes > 0
+
+    def pendente(self, chave):
+        """Há uma tarefa com essa chave cujo resultado ainda não foi entregue?"""
+        return chave in self._futuros
+
+    def submeter(self, funcao, *args, ao_concluir=None, ao_falhar=None, chave=None):
+        numero = next(self._contador)
+        if chave is not None:
+            anterior = self._futuros.get(chave)
+            if anterior is not None and anterior.cancel(): self._pendentes -= 1
+            self._mais_recente[chave] = numero
+        futuro = self._executor.submit(self._executar, numero, chave, funcao, args, ao_concluir, ao_falhar)
+        if chave is not None: self._futuros[chave] = futuro
+        self._pendentes += 1
+        if self._job is None:
+            self._notificar(True)
+            self._job = self.root.after(self.intervalo_ms, self._processar_resultados)
+        return numero
+
+    def _executar(self, numero, chave, funcao, args, ao_concluir, ao_falhar):
+        # Roda numa thread da pool: nada de Tk aqui.
+        try: self._resultados.put((numero, chave, True, funcao(*args), ao_concluir, ao_falhar))
+        except Exception as e: self._resultados.put((numero, chave, False, e, ao_concluir, ao_falhar))
+
+    def _processar_resultados(self):
+        try:
+            while True:
+                try: numero, chave, sucesso, valor, ao_concluir, ao_falhar = self._resultados.get_nowait()
+                except queue.Empty: break
+                self._pendentes -= 1
+                if chave is not None:
+                    if self._mais_recente.get(chave) != numero: continue   # obsoleta: já existe pedido mais novo
+                    self._futuros.pop(chave, None)
+                callback = ao_concluir if sucesso else ao_falhar
+                if callback is None: continue
+                try: callback(valor)
+                except Exception: self.root.report_callback_exception(*sys.exc_info())
+        finally:
+            if self._pendentes > 0:
+                self._job = self.root.after(self.intervalo_ms, self._processar_resultados)
+            else:
+                self._job = None
+                self._notificar(False)
+
+    def _notificar(self, ocupado):
+        if self.ao_mudar_ocupado: self.ao_mudar_ocupado(ocupado)
+
+    def encerrar(self):
+        if self._job is not None: self.root.after_cancel(self._job); self._job = None
+        self._executor.shutdown(wait=False, cancel_futures=True)